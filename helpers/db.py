@@ -1,8 +1,12 @@
 from enum import Enum
 import os
-from datetime import timedelta
+import logging
+from datetime import date, timedelta
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
 from influxdb import InfluxDBClient
+from helpers.spain_geography import CCAAS
 
 
 class Measurement(Enum):
@@ -25,23 +29,202 @@ class Measurement(Enum):
 
 class Influx:
     DATE_FORMAT = "%Y-%m-%d"
+    FIRST_DAY = "2020-01-01"
+    ACCUMULATED_SUFFIX = "_accumulated"
+    # Measurements that store daily deltas. A running total is maintained for each of them so accumulated
+    # values can be read without summing the whole history.
+    ACCUMULATED_MEASUREMENTS = [Measurement.PCRS, Measurement.DEATHS, Measurement.VACCINATIONS,
+                                Measurement.COMPLETED_VACCINATIONS, Measurement.FIRST_DOSE_VACCINATIONS,
+                                Measurement.EXTRA_DOSE_VACCINATIONS]
+    # Aggregation used to roll up each measurement into weekly and monthly points
+    ROLLUP_AGGREGATIONS = {
+        Measurement.PCRS: "sum",
+        Measurement.DEATHS: "sum",
+        Measurement.ICU_PEOPLE: "sum",
+        Measurement.ADMITTED_PEOPLE: "sum",
+        Measurement.VACCINATIONS: "sum",
+        Measurement.COMPLETED_VACCINATIONS: "sum",
+        Measurement.FIRST_DOSE_VACCINATIONS: "sum",
+        Measurement.EXTRA_DOSE_VACCINATIONS: "sum",
+        Measurement.ACCUMULATED_INCIDENCE: "last",
+        Measurement.PERCENTAGE_ADMITTED: "last",
+        Measurement.PERCENTAGE_ICU: "last",
+        Measurement.PERCENTAGE_FIRST_DOSE: "last",
+        Measurement.PERCENTAGE_COMPLETED_VACCINATION: "last",
+        Measurement.PERCENTAGE_EXTRA_DOSE: "last"
+    }
+    FLOAT_MEASUREMENTS = [Measurement.ACCUMULATED_INCIDENCE, Measurement.PERCENTAGE_ADMITTED, Measurement.PERCENTAGE_ICU,
+                          Measurement.PERCENTAGE_FIRST_DOSE, Measurement.PERCENTAGE_COMPLETED_VACCINATION,
+                          Measurement.PERCENTAGE_EXTRA_DOSE]
+    WEEKLY_SUFFIX = "_weekly"
+    MONTHLY_SUFFIX = "_monthly"
 
     def __init__(self):
         self._client = None
+        # Query results of the current run, by measurement and then by (query, key)
+        self._cache = defaultdict(dict)
+        # Points waiting to be written and the running totals they carry, by measurement and then by ccaa
+        self._points = []
+        self._total_points = []
+        self._buffered_measurements = set()
+        self._buffered_totals = defaultdict(dict)
+        # Days whose weeks and months have to be rolled up again once their points are written
+        self._rollup_days = defaultdict(set)
+        self._retention_policies_ready = False
 
     @property
     def client(self):
         if self._client is None:
             host = os.environ.get("INFLUX_HOST", "localhost")
-            self._client = InfluxDBClient(host, 8086, None, None, "covid19")
+            gzip = os.environ.get("INFLUX_GZIP", "false").lower() == "true"
+            self._client = InfluxDBClient(host, 8086, None, None, "covid19", gzip=gzip)
 
         return self._client
 
-    def insert_stats(self, measurement: Measurement, date, data):
+    def insert_stats(self, measurement: Measurement, date, data, previous_accumulated=None):
+        influx_data = self._get_points(measurement.value, date, data)
+
+        if measurement in self.ACCUMULATED_MEASUREMENTS:
+            # Callers that have just read the running totals before this day pass them to save a query
+            if previous_accumulated is None:
+                previous_accumulated = self._get_previous_accumulated(measurement, date, data.keys())
+            accumulated = {ccaa: previous_accumulated.get(ccaa, 0) + data[ccaa] for ccaa in data}
+            self._total_points += self._get_points(measurement.value + self.ACCUMULATED_SUFFIX, date, accumulated)
+            self._buffered_totals[measurement].update({ccaa: (date, accumulated[ccaa]) for ccaa in accumulated})
+
+        # Points are buffered until flush is called, they are read back or the batch is full
+        self._points += influx_data
+        self._buffered_measurements.add(measurement)
+        self._cache.pop(measurement, None)
+
+        if self._rollups_enabled() and measurement in self.ROLLUP_AGGREGATIONS:
+            self._rollup_days[measurement].add(date)
+
+        if len(self._points) + len(self._total_points) >= self._get_batch_size():
+            self.flush()
+
+    def flush(self):
+        points, total_points, rollup_days = self._points, self._total_points, dict(self._rollup_days)
+
+        # The buffer is dropped even if the write fails. Otherwise, the next read would write the stale points and
+        # the job would consider its report stored instead of running again.
+        self._points = []
+        self._total_points = []
+        self._buffered_measurements.clear()
+        self._buffered_totals.clear()
+        self._rollup_days.clear()
+
+        time_precision = os.environ.get("INFLUX_TIME_PRECISION", "s")
+
+        if points:
+            self.client.write_points(points, time_precision=time_precision, batch_size=self._get_batch_size())
+
+        if total_points:
+            self._create_retention_policies()
+            self.client.write_points(total_points, time_precision=time_precision, batch_size=self._get_batch_size(),
+                                     retention_policy=self._get_rollup_retention_policy())
+
+        if rollup_days:
+            self.update_rollups(rollup_days)
+
+    @staticmethod
+    def _rollups_enabled():
+        return os.environ.get("INFLUX_ROLLUPS", "false").lower() == "true"
+
+    @staticmethod
+    def _get_rollup_retention_policy():
+        return os.environ.get("INFLUX_ROLLUP_RETENTION_POLICY", "rollups")
+
+    def update_rollups(self, days_by_measurement):
+        # Weeks and months containing the given days are aggregated again from the daily points. Rollups are
+        # kept in their own retention policy, like running totals, so they are not removed with the daily points.
+        self._create_retention_policies()
+
+        queries = [query for measurement, days in days_by_measurement.items()
+                   for query in self._get_rollup_queries(measurement, days)]
+
+        if queries:
+            self.client.query("".join(queries))
+
+    def _create_retention_policies(self):
+        if self._retention_policies_ready:
+            return
+
+        policies = self.client.get_list_retention_policies()
+        rollup_policy = self._get_rollup_retention_policy()
+
+        if rollup_policy not in [policy["name"] for policy in policies]:
+            self.client.create_retention_policy(rollup_policy, os.environ.get("INFLUX_ROLLUP_RETENTION", "INF"), 1)
+
+        raw_retention = os.environ.get("INFLUX_RAW_RETENTION")
+        if raw_retention:
+            default_policy = next(policy["name"] for policy in policies if policy["default"])
+            self.client.alter_retention_policy(default_policy, duration=raw_retention)
+
+        self._retention_policies_ready = True
+
+    def _get_rollup_queries(self, measurement: Measurement, days):
+        periods = set()
+        for day in days:
+            monday = day.date() - timedelta(day.weekday())
+            first_of_month = day.date().replace(day=1)
+            periods.add((self.WEEKLY_SUFFIX, monday, monday + timedelta(7)))
+            periods.add((self.MONTHLY_SUFFIX, first_of_month, (first_of_month + timedelta(32)).replace(day=1)))
+
+        # Without GROUP BY time(), SELECT INTO writes selectors like last() at the timestamp of the selected point.
+        # A single bucket spanning the period, offset from the epoch so it starts on the first day, makes every
+        # rollup land on the start of its period and a later recalculation overwrite it.
+        return [f"SELECT {self.ROLLUP_AGGREGATIONS[measurement]}(value) AS value "
+                f"INTO {self._get_rollup_measurement_name(measurement, suffix)} FROM {measurement.value} where "
+                f"time >= '{start.strftime(self.DATE_FORMAT)}' and time < '{end.strftime(self.DATE_FORMAT)}' "
+                f"group by {self._get_period_bucket(start, end)}, ccaa;" for suffix, start, end in sorted(periods)]
+
+    @staticmethod
+    def _get_period_bucket(start, end):
+        days = (end - start).days
+        return f"time({days}d, {(start - date(1970, 1, 1)).days % days}d)"
+
+    def _get_rollup_measurement_name(self, measurement: Measurement, suffix):
+        return f'"{self._get_rollup_retention_policy()}"."{measurement.value}{suffix}"'
+
+    def _get_weekly_rollup_query(self, measurement: Measurement, day):
+        monday = day + timedelta(0 - day.weekday())
+        aggregation = self.ROLLUP_AGGREGATIONS[measurement]
+        query = f"SELECT {aggregation}(value) FROM {self._get_rollup_measurement_name(measurement, self.WEEKLY_SUFFIX)} " \
+                f"where time = '{monday.strftime(self.DATE_FORMAT)}' group by ccaa;"
+        return measurement, query, aggregation
+
+    @staticmethod
+    def _get_batch_size():
+        return int(os.environ.get("INFLUX_BATCH_SIZE", "5000"))
+
+    def _get_previous_accumulated(self, measurement: Measurement, date, ccaas):
+        self._create_retention_policies()
+
+        # Running totals that are still buffered are newer than the ones stored in the database
+        buffered = {ccaa: total for ccaa, (day, total) in self._buffered_totals[measurement].items()
+                    if day.date() < date.date()}
+
+        if set(ccaas) - set(buffered):
+            stored = self._get_report(self._get_accumulated_query(measurement, date, "<"), "last")
+
+            # Running totals are started from the daily values when they do not exist yet
+            if set(ccaas) - set(buffered) - set(stored):
+                stored = {**self._get_report(self._get_sum_query(measurement, date, "<"), "sum"), **stored}
+
+            return {**stored, **buffered}
+
+        return buffered
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    @staticmethod
+    def _get_points(measurement_name, date, data):
         influx_data = []
         for ccaa in data:
             influx_data.append({
-                "measurement": measurement.value,
+                "measurement": measurement_name,
                 "time": date.date().isoformat(),
                 "tags": {
                     "ccaa": ccaa
@@ -51,39 +234,152 @@ class Influx:
                 }
             })
 
-        self.client.write_points(influx_data)
+        return influx_data
+
+    def _get_accumulated_measurement_name(self, measurement: Measurement):
+        # Running totals cannot be rebuilt once the daily points expire, so they are kept with the rollups
+        return f'"{self._get_rollup_retention_policy()}"."{measurement.value}{self.ACCUMULATED_SUFFIX}"'
+
+    def _get_accumulated_query(self, measurement: Measurement, day, operator="<="):
+        return f"SELECT last(value) FROM {self._get_accumulated_measurement_name(measurement)} where " \
+               f"time {operator} '{day.strftime(self.DATE_FORMAT)}' group by ccaa;"
+
+    def rebuild_accumulated_stats(self):
+        # Running totals are maintained on insertion. This rebuilds them from the daily values and
+        # must be run once for data inserted before they existed.
+        self.flush()
+        self._create_retention_policies()
+        for measurement in self.ACCUMULATED_MEASUREMENTS:
+            self.client.query(f"SELECT cumulative_sum(sum(value)) AS value "
+                              f"INTO {self._get_accumulated_measurement_name(measurement)} "
+                              f"FROM {measurement.value} where time >= '{self.FIRST_DAY}' and time <= now() "
+                              f"group by time(1d), ccaa fill(none);")
 
     def get_stat_group_by_week(self, measurement: Measurement, week_day):
+        return self._get_stat(self._get_stat_group_by_week_query(measurement, week_day))
+
+    def _get_stat_group_by_week_query(self, measurement: Measurement, week_day):
+        if self._rollups_enabled() and measurement in self.ROLLUP_AGGREGATIONS:
+            return self._get_weekly_rollup_query(measurement, week_day)
+
         week_monday = week_day + timedelta(0 - week_day.weekday())
         week_sunday = week_day + timedelta(6 - week_day.weekday())
         query = f"SELECT sum(value) FROM {measurement.value} where " \
                 f"time >= '{week_monday.strftime(self.DATE_FORMAT)}' and " \
                 f"time <= '{week_sunday.strftime(self.DATE_FORMAT)}' group by ccaa;"
-        return self._get_report(query)
+        return measurement, query, "sum"
+
+    def get_stat_group_by_day(self, measurement: Measurement, day, refresh=False):
+        return self._get_stat(self._get_stat_group_by_day_query(measurement, day), refresh)
 
-    def get_stat_group_by_day(self, measurement: Measurement, day):
+    def _get_stat_group_by_day_query(self, measurement: Measurement, day):
         query = f"SELECT sum(value) FROM {measurement.value} where " \
                 f"time = '{day.strftime(self.DATE_FORMAT)}' group by ccaa;"
-        return self._get_report(query)
+        return measurement, query, "sum"
 
     def get_stat_accumulated_until_day(self, measurement: Measurement, day):
-        query = f"SELECT sum(value) FROM {measurement.value} where " \
-                f"time <= '{day.strftime(self.DATE_FORMAT)}' group by ccaa;"
-        return self._get_report(query)
+        return self._get_accumulated_reports([measurement], day)[0]
+
+    def _get_accumulated_reports(self, measurements, day):
+        if set(self.ACCUMULATED_MEASUREMENTS).intersection(measurements):
+            self._create_retention_policies()
+
+        reports = self._get_reports([self._get_stat_accumulated_until_day_query(measurement, day)
+                                     for measurement in measurements])
+
+        # Running totals do not exist for data inserted before them unless rebuild_accumulated_stats has been run.
+        # The CCAAs without running total are summed from the daily values.
+        incomplete = [position for position, measurement in enumerate(measurements)
+                      if measurement in self.ACCUMULATED_MEASUREMENTS and not set(CCAAS).issubset(reports[position])]
+
+        if incomplete:
+            logging.warning("Running totals are incomplete, run rebuild_accumulated_stats to build them")
+            sums = self._get_reports([(measurements[position], self._get_sum_query(measurements[position], day), "sum")
+                                      for position in incomplete])
+            for position, report in zip(incomplete, sums):
+                reports[position] = {**report, **reports[position]}
+
+        return reports
+
+    def _get_stat_accumulated_until_day_query(self, measurement: Measurement, day):
+        if measurement in self.ACCUMULATED_MEASUREMENTS:
+            return measurement, self._get_accumulated_query(measurement, day), "last"
+
+        return measurement, self._get_sum_query(measurement, day), "sum"
+
+    def _get_sum_query(self, measurement: Measurement, day, operator="<="):
+        return f"SELECT sum(value) FROM {measurement.value} where " \
+               f"time {operator} '{day.strftime(self.DATE_FORMAT)}' group by ccaa;"
 
     def get_last_value_from_week(self, mesaurement: Measurement, day):
+        return self._get_stat(self._get_last_value_from_week_query(mesaurement, day))
+
+    def _get_last_value_from_week_query(self, mesaurement: Measurement, day):
+        if self._rollups_enabled() and mesaurement in self.ROLLUP_AGGREGATIONS:
+            return self._get_weekly_rollup_query(mesaurement, day)
+
         monday = day + timedelta(0 - day.weekday())
         sunday = day + timedelta(6 - day.weekday())
 
         query = f"SELECT * FROM {mesaurement.value} where " \
                 f"time >= '{monday.strftime(self.DATE_FORMAT)} 00:00:00' and " \
                 f"time <= '{sunday.strftime(self.DATE_FORMAT)} 23:59:59' " \
-                f"group by ccaa order by desc limit 1"
+                f"group by ccaa order by desc limit 1;"
 
-        return self._get_report(query, "value")
+        return mesaurement, query, "value"
 
     def _get_report(self, query, key="sum"):
-        query_result = self.client.query(query)
+        return self._parse_report(self.client.query(query), key)
+
+    def _get_stat(self, query, refresh=False):
+        return self._get_reports([query], refresh)[0]
+
+    def _get_reports(self, queries, refresh=False):
+        # Only the queries whose results are not cached yet are sent to the database. Results are
+        # evicted when new stats are inserted into their measurement.
+        if self._buffered_measurements.intersection(measurement for measurement, _, _ in queries):
+            self.flush()
+
+        if refresh:
+            for measurement, query, key in queries:
+                self._cache[measurement].pop((query, key), None)
+
+        pending = list(dict.fromkeys(filter(lambda x: (x[1], x[2]) not in self._cache[x[0]], queries)))
+
+        if pending:
+            reports = self._run_queries([(query, key) for _, query, key in pending])
+            for (measurement, query, key), report in zip(pending, reports):
+                self._cache[measurement][(query, key)] = report
+
+        return [dict(self._cache[measurement][(query, key)]) for measurement, query, key in queries]
+
+    def _run_queries(self, queries):
+        workers = int(os.environ.get("INFLUX_QUERY_WORKERS", "0"))
+
+        if workers > 1:
+            return self._get_reports_concurrently(queries, workers)
+
+        # Send all the statements in a single request. The client returns a single ResultSet
+        # when only one statement is sent and a list of ResultSets (one per statement) otherwise.
+        query_results = self.client.query("".join(query for query, _ in queries))
+        if not isinstance(query_results, list):
+            query_results = [query_results]
+
+        return [self._parse_report(query_result, key) for query_result, (_, key) in zip(query_results, queries)]
+
+    def _get_reports_concurrently(self, queries, workers):
+        timeout = float(os.environ.get("INFLUX_QUERY_TIMEOUT", "30"))
+        executor = ThreadPoolExecutor(max_workers=workers)
+
+        try:
+            futures = [executor.submit(self._get_report, query, key) for query, key in queries]
+            # Results are collected in submission order so they match the order of the queries
+            return [future.result(timeout=timeout) for future in futures]
+        finally:
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def _parse_report(query_result, key):
         ccaa_map = {}
 
         for item in query_result.items():
@@ -92,73 +388,52 @@ class Influx:
 
         return ccaa_map
 
+    def _get_all_stats(self, queries):
+        reports = self._get_reports(queries)
+
+        return self._pack_elements(**{measurement.value: report
+                                      for (measurement, _, _), report in zip(queries, reports)})
+
     def get_all_stats_group_by_week(self, day):
-        pcrs = self.get_stat_group_by_week(Measurement.PCRS, day)
-        deaths = self.get_stat_group_by_week(Measurement.DEATHS, day)
-        admitted = self.get_stat_group_by_week(Measurement.ADMITTED_PEOPLE, day)
-        icu = self.get_stat_group_by_week(Measurement.ICU_PEOPLE, day)
-        accumulated_incidence = self.get_last_value_from_week(Measurement.ACCUMULATED_INCIDENCE, day)
-        percentage_admitted = self.get_last_value_from_week(Measurement.PERCENTAGE_ADMITTED, day)
-        percentage_icu = self.get_last_value_from_week(Measurement.PERCENTAGE_ICU, day)
-        vaccinations = self.get_stat_group_by_week(Measurement.VACCINATIONS, day)
-        completed_vaccinations = self.get_stat_group_by_week(Measurement.COMPLETED_VACCINATIONS, day)
-
-        return self._pack_elements(**{
-            Measurement.PCRS.value: pcrs,
-            Measurement.DEATHS.value: deaths,
-            Measurement.ADMITTED_PEOPLE.value: admitted,
-            Measurement.ICU_PEOPLE.value: icu,
-            Measurement.ACCUMULATED_INCIDENCE.value: accumulated_incidence,
-            Measurement.PERCENTAGE_ICU.value: percentage_icu,
-            Measurement.PERCENTAGE_ADMITTED.value: percentage_admitted,
-            Measurement.VACCINATIONS.value: vaccinations,
-            Measurement.COMPLETED_VACCINATIONS.value: completed_vaccinations
-        })
+        return self._get_all_stats([
+            self._get_stat_group_by_week_query(Measurement.PCRS, day),
+            self._get_stat_group_by_week_query(Measurement.DEATHS, day),
+            self._get_stat_group_by_week_query(Measurement.ADMITTED_PEOPLE, day),
+            self._get_stat_group_by_week_query(Measurement.ICU_PEOPLE, day),
+            self._get_last_value_from_week_query(Measurement.ACCUMULATED_INCIDENCE, day),
+            self._get_last_value_from_week_query(Measurement.PERCENTAGE_ICU, day),
+            self._get_last_value_from_week_query(Measurement.PERCENTAGE_ADMITTED, day),
+            self._get_stat_group_by_week_query(Measurement.VACCINATIONS, day),
+            self._get_stat_group_by_week_query(Measurement.COMPLETED_VACCINATIONS, day)
+        ])
 
     def get_all_stats_group_by_day(self, day):
-        pcrs = self.get_stat_group_by_day(Measurement.PCRS, day)
-        deaths = self.get_stat_group_by_day(Measurement.DEATHS, day)
-        admitted = self.get_stat_group_by_day(Measurement.ADMITTED_PEOPLE, day)
-        icu = self.get_stat_group_by_day(Measurement.ICU_PEOPLE, day)
-        accumulated_incidence = self.get_stat_group_by_day(Measurement.ACCUMULATED_INCIDENCE, day)
-        percentage_admitted = self.get_stat_group_by_day(Measurement.PERCENTAGE_ADMITTED, day)
-        percentage_icu = self.get_stat_group_by_day(Measurement.PERCENTAGE_ICU, day)
-        vaccinations = self.get_stat_group_by_day(Measurement.VACCINATIONS, day)
-        completed_vaccinations = self.get_stat_group_by_day(Measurement.COMPLETED_VACCINATIONS, day)
-
-        return self._pack_elements(**{
-            Measurement.PCRS.value: pcrs,
-            Measurement.DEATHS.value: deaths,
-            Measurement.ADMITTED_PEOPLE.value: admitted,
-            Measurement.ICU_PEOPLE.value: icu,
-            Measurement.ACCUMULATED_INCIDENCE.value: accumulated_incidence,
-            Measurement.PERCENTAGE_ADMITTED.value: percentage_admitted,
-            Measurement.PERCENTAGE_ICU.value: percentage_icu,
-            Measurement.VACCINATIONS.value: vaccinations,
-            Measurement.COMPLETED_VACCINATIONS.value: completed_vaccinations
-        })
+        measurements = [Measurement.PCRS, Measurement.DEATHS, Measurement.ADMITTED_PEOPLE, Measurement.ICU_PEOPLE,
+                        Measurement.ACCUMULATED_INCIDENCE, Measurement.PERCENTAGE_ADMITTED, Measurement.PERCENTAGE_ICU,
+                        Measurement.VACCINATIONS, Measurement.COMPLETED_VACCINATIONS]
+
+        return self._get_all_stats([self._get_stat_group_by_day_query(measurement, day)
+                                    for measurement in measurements])
 
     def get_all_stats_accumulated_until_day(self, day):
-        pcrs = self.get_stat_accumulated_until_day(Measurement.PCRS, day)
-        deaths = self.get_stat_accumulated_until_day(Measurement.DEATHS, day)
-        vaccinations = self.get_stat_accumulated_until_day(Measurement.VACCINATIONS, day)
-        completed_vaccinations = self.get_stat_accumulated_until_day(Measurement.COMPLETED_VACCINATIONS, day)
-
-        return self._pack_elements(**{
-            Measurement.PCRS.value: pcrs,
-            Measurement.DEATHS.value: deaths,
-            Measurement.VACCINATIONS.value: vaccinations,
-            Measurement.COMPLETED_VACCINATIONS.value: completed_vaccinations
-        })
+        return self.get_stats_accumulated_until_day([Measurement.PCRS, Measurement.DEATHS, Measurement.VACCINATIONS,
+                                                     Measurement.COMPLETED_VACCINATIONS], day)
 
-    @staticmethod
-    def _pack_elements(*_, **kwargs):
+    def get_stats_accumulated_until_day(self, measurements, day):
+        reports = self._get_accumulated_reports(measurements, day)
+
+        return self._pack_elements(**{measurement.value: report for measurement, report in zip(measurements, reports)})
 
-        keys = set([key for arg in kwargs for key in kwargs[arg].keys()])
+    @classmethod
+    def _pack_elements(cls, *_, **kwargs):
+        # One row per CCAA and one column per measurement. Missing values are kept as NA and each column
+        # keeps its own type, so counts are still integers and ratios are still floats even when they are whole.
+        columns = {Measurement(measurement): cls._get_column(Measurement(measurement), kwargs[measurement])
+                   for measurement in kwargs}
 
-        result = defaultdict(lambda: dict())
-        for key in keys:
-            for measurement in kwargs:
-                result[key][Measurement(measurement)] = kwargs[measurement].get(key, None)
+        return pd.DataFrame(columns, columns=list(columns)).sort_index()
 
-        return result
+    @classmethod
+    def _get_column(cls, measurement: Measurement, values):
+        column = pd.Series(values, dtype=object)
+        return column.astype("Float64") if measurement in cls.FLOAT_MEASUREMENTS else column.convert_dtypes()
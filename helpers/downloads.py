@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import hashlib
+from tempfile import gettempdir
+from urllib.parse import urlparse
+from helpers.http_client import http_client
+
+
+class DownloadCache:
+
+    def __init__(self, cache_dir=None):
+        self._cache_dir = cache_dir
+
+    @property
+    def cache_dir(self):
+        if self._cache_dir is None:
+            self._cache_dir = os.environ.get("DOWNLOAD_CACHE_DIR", os.path.join(gettempdir(), "covid19spainbot"))
+
+        os.makedirs(self._cache_dir, exist_ok=True)
+        return self._cache_dir
+
+    def get(self, url):
+        file_path = self._get_file_path(url)
+        metadata_path = file_path + ".json"
+        metadata = self._read_metadata(metadata_path) if os.path.exists(file_path) else {}
+
+        # The file is only downloaded again if it has changed since the last time it was requested
+        headers = {}
+        if metadata.get("etag"):
+            headers["If-None-Match"] = metadata["etag"]
+        if metadata.get("last_modified"):
+            headers["If-Modified-Since"] = metadata["last_modified"]
+
+        # The response is streamed, so it must be closed to give its connection back to the pool
+        with http_client.get(url, headers=headers, stream=True) as response:
+            if response.status_code != 304:
+                response.raise_for_status()
+                self._write_file(file_path, response)
+                self._write_metadata(metadata_path, {"url": url,
+                                                     "etag": response.headers.get("ETag"),
+                                                     "last_modified": response.headers.get("Last-Modified")})
+                self._evict(file_path)
+
+        # The access time tells which files have been used less recently when the cache is full
+        os.utime(file_path, (time.time(), os.path.getmtime(file_path)))
+        return file_path
+
+    def _evict(self, current_path):
+        # Metadata, partial downloads and the renders directory are not counted. Metadata goes with its file.
+        entries = [entry for entry in os.scandir(self.cache_dir)
+                   if entry.is_file() and not entry.name.endswith((".json", ".part")) and entry.path != current_path]
+        size = os.path.getsize(current_path) + sum(entry.stat().st_size for entry in entries)
+        max_size = self._get_max_size()
+
+        for entry in sorted(entries, key=lambda x: x.stat().st_atime):
+            if size <= max_size:
+                break
+
+            size -= entry.stat().st_size
+            os.remove(entry.path)
+
+            if os.path.exists(entry.path + ".json"):
+                os.remove(entry.path + ".json")
+
+    def _get_file_path(self, url):
+        extension = os.path.splitext(urlparse(url).path)[1]
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + extension)
+
+    @staticmethod
+    def _write_file(file_path, response):
+        # Write to a temporary file first so an interrupted download never replaces a valid file
+        temp_path = file_path + ".part"
+        with open(temp_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                f.write(chunk)
+
+        os.replace(temp_path, file_path)
+
+    @staticmethod
+    def _read_metadata(metadata_path):
+        try:
+            with open(metadata_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_metadata(metadata_path, metadata):
+        with open(metadata_path, "w") as f:
+            json.dump(metadata, f)
+
+    @staticmethod
+    def _get_max_size():
+        return int(os.environ.get("DOWNLOAD_CACHE_MAX_SIZE", str(200 * 1024 * 1024)))
+
+
+class RenderCache:
+
+    def __init__(self, cache_dir=None):
+        self._cache_dir = cache_dir
+
+    @property
+    def cache_dir(self):
+        if self._cache_dir is None:
+            self._cache_dir = os.environ.get("RENDER_CACHE_DIR",
+                                             os.path.join(gettempdir(), "covid19spainbot", "renders"))
+
+        os.makedirs(self._cache_dir, exist_ok=True)
+        return self._cache_dir
+
+    def get(self, url):
+        file_path = self._get_file_path(url)
+
+        try:
+            # Renders use relative time ranges and new data, so they expire after a while
+            if time.time() - os.path.getmtime(file_path) > self._get_ttl():
+                return None
+
+            with open(file_path, "rb") as f:
+                content = f.read()
+        except OSError:
+            return None
+
+        # The access time tells which renders have been used less recently when the cache is full
+        os.utime(file_path, (time.time(), os.path.getmtime(file_path)))
+        return content
+
+    def put(self, url, content):
+        file_path = self._get_file_path(url)
+        temp_path = file_path + ".part"
+
+        with open(temp_path, "wb") as f:
+            f.write(content)
+
+        os.replace(temp_path, file_path)
+        self._evict()
+
+    def _evict(self):
+        entries = [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith(".png")]
+        size = sum(entry.stat().st_size for entry in entries)
+        max_size = self._get_max_size()
+
+        for entry in sorted(entries, key=lambda x: x.stat().st_atime):
+            if size <= max_size:
+                break
+
+            size -= entry.stat().st_size
+            os.remove(entry.path)
+
+    def _get_file_path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".png")
+
+    @staticmethod
+    def _get_ttl():
+        return float(os.environ.get("RENDER_CACHE_TTL", "3600"))
+
+    @staticmethod
+    def _get_max_size():
+        return int(os.environ.get("RENDER_CACHE_MAX_SIZE", str(50 * 1024 * 1024)))
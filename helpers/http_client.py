@@ -0,0 +1,40 @@
+import os
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class HttpClient:
+    RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+    def __init__(self):
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            # Connections are kept alive and shared by ministry downloads, Grafana renders and media uploads
+            retries = Retry(total=int(os.environ.get("HTTP_RETRIES", "3")),
+                            backoff_factor=float(os.environ.get("HTTP_BACKOFF_FACTOR", "0.5")),
+                            status_forcelist=self.RETRY_STATUSES, allowed_methods=["HEAD", "GET"],
+                            raise_on_status=False)
+            adapter = HTTPAdapter(pool_maxsize=int(os.environ.get("HTTP_POOL_SIZE", "10")), max_retries=retries)
+
+            self._session = requests.Session()
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+
+        return self._session
+
+    def get(self, url, **kwargs):
+        return self.session.get(url, timeout=self._get_timeout(), **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.session.head(url, timeout=self._get_timeout(), **kwargs)
+
+    @staticmethod
+    def _get_timeout():
+        return float(os.environ.get("HTTP_TIMEOUT", "60"))
+
+
+http_client = HttpClient()
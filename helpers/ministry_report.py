@@ -1,29 +1,35 @@
 from datetime import datetime
-from tempfile import NamedTemporaryFile
-from constants import DAYS_WITHOUT_REPORT
+from copy import copy
+from helpers.report_calendar import report_calendar
 import math
-import re
-import tabula
+import numpy as np
+import pandas as pd
+from helpers import tabula_server
 from pandas_ods_reader import read_ods
 from abc import ABC, abstractmethod
-import requests
+from helpers.http_client import http_client
+from helpers.downloads import DownloadCache
+from helpers.spain_geography import normalize_ccaa_name
+
+downloads = DownloadCache()
 
 
 class GenericMinistryReport(ABC):
 
+    VALUE_REPLACEMENTS = [('.', ''), ('-', '0'), (',', '.'), ('%', '')]
+
     def __init__(self, date, page, area=None):
         self._date = date
         self._page = page
         self._area = area
         self._data_frame = None
+        # Downloaded file and tables extracted from it. Shared with the reports returned by get_page.
+        self._document = {}
 
     @property
     def data_frame(self):
         if self._data_frame is None:
-            col2str = {'dtype': str}
-            data_frames = tabula.read_pdf(self._get_url(), pages=str(self._page), area=self._area,
-                                          pandas_options=col2str)
-            self._data_frame = list(filter(lambda x: len(x) >= 19, data_frames))[0]
+            self._data_frame = list(filter(lambda x: len(x) >= 19, self._get_tables()))[0]
 
             for column in self._data_frame:
                 self._data_frame[column.replace('*', '').strip()] = self._data_frame.pop(column)
@@ -34,21 +40,72 @@ class GenericMinistryReport(ABC):
     def _get_url(self):
         pass
 
+    def get_page(self, page, area=None):
+        report = copy(self)
+        report._page = page
+        report._area = area
+        report._data_frame = None
+
+        return report
+
+    def _get_tables(self):
+        key = (self._page, self._area)
+
+        if key not in self._document:
+            col2str = {'dtype': str}
+            self._document[key] = tabula_server.read_pdf(self._get_file(), pages=str(self._page), area=self._area,
+                                                         pandas_options=col2str)
+
+        return self._document[key]
+
+    def _get_file(self):
+        if "file" not in self._document:
+            self._document["file"] = downloads.get(self._get_url())
+
+        return self._document["file"]
+
+    def is_available(self):
+        url = self._get_url()
+        response = http_client.head(url, allow_redirects=True)
+
+        if response.status_code in (405, 501):
+            # Some servers do not implement HEAD. Request just the first byte instead.
+            response = http_client.get(url, headers={"Range": "bytes=0-0"}, stream=True)
+            response.close()
+
+        return response.ok
+
     def get_column_data(self, column, part=0, cast=int, num_rows=19):
+        return self.get_columns_data([column], part, cast, num_rows)[0]
+
+    def get_columns_data(self, columns, part=0, cast=int, num_rows=19):
+        rows = self._get_ccaa_rows(num_rows)
+        ccaas = self._get_ccaa_names(rows)
+
+        result = []
+        for column in columns:
+            values = self.data_frame.loc[rows, self.data_frame.columns[column]].map(str).str.split(' ').str[part]
+
+            if values.isna().any():
+                raise IndexError(f"Part {part} not found in column {column}")
+
+            values = values.str.replace("\\.\\d$", "", regex=True)
+            for old, new in self.VALUE_REPLACEMENTS:
+                values = values.str.replace(old, new, regex=False)
+
+            result.append(dict(zip(ccaas, map(cast, values))))
+
+        return result
+
+    def _get_ccaa_rows(self, num_rows):
         first_column = self.data_frame.columns[0]
         ccaas_column = self.data_frame[first_column].astype(str)
         first_ccaa_position = ccaas_column.loc[ccaas_column.str.startswith('Andalucía', na=False)].index[0]
 
-        cases = {}
-        for i in range(first_ccaa_position, first_ccaa_position + num_rows):
-            ccaa = self.data_frame[first_column][i].replace('*', '').replace('(', '').replace(')', '').replace('Leon', 'León').strip().replace('\r', ' ').replace('-', '').replace(' arra', 'arra')
-            ccaa = ' '.join(ccaa.split())
-            value_str = str(self.data_frame[self.data_frame.columns[column]][i]).split(' ')[part]
-            value_str = re.sub("\\.\\d$", "", value_str)
-            value = value_str.replace('.', '').replace('-', '0').replace(',', '.').replace('%', '')
-            cases[ccaa] = cast(value)
+        return list(range(first_ccaa_position, first_ccaa_position + num_rows))
 
-        return cases
+    def _get_ccaa_names(self, rows):
+        return [normalize_ccaa_name(ccaa) for ccaa in self.data_frame.loc[rows, self.data_frame.columns[0]]]
 
 
 class SpainCovid19MinistryReport(GenericMinistryReport):
@@ -56,24 +113,33 @@ class SpainCovid19MinistryReport(GenericMinistryReport):
     PDF_URL_FORMAT = "https://www.mscbs.gob.es/en/profesionales/saludPublica/ccayes/alertasActual/nCov-China/" \
                      "documentos/Actualizacion_{0}_COVID-19.pdf"
 
+    # 14/5/2020 -> id: 105
+    # Starting on 4/7/2020, Spanish Public Health Ministry does not publish reports at weekends.
+    REFERENCE_DATE = datetime(2020, 5, 14)
+    REFERENCE_PDF_ID = 105
+    INITIAL_WEEKEND_WITHOUT_REPORT = datetime(2020, 7, 4)
+
     def _get_url(self):
         return self.PDF_URL_FORMAT.format(self.get_cases_pdf_id_for_date(self._date))
 
-    @staticmethod
-    def get_cases_pdf_id_for_date(date):
-        # 14/5/2020 -> id: 105
-        # Starting on 4/7/2020, Spanish Public Health Ministry does not publish reports at weekends.
-        reference_date = datetime(2020, 5, 14)
-        initial_weekend_without_report = datetime(2020, 7, 4)
-        weekends = math.ceil((date - initial_weekend_without_report).days / 7) \
-            if date > initial_weekend_without_report else 0
-        pdf_id = 105 + (date - reference_date).days - weekends * 2
+    @classmethod
+    def get_cases_pdf_id_for_date(cls, date):
+        weekends = math.ceil((date - cls.INITIAL_WEEKEND_WITHOUT_REPORT).days / 7) \
+            if date > cls.INITIAL_WEEKEND_WITHOUT_REPORT else 0
+        return cls.REFERENCE_PDF_ID + (date - cls.REFERENCE_DATE).days - weekends * 2 - \
+            report_calendar.count_days_without_report_before(date)
 
-        for day_without_report in DAYS_WITHOUT_REPORT:
-            if date.date() > day_without_report:
-                pdf_id -= 1
+    @classmethod
+    def get_cases_pdf_ids_for_dates(cls, dates):
+        dates = pd.DatetimeIndex(dates)
+        weekends = np.where(dates > cls.INITIAL_WEEKEND_WITHOUT_REPORT,
+                            np.ceil((dates - cls.INITIAL_WEEKEND_WITHOUT_REPORT).days / 7), 0).astype(int)
+        return cls.REFERENCE_PDF_ID + (dates - cls.REFERENCE_DATE).days.values - weekends * 2 - \
+            report_calendar.count_days_without_report_before_dates(dates.normalize())
 
-        return pdf_id
+    @classmethod
+    def get_cases_pdf_urls_for_dates(cls, dates):
+        return [cls.PDF_URL_FORMAT.format(pdf_id) for pdf_id in cls.get_cases_pdf_ids_for_dates(dates)]
 
 
 class VaccinesMinistryReport(GenericMinistryReport):
@@ -88,12 +154,6 @@ class VaccinesMinistryReport(GenericMinistryReport):
     @property
     def data_frame(self):
         if self._data_frame is None:
-            with NamedTemporaryFile(mode='wb', suffix=".ods") as f:
-                req = requests.get(self._get_url())
-                req.raise_for_status()
-                f.write(req.content)
-                f.flush()
-
-                self._data_frame = read_ods(f.name, self._page)
+            self._data_frame = read_ods(self._get_file(), self._page)
 
         return self._data_frame
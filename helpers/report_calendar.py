@@ -0,0 +1,39 @@
+from bisect import bisect_left
+from datetime import date, timedelta
+import numpy as np
+from constants import DAYS_WITHOUT_REPORT
+
+
+class ReportCalendar:
+    # Until the 4th of July 2020, reports were published at weekends too
+    FIRST_WEEKEND_WITHOUT_REPORT = date(2020, 7, 4)
+
+    def __init__(self, days_without_report):
+        self._days_without_report = sorted(set(days_without_report))
+        self._days_without_report_set = frozenset(self._days_without_report)
+        self._days_without_report_array = np.array(self._days_without_report, dtype="datetime64[D]")
+
+    def is_report_day(self, day):
+        day = day.date()
+        return day < self.FIRST_WEEKEND_WITHOUT_REPORT or \
+            (day.weekday() < 5 and day not in self._days_without_report_set)
+
+    def get_previous_report_day(self, day, days=1):
+        result = day
+
+        while days > 0:
+            result = result - timedelta(days=1)
+
+            if self.is_report_day(result):
+                days -= 1
+
+        return result
+
+    def count_days_without_report_before(self, day):
+        return bisect_left(self._days_without_report, day.date())
+
+    def count_days_without_report_before_dates(self, days):
+        return np.searchsorted(self._days_without_report_array, days.values.astype("datetime64[D]"), side="left")
+
+
+report_calendar = ReportCalendar(DAYS_WITHOUT_REPORT)
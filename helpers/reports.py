@@ -1,8 +1,8 @@
 import os
-from collections import defaultdict
+import pandas as pd
 from helpers.db import Measurement
 from constants import GRAPH_IMAGE_PATH, SPAIN
-from helpers.spain_geography import CCAA_POPULATION, CCAA_ADMITTED_BEDS, CCAA_ICU_BEDS
+from helpers.spain_geography import CCAAS, CCAA_INDEX, POPULATION, ADMITTED_BEDS, ICU_BEDS, get_population
 
 
 def get_vaccination_report(ccaa, accumulated_completed_vaccination_data, today_completed_vaccination_data,
@@ -24,9 +24,7 @@ def get_vaccination_sentence(stat, accumulated, today_total):
 
 
 def get_completed_vaccination_sentence(territorial_unit, stat, accumulated, today_total):
-    population = CCAA_POPULATION[territorial_unit] if territorial_unit in CCAA_POPULATION \
-        else sum(CCAA_POPULATION.values())
-    percentage_population = accumulated / population * 100
+    percentage_population = accumulated / get_population(territorial_unit) * 100
     return "- {0}: {1} ({2}%) 🔺{3}".format(stat, _format_number(accumulated),
                                            _format_number(percentage_population),
                                            _format_number(today_total))
@@ -34,14 +32,22 @@ def get_completed_vaccination_sentence(territorial_unit, stat, accumulated, toda
 
 def get_report_by_ccaa(date_in_header, ccaas_today, ccaas_yesterday, ccaas_accumulated_today, vaccine_info=False):
     tweets = []
-    for ccaa in filter(lambda x: x in CCAA_POPULATION.keys(), sorted(ccaas_today.keys())):
-        tweets.append(get_territorial_unit_report(ccaa, date_in_header, ccaas_today[ccaa],
-                                                  ccaas_yesterday[ccaa], ccaas_accumulated_today[ccaa],
+    for ccaa in ccaas_today.index[ccaas_today.index.isin(CCAAS)]:
+        tweets.append(get_territorial_unit_report(ccaa, date_in_header, get_ccaa_data(ccaas_today, ccaa),
+                                                  get_ccaa_data(ccaas_yesterday, ccaa),
+                                                  get_ccaa_data(ccaas_accumulated_today, ccaa),
                                                   vaccination_info=vaccine_info))
 
     return tweets
 
 
+def get_ccaa_data(data, ccaa):
+    if ccaa not in data.index:
+        return {}
+
+    return {measurement: _to_number(data.at[ccaa, measurement]) for measurement in data.columns}
+
+
 def get_global_report(date_in_header, ccaas_today, ccaas_yesterday, ccaas_accumulated_today, vaccine_info=False):
     global_today_data = get_global_data(ccaas_today)
     global_yesterday_data = get_global_data(ccaas_yesterday)
@@ -51,43 +57,38 @@ def get_global_report(date_in_header, ccaas_today, ccaas_yesterday, ccaas_accumu
                                        global_accumulated_data, vaccination_info=vaccine_info)
 
 
-def get_global_data(dict_to_unpack):
-    keys = set([key for ccaa in dict_to_unpack for key in dict_to_unpack[ccaa].keys()])
-    ia_exists = Measurement.ACCUMULATED_INCIDENCE in keys
-    keys.discard(Measurement.ACCUMULATED_INCIDENCE)
+def get_global_data(data):
+    ccaas_data = data[data.index.isin(CCAAS)]
+    result = {measurement: _to_number(ccaas_data[measurement].sum()) for measurement in ccaas_data.columns}
 
-    result = defaultdict(lambda: 0)
-    for key in keys:
-        for ccaa in filter(lambda x: x in CCAA_POPULATION.keys(), dict_to_unpack.keys()):
-            result[key] += dict_to_unpack[ccaa][key] if dict_to_unpack[ccaa][key] else 0
-
-    if ia_exists:
-        result[Measurement.ACCUMULATED_INCIDENCE] = calculate_global_incidence(dict_to_unpack,
-                                                                               Measurement.ACCUMULATED_INCIDENCE)
-        result[Measurement.PERCENTAGE_ADMITTED] = calculate_global_incidence(dict_to_unpack,
-                                                                             Measurement.PERCENTAGE_ADMITTED)
-        result[Measurement.PERCENTAGE_ICU] = calculate_global_incidence(dict_to_unpack,
-                                                                        Measurement.PERCENTAGE_ICU)
+    if Measurement.ACCUMULATED_INCIDENCE in ccaas_data.columns:
+        result[Measurement.ACCUMULATED_INCIDENCE] = calculate_global_incidence(data, Measurement.ACCUMULATED_INCIDENCE)
+        result[Measurement.PERCENTAGE_ADMITTED] = calculate_global_incidence(data, Measurement.PERCENTAGE_ADMITTED)
+        result[Measurement.PERCENTAGE_ICU] = calculate_global_incidence(data, Measurement.PERCENTAGE_ICU)
 
     return result
 
 
-def calculate_global_incidence(dict_to_unpack, measurement):
+def calculate_global_incidence(data, measurement):
 
     population_to_compare = {
-        Measurement.ACCUMULATED_INCIDENCE.value: CCAA_POPULATION,
-        Measurement.PERCENTAGE_ADMITTED.value: CCAA_ADMITTED_BEDS,
-        Measurement.PERCENTAGE_ICU.value: CCAA_ICU_BEDS
+        Measurement.ACCUMULATED_INCIDENCE.value: POPULATION,
+        Measurement.PERCENTAGE_ADMITTED.value: ADMITTED_BEDS,
+        Measurement.PERCENTAGE_ICU.value: ICU_BEDS
     }[measurement.value]
 
-    total_cases = 0
-    population = 0
-    ccaas = filter(lambda x: x in CCAA_POPULATION.keys(), dict_to_unpack.keys())
-    for ccaa in ccaas:
-        total_cases += dict_to_unpack[ccaa][measurement] * population_to_compare[ccaa] / 100000
-        population += population_to_compare[ccaa]
+    if measurement not in data.columns:
+        return 0
+
+    ccaas_data = data.loc[data.index.isin(CCAAS), measurement]
+    ccaas_data = ccaas_data[ccaas_data.notna()]
+    values = ccaas_data.to_numpy(dtype=float)
+    population = population_to_compare[ccaas_data.index.map(CCAA_INDEX).to_numpy(dtype=int)]
 
-    return total_cases / population * 100000 if population else 0
+    total_cases = (values * population / 100000).sum()
+    total_population = population.sum()
+
+    return float(total_cases / total_population * 100000) if total_population else 0
 
 
 def get_territorial_unit_report(territorial_unit, header_date, today_data, yesterday_data, accumulated_today,
@@ -164,5 +165,12 @@ def get_graph_url(start=None, end=None, additional_vars=None, graph_path=GRAPH_I
     return os.path.join(grafana_server, graph_path) + start_str + end_str + vars_str
 
 
+def _to_number(value):
+    if pd.isna(value):
+        return None
+
+    return value.item() if hasattr(value, "item") else value
+
+
 def _format_number(number):
     return "{0:,}".format(round(number, 2)).replace(",", "#").replace(".", ",").replace("#", ".")
@@ -1,3 +1,7 @@
+from functools import lru_cache
+from types import MappingProxyType
+import numpy as np
+
 CCAA_POPULATION = {
     "Andalucía": 8464423,
     "Aragón": 1329389,
@@ -65,7 +69,44 @@ CCAA_ICU_BEDS = {
 }
 
 
+def _get_vector(values):
+    vector = np.array([values[ccaa] for ccaa in CCAAS], dtype=np.int64)
+    vector.flags.writeable = False
+    return vector
+
+
+# Every vector follows the order of CCAAS, so the position of a CCAA is the same in all of them
+CCAAS = tuple(CCAA_POPULATION)
+CCAA_INDEX = MappingProxyType({ccaa: index for index, ccaa in enumerate(CCAAS)})
+
+POPULATION = _get_vector(CCAA_POPULATION)
+ADMITTED_BEDS = _get_vector(CCAA_ADMITTED_BEDS)
+ICU_BEDS = _get_vector(CCAA_ICU_BEDS)
+
+SPAIN_POPULATION = int(POPULATION.sum())
+SPAIN_ADMITTED_BEDS = int(ADMITTED_BEDS.sum())
+SPAIN_ICU_BEDS = int(ICU_BEDS.sum())
+
+
+@lru_cache(maxsize=None)
+def normalize_ccaa_name(name):
+    # Names in the ministry reports come with notes, line breaks and typos
+    name = name.replace("*", "").replace("(", "").replace(")", "")
+    name = name.replace("Leon", "León").strip().replace("\r", " ")
+    name = name.replace("-", "").replace(" arra", "arra")
+
+    return " ".join(name.split())
+
+
+def get_ccaa_index(name):
+    return CCAA_INDEX.get(normalize_ccaa_name(name))
+
+
+def get_population(territorial_unit=None):
+    index = CCAA_INDEX.get(territorial_unit)
+    return int(POPULATION[index]) if index is not None else SPAIN_POPULATION
+
+
 def get_impact_string(total_cases, ccaa=None):
-    divider = CCAA_POPULATION[ccaa] if ccaa and ccaa in CCAA_POPULATION else sum(CCAA_POPULATION.values())
-    ccaa_impact = total_cases * 100000 / divider
+    ccaa_impact = total_cases * 100000 / get_population(ccaa)
     return "{0:.2f}".format(ccaa_impact).replace(".", ",") + "/100.000 hab." if total_cases > 0 else ""
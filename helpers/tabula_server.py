@@ -0,0 +1,81 @@
+import os
+import logging
+from io import BytesIO
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+import tabula
+
+
+def get_address():
+    address = os.environ.get("TABULA_SERVER")
+
+    if address:
+        host, port = address.rsplit(":", 1)
+        return host, int(port)
+
+    return None
+
+
+def get_authkey():
+    key = os.environ.get("TABULA_SERVER_KEY")
+    return key.encode("utf-8") if key else None
+
+
+def get_timeout():
+    return float(os.environ.get("TABULA_SERVER_TIMEOUT", "120"))
+
+
+def serve(port):
+    # Requests are unpickled, so the server only accepts local connections authenticated with a secret key
+    authkey = get_authkey()
+    if not authkey:
+        raise ValueError("TABULA_SERVER_KEY must be defined to start the tabula server")
+
+    # tabula-py keeps the JVM (jpype) alive inside this process, so only the first request pays its start up.
+    with Listener(("localhost", port), authkey=authkey) as listener:
+        logging.info(f"Tabula server listening on localhost:{port}")
+
+        while True:
+            try:
+                with listener.accept() as connection:
+                    _handle_request(connection)
+            except Exception:
+                logging.exception("Unhandled exception while serving a tabula request")
+
+
+def _handle_request(connection):
+    content, kwargs = connection.recv()
+
+    try:
+        connection.send((tabula.read_pdf(BytesIO(content), **kwargs), None))
+    except Exception as e:
+        connection.send((None, RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+def read_pdf(input_path, **kwargs):
+    address = get_address()
+    authkey = get_authkey()
+
+    if address and not authkey:
+        logging.warning("TABULA_SERVER_KEY is not defined. Tables will be extracted locally...")
+    elif address:
+        try:
+            with Client(address, authkey=authkey) as connection, open(input_path, "rb") as pdf_file:
+                # The contents of the PDF are sent, so the server does not need to access the client files
+                connection.send((pdf_file.read(), kwargs))
+
+                if not connection.poll(get_timeout()):
+                    raise TimeoutError("Tabula server did not answer in time")
+
+                data_frames, error = connection.recv()
+        except AuthenticationError:
+            logging.warning("Tabula server rejected TABULA_SERVER_KEY. Tables will be extracted locally...")
+        except (ConnectionError, EOFError, TimeoutError):
+            logging.warning("Tabula server is not available. Tables will be extracted locally...")
+        else:
+            if error:
+                raise error
+
+            return data_frames
+
+    return tabula.read_pdf(input_path, **kwargs)
@@ -1,18 +1,42 @@
 import os
 import re
-from tempfile import NamedTemporaryFile
+import time
+import logging
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 import tweepy
-import requests
+from helpers.http_client import http_client
+from helpers.downloads import RenderCache
+
+renders = RenderCache()
 
 
 class MediaNotAccessibleError(Exception):
     pass
 
 
+class TweetTooLongError(Exception):
+    pass
+
+
 class Twitter:
+    # Only used to tell Twitter the type of the uploaded images
+    MEDIA_FILE_NAME = "graph.png"
+    MAX_TWEET_LENGTH = 280
+    URL_LENGTH = 23
+    URL_AND_EMOJI_REGEX = re.compile("(?P<url>https?://\\S+)|"
+                                     "[\U0001F1E6-\U0001F1FF]{2}|"
+                                     "[0-9#*]\ufe0f?\u20e3|"
+                                     "(?:[\U00010000-\U0010ffff]|[\u00a9-\u3299]\ufe0f)"
+                                     "[\ufe0f\U0001F3FB-\U0001F3FF\U000E0020-\U000E007F]*"
+                                     "(?:\u200d(?:[\U00010000-\U0010ffff]|[\u00a9-\u3299])"
+                                     "[\ufe0f\U0001F3FB-\U0001F3FF]*)*")
+    DOUBLE_WEIGHT_REGEX = re.compile("[^\u0000-\u10ff\u2000-\u200d\u2010-\u201f\u2032-\u2037]")
 
     def __init__(self):
         self._client = None
+        self._executor = None
+        self._last_dm_time = None
 
     @property
     def client(self):
@@ -25,37 +49,101 @@ class Twitter:
 
         return self._client
 
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=2)
+
+        return self._executor
+
     def publish_tweets(self, tweets, last_tweet=None):
         for tweet in tweets:
             last_tweet = self.publish_tweet(tweet, last_tweet)
 
         return last_tweet
 
-    def publish_tweet(self, tweet, in_response_to=None):
+    def publish_tweet(self, tweet, in_response_to=None, media_ids=None):
+        if media_ids:
+            return self.client.update_status(tweet, in_response_to, media_ids=media_ids).id
+
         return self.client.update_status(tweet, in_response_to).id
 
+    def publish_thread(self, tweets, media=None, last_tweet=None):
+        # Every tweet is built and checked before the first one is published, so the thread is posted
+        # without pauses and it is never left half published
+        for tweet in tweets:
+            if self._get_tweet_length(tweet) > self.MAX_TWEET_LENGTH:
+                raise TweetTooLongError(f"Tweet is too long: {tweet}")
+
+        media_id = media.result() if media else None
+        last_tweet = self.publish_tweet(tweets[0], last_tweet, [media_id] if media_id else None)
+
+        return self.publish_tweets(tweets[1:], last_tweet)
+
     def send_dm(self, dm):
+        # When jobs are polled continuously, the same error would be sent on every poll
+        now = time.monotonic()
+        if self._last_dm_time is not None and now - self._last_dm_time < self._get_dm_min_interval():
+            logging.info("DM not sent, another one was sent recently")
+            return
+
         self.client.send_direct_message(self.client.get_user("aitormagan").id, dm)
+        self._last_dm_time = now
+
+    @staticmethod
+    def _get_dm_min_interval():
+        return float(os.environ.get("DM_MIN_INTERVAL", "300"))
+
+    def upload_media(self, media_url):
+        # The image is downloaded and uploaded in the background. The future returns the id to attach it to a
+        # tweet or None if it could not be downloaded.
+        return self.executor.submit(self._upload_media, media_url)
+
+    def _upload_media(self, media_url):
+        try:
+            media_file = self._download_media(media_url)
+        except MediaNotAccessibleError:
+            return None
+
+        with media_file:
+            return self.client.media_upload(self.MEDIA_FILE_NAME, file=media_file).media_id
 
-    def publish_tweet_with_media(self, tweet, media_url, in_response_to=None):
-        with NamedTemporaryFile(suffix=".png") as temp_file:
-            try:
-                self._download_file(media_url, temp_file)
-                return self.client.update_with_media(temp_file.name, tweet, in_reply_to_status_id=in_response_to).id
-            except MediaNotAccessibleError:
-                return self.publish_tweet(tweet, in_response_to)
+    def _download_media(self, media_url):
+        # Images are kept in memory and uploaded from there. Renders are cached, so reruns do not ask
+        # Grafana to render the same graph again.
+        content = self._get_cached_media(media_url)
+        if content is not None:
+            return BytesIO(content)
+
+        media_file = BytesIO()
+        self._download_file(media_url, media_file)
+        self._cache_media(media_url, media_file.getvalue())
+        media_file.seek(0)
+
+        return media_file
 
     @staticmethod
-    def _download_file(media_url, file):
-        get_request = requests.get(media_url)
+    def _get_cached_media(media_url):
+        try:
+            return renders.get(media_url)
+        except OSError:
+            return None
 
-        if get_request.status_code == 200:
-            for chunk in get_request:
-                file.write(chunk)
+    @staticmethod
+    def _cache_media(media_url, content):
+        try:
+            renders.put(media_url, content)
+        except OSError:
+            logging.warning("Rendered graph could not be cached", exc_info=True)
 
-            file.flush()
-        else:
-            raise MediaNotAccessibleError("File could not be downloaded")
+    @staticmethod
+    def _download_file(media_url, file):
+        with http_client.get(media_url, stream=True) as get_request:
+            if get_request.status_code == 200:
+                for chunk in get_request.iter_content(chunk_size=256 * 1024):
+                    file.write(chunk)
+            else:
+                raise MediaNotAccessibleError("File could not be downloaded")
 
     def publish_sentences_in_tweets(self, sentences, header=None, last_tweet=None):
         tweets = self._split_tweets(sentences, header)
@@ -68,21 +156,38 @@ class Twitter:
         # We assume that the total amount of tweets will be 9 or less...
         header_length = self._get_tweet_length(header_format.format(0, 0))
 
-        current_tweet = ""
+        current_tweet = []
+        current_length = 0
         for sentence in sentences:
-            # Twitter counts emoji as double characters...
-            if self._get_tweet_length(current_tweet) + self._get_tweet_length(sentence) + header_length > 280:
-                tweets.append(current_tweet.strip("\n"))
-                current_tweet = ""
+            # Lengths are added up while packing, so every sentence is only measured once
+            sentence_length = self._get_tweet_length(sentence)
+            if current_length + sentence_length + header_length > self.MAX_TWEET_LENGTH:
+                tweets.append("\n".join(current_tweet).strip("\n"))
+                current_tweet = []
+                current_length = 0
 
-            current_tweet += sentence + "\n"
+            current_tweet.append(sentence)
+            current_length += sentence_length + 1
 
-        tweets.append(current_tweet.strip("\n"))
+        tweets.append("\n".join(current_tweet).strip("\n"))
         tweets = list(filter(lambda x: x, tweets))
 
         return list(map(lambda x: header_format.format(x + 1, len(tweets)) + tweets[x], range(0, len(tweets))))
 
-    @staticmethod
-    def _get_tweet_length(sentence):
-        emoji_regex = re.compile('[\U00010000-\U0010ffff]', flags=re.UNICODE)
-        return len(sentence) + len(emoji_regex.findall(sentence))
+    @classmethod
+    def _get_tweet_length(cls, sentence):
+        # Weighted length as Twitter counts it: URLs count as 23 characters, emoji (with their modifiers)
+        # as 2 and characters out of the latin, punctuation and similar ranges (such as CJK) as 2
+        length = 0
+        position = 0
+
+        for match in cls.URL_AND_EMOJI_REGEX.finditer(sentence):
+            length += cls._get_text_length(sentence[position:match.start()])
+            length += cls.URL_LENGTH if match.group("url") else 2
+            position = match.end()
+
+        return length + cls._get_text_length(sentence[position:])
+
+    @classmethod
+    def _get_text_length(cls, text):
+        return len(text) + len(cls.DOUBLE_WEIGHT_REGEX.findall(text))
@@ -0,0 +1,90 @@
+import os
+import sys
+import logging
+import argparse
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from helpers.db import Measurement
+from helpers.report_calendar import report_calendar
+from main_daily import influx, get_report_data, get_today_numbers
+
+ACCUMULATED_STATS = [Measurement.PCRS, Measurement.DEATHS]
+DAILY_STATS = [Measurement.ACCUMULATED_INCIDENCE, Measurement.PERCENTAGE_ADMITTED, Measurement.PERCENTAGE_ICU]
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Ingest the ministry reports published between two dates")
+    parser.add_argument("start", type=parse_date, help="First day to ingest (YYYY-MM-DD)")
+    parser.add_argument("end", type=parse_date, help="Last day to ingest (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of processes parsing reports")
+    parser.add_argument("--rollups-only", action="store_true",
+                        help="Do not ingest reports, only rebuild the weekly and monthly rollups of the stored data")
+    args = parser.parse_args(args)
+
+    if args.rollups_only:
+        rebuild_rollups(args.start, args.end)
+    else:
+        backfill(get_report_days(args.start, args.end), args.workers)
+
+
+def parse_date(date_str):
+    return datetime.strptime(date_str, "%Y-%m-%d")
+
+
+def get_days(start, end):
+    return [start + timedelta(i) for i in range(0, (end - start).days + 1)]
+
+
+def get_report_days(start, end):
+    return list(filter(report_calendar.is_report_day, get_days(start, end)))
+
+
+def rebuild_rollups(start, end):
+    days = get_days(start, end)
+
+    # One request per measurement, as a long range means many weeks and months to aggregate
+    for measurement in influx.ROLLUP_AGGREGATIONS:
+        influx.update_rollups({measurement: days})
+        logging.info(f"Rollups of {measurement.value} rebuilt")
+
+
+def backfill(days, workers):
+    if not days:
+        return
+
+    previous_accumulated = {stat: influx.get_stat_accumulated_until_day(stat, days[0] - timedelta(1))
+                            for stat in ACCUMULATED_STATS}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Reports are parsed in parallel, but map returns them in order, so days are written one after
+        # another while the following reports are still being parsed.
+        for day, data in zip(days, executor.map(get_report_data_or_none, days)):
+            if data is None:
+                continue
+
+            for stat in ACCUMULATED_STATS:
+                influx.insert_stats(stat, day, get_today_numbers(data[stat], previous_accumulated[stat]))
+                previous_accumulated[stat] = {**previous_accumulated[stat], **data[stat]}
+
+            for stat in DAILY_STATS:
+                influx.insert_stats(stat, day, data[stat])
+
+            logging.info(f"Report for {day.strftime('%d/%m/%Y')} ingested")
+
+    influx.flush()
+
+
+def get_report_data_or_none(day):
+    try:
+        return get_report_data(day)
+    except Exception:
+        logging.exception(f"Report for {day.strftime('%d/%m/%Y')} could not be parsed")
+        return None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s',
+                        stream=sys.stdout)
+
+    main()
@@ -1,12 +1,12 @@
 import sys
 import logging
 from datetime import datetime, timedelta, date
-from urllib.error import HTTPError
+from requests.exceptions import HTTPError
 from helpers.twitter import Twitter
 from helpers.db import Influx, Measurement
 from helpers.ministry_report import SpainCovid19MinistryReport
 from helpers.reports import get_report_by_ccaa, get_graph_url, get_global_report
-from constants import DAYS_WITHOUT_REPORT
+from helpers.report_calendar import report_calendar
 
 twitter = Twitter()
 influx = Influx()
@@ -17,12 +17,13 @@ def main():
     today = datetime.now()
     yesterday = subtract_days_ignoring_weekends(today, 1)
 
-    data = influx.get_stat_group_by_day(Measurement.PCRS, today)
-
-    if not data:
+    if not is_report_published(today):
         try:
-            update_database(today)
-            publish_report(today, yesterday)
+            if SpainCovid19MinistryReport(today, 1).is_available():
+                update_database(today)
+                publish_report(today, yesterday)
+            else:
+                logging.info("PDF is not available yet...")
 
         except HTTPError:
             logging.info("PDF is not available yet...")
@@ -32,26 +33,46 @@ def main():
             twitter.send_dm(dm_text)
 
 
-def subtract_days_ignoring_weekends(initial_date, days_to_substract):
-    result = initial_date
+def is_report_published(today):
+    return bool(influx.get_stat_group_by_day(Measurement.PCRS, today, refresh=True))
+
 
-    while days_to_substract > 0:
-        result = result - timedelta(days=1)
+def warm_up(today):
+    # Everything that does not depend on today's report is done before it is published: the previous
+    # values are cached and the connection to the ministry host is opened.
+    if not report_calendar.is_report_day(today):
+        return
 
-        if result.weekday() < 5 and result.date() not in DAYS_WITHOUT_REPORT:
-            days_to_substract -= 1
+    SpainCovid19MinistryReport(today, 1).is_available()
+    influx.get_stat_accumulated_until_day(Measurement.PCRS, today)
+    influx.get_stat_accumulated_until_day(Measurement.DEATHS, today)
+    influx.get_all_stats_group_by_day(subtract_days_ignoring_weekends(today, 1))
 
-    return result
+
+def subtract_days_ignoring_weekends(initial_date, days_to_substract):
+    return report_calendar.get_previous_report_day(initial_date, days_to_substract)
 
 
 def update_database(today):
+    data = get_report_data(today)
+
+    update_stat(Measurement.PCRS, data[Measurement.PCRS], today)
+    update_stat(Measurement.DEATHS, data[Measurement.DEATHS], today)
+
+    influx.insert_stats(Measurement.ACCUMULATED_INCIDENCE, today, data[Measurement.ACCUMULATED_INCIDENCE])
+    influx.insert_stats(Measurement.PERCENTAGE_ADMITTED, today, data[Measurement.PERCENTAGE_ADMITTED])
+    influx.insert_stats(Measurement.PERCENTAGE_ICU, today, data[Measurement.PERCENTAGE_ICU])
+    influx.flush()
+
+
+def get_report_data(today):
     pcrs_report = SpainCovid19MinistryReport(today, 1)
     try:
         accumulated_pcrs_today = pcrs_report.get_column_data(1)
     except Exception:
         # With some PDFs, tabula-pdf auto table detection fails.
         # We need to specify a custom area.
-        pcrs_report = SpainCovid19MinistryReport(today, 1, (239, 56, 239 + 283, 56 + 756))
+        pcrs_report = pcrs_report.get_page(1, (239, 56, 239 + 283, 56 + 756))
         accumulated_pcrs_today = pcrs_report.get_column_data(1)
 
     accumulated_deaths_today = pcrs_report.get_column_data(5)
@@ -60,28 +81,29 @@ def update_database(today):
     except:
         accumulated_incidence = pcrs_report.get_column_data(4, 0, float)
 
-    hospital_report = SpainCovid19MinistryReport(today, 4)
+    hospital_report = pcrs_report.get_page(4)
     try:
         # First attempt
         today_percentage_admitted = hospital_report.get_column_data(3, cast=float)
         today_percentage_icu = hospital_report.get_column_data(6, cast=float)
     except:
-        hospital_report = SpainCovid19MinistryReport(today, 4, (179, 77, 179+280, 77+707))
+        hospital_report = hospital_report.get_page(4, (179, 77, 179+280, 77+707))
         today_percentage_admitted = hospital_report.get_column_data(3, cast=float)
         today_percentage_icu = hospital_report.get_column_data(6, cast=float)
 
-    update_stat(Measurement.PCRS, accumulated_pcrs_today, today)
-    update_stat(Measurement.DEATHS, accumulated_deaths_today, today)
-
-    influx.insert_stats(Measurement.ACCUMULATED_INCIDENCE, today, accumulated_incidence)
-    influx.insert_stats(Measurement.PERCENTAGE_ADMITTED, today, today_percentage_admitted)
-    influx.insert_stats(Measurement.PERCENTAGE_ICU, today, today_percentage_icu)
+    return {
+        Measurement.PCRS: accumulated_pcrs_today,
+        Measurement.DEATHS: accumulated_deaths_today,
+        Measurement.ACCUMULATED_INCIDENCE: accumulated_incidence,
+        Measurement.PERCENTAGE_ADMITTED: today_percentage_admitted,
+        Measurement.PERCENTAGE_ICU: today_percentage_icu
+    }
 
 
 def update_stat(stat, accumulated_today, today):
     accumulated_yesterday = influx.get_stat_accumulated_until_day(stat, today)
     today_number = get_today_numbers(accumulated_today, accumulated_yesterday)
-    influx.insert_stats(stat, today, today_number)
+    influx.insert_stats(stat, today, today_number, accumulated_yesterday)
 
     return today_number
 
@@ -95,6 +117,9 @@ def get_today_numbers(today_accumulated, yesterday_accumulated):
 
 
 def publish_report(today, yesterday):
+    # The graph ends with the day, so reruns request the same render and it can be taken from the cache
+    graph_end = today.replace(hour=23, minute=59, second=59, microsecond=0)
+    graph = twitter.upload_media(get_graph_url(graph_end - timedelta(31), graph_end))
 
     today_data = influx.get_all_stats_group_by_day(today)
     yesterday_data = influx.get_all_stats_group_by_day(yesterday)
@@ -102,12 +127,8 @@ def publish_report(today, yesterday):
     date_header = get_date_header(today, yesterday)
 
     spain_report = get_global_report(date_header, today_data, yesterday_data, accumulated_today)
-    graph_url = get_graph_url(today - timedelta(31), today)
-    last_id = twitter.publish_tweet_with_media(spain_report, graph_url)
-
     tweets = get_report_by_ccaa(date_header, today_data, yesterday_data, accumulated_today)
-    last_id = twitter.publish_tweets(tweets, last_id)
-    twitter.publish_tweet(get_final_tweet(), last_id)
+    twitter.publish_thread([spain_report, *tweets, get_final_tweet()], graph)
 
     logging.info("Tweets published correctly!")
 
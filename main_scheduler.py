@@ -0,0 +1,128 @@
+import os
+import sys
+import time
+import logging
+from datetime import datetime, timedelta
+import main_daily
+import main_vaccination
+from helpers.report_calendar import report_calendar
+
+JOBS = [main_daily, main_vaccination]
+
+
+def main():
+    delay = get_min_delay()
+    warmed_up_day = None
+
+    while True:
+        now = datetime.now()
+
+        if is_in_window(now):
+            if warmed_up_day != now.date():
+                warm_up(JOBS, now)
+                warmed_up_day = now.date()
+
+            pending_jobs = poll(get_jobs(now), now)
+            sleep_time, delay = get_sleep_time(now, pending_jobs, delay)
+        else:
+            window_start = get_next_window_start(now)
+            warm_up_start = window_start - timedelta(minutes=get_warm_up_minutes())
+
+            if now >= warm_up_start and warmed_up_day != window_start.date():
+                warm_up(JOBS, window_start)
+                warmed_up_day = window_start.date()
+
+            sleep_time = ((warm_up_start if now < warm_up_start else window_start) - now).total_seconds()
+
+        time.sleep(sleep_time)
+
+
+def warm_up(jobs, today):
+    logging.info(f"Warming up jobs for {today.strftime('%d/%m/%Y')}")
+
+    # Clients are kept between days, but database contents may have changed since the last warm up. Jobs can
+    # share a client, so every cache is cleared before any job is warmed up.
+    for job in jobs:
+        job.influx.clear_cache()
+
+    for job in jobs:
+        try:
+            job.warm_up(today)
+        except Exception:
+            logging.exception(f"Job {job.__name__} could not be warmed up")
+
+
+def get_jobs(today):
+    # The daily report is not published on holidays, so the ministry is not polled for it
+    return [job for job in JOBS if job is not main_daily or report_calendar.is_report_day(today)]
+
+
+def poll(jobs, today):
+    pending_jobs = []
+
+    for job in jobs:
+        try:
+            if not job.is_report_published(today):
+                job.main()
+
+                if not job.is_report_published(today):
+                    pending_jobs.append(job)
+        except Exception:
+            # A database or network error must not stop the scheduler. The job is polled again later.
+            logging.exception(f"Job {job.__name__} could not be polled")
+            pending_jobs.append(job)
+
+    return pending_jobs
+
+
+def get_sleep_time(now, pending_jobs, delay):
+    if pending_jobs:
+        return delay, min(delay * 2, get_max_delay())
+
+    # Every report has been published. Nothing else to do until the jobs are warmed up for the next window.
+    warm_up_start = get_next_window_start(now) - timedelta(minutes=get_warm_up_minutes())
+    return (warm_up_start - now).total_seconds(), get_min_delay()
+
+
+def is_in_window(now):
+    return now.weekday() < 5 and get_start_hour() <= now.hour < get_end_hour()
+
+
+def get_next_window_start(now):
+    start = now.replace(hour=get_start_hour(), minute=0, second=0, microsecond=0)
+
+    if start <= now:
+        start += timedelta(days=1)
+
+    while start.weekday() >= 5:
+        start += timedelta(days=1)
+
+    return start
+
+
+def get_start_hour():
+    return int(os.environ.get("SCHEDULER_START_HOUR", "16"))
+
+
+def get_end_hour():
+    return int(os.environ.get("SCHEDULER_END_HOUR", "22"))
+
+
+def get_warm_up_minutes():
+    return float(os.environ.get("SCHEDULER_WARM_UP_MINUTES", "15"))
+
+
+def get_min_delay():
+    return float(os.environ.get("SCHEDULER_MIN_DELAY", "10"))
+
+
+def get_max_delay():
+    return float(os.environ.get("SCHEDULER_MAX_DELAY", "60"))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s',
+                        stream=sys.stdout)
+
+    main()
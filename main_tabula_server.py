@@ -0,0 +1,16 @@
+import sys
+import logging
+from helpers.tabula_server import serve, get_address
+
+
+def main():
+    address = get_address()
+    serve(address[1] if address else 6000)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s',
+                        stream=sys.stdout)
+
+    main()
@@ -1,31 +1,42 @@
 import logging
 from datetime import datetime
+import numpy as np
+import pandas as pd
 from requests.exceptions import HTTPError
 from helpers.twitter import Twitter
-from helpers.db import Influx, Measurement
+from helpers.db import Measurement
 from helpers.ministry_report import VaccinesMinistryReport
-from main_daily import update_stat
+# update_stat writes through main_daily's client, so vaccinations are read, buffered and flushed with the same one
+from main_daily import influx, update_stat
 from helpers.reports import get_vaccination_report, get_graph_url
-from helpers.spain_geography import CCAA_POPULATION
+from helpers.spain_geography import CCAA_POPULATION, CCAAS, get_population
 from constants import VACCINE_IMAGE_PATH, SPAIN
 
 twitter = Twitter()
-influx = Influx()
+
+VACCINATION_MEASUREMENTS = [Measurement.VACCINATIONS, Measurement.COMPLETED_VACCINATIONS,
+                            Measurement.FIRST_DOSE_VACCINATIONS, Measurement.EXTRA_DOSE_VACCINATIONS]
+
+PERCENTAGE_MEASUREMENTS = {
+    Measurement.COMPLETED_VACCINATIONS: Measurement.PERCENTAGE_COMPLETED_VACCINATION,
+    Measurement.FIRST_DOSE_VACCINATIONS: Measurement.PERCENTAGE_FIRST_DOSE,
+    Measurement.EXTRA_DOSE_VACCINATIONS: Measurement.PERCENTAGE_EXTRA_DOSE
+}
 
 
 def main():
 
     today = datetime.now()
 
-    data = influx.get_stat_group_by_day(Measurement.VACCINATIONS, today)
-
-    if not data:
+    if not is_report_published(today):
         try:
-            update_vaccinations(today)
-            update_percentage(today, Measurement.COMPLETED_VACCINATIONS, Measurement.PERCENTAGE_COMPLETED_VACCINATION)
-            update_percentage(today, Measurement.FIRST_DOSE_VACCINATIONS, Measurement.PERCENTAGE_FIRST_DOSE)
-            update_percentage(today, Measurement.EXTRA_DOSE_VACCINATIONS, Measurement.PERCENTAGE_EXTRA_DOSE)
-            publish_report(today)
+            if VaccinesMinistryReport(today, 1).is_available():
+                update_vaccinations(today)
+                update_percentages(today)
+                influx.flush()
+                publish_report(today)
+            else:
+                logging.info("PDF is not available yet...")
         except HTTPError:
             logging.info("PDF is not available yet...")
         except Exception as e:
@@ -34,6 +45,18 @@ def main():
             twitter.send_dm(dm_text)
 
 
+def is_report_published(today):
+    return bool(influx.get_stat_group_by_day(Measurement.VACCINATIONS, today, refresh=True))
+
+
+def warm_up(today):
+    # Previous values are cached and the connection to the ministry host is opened before the report is published
+    VaccinesMinistryReport(today, 1).is_available()
+
+    for measurement in VACCINATION_MEASUREMENTS:
+        influx.get_stat_accumulated_until_day(measurement, today)
+
+
 def update_vaccinations(date):
     vaccination_report = VaccinesMinistryReport(date, 1)
 
@@ -42,10 +65,9 @@ def update_vaccinations(date):
     completed_column = get_column_index(vaccination_report.data_frame, "completada")
     extra_column = get_column_index(vaccination_report.data_frame, "adicional")
 
-    accumulated_vaccinations = vaccination_report.get_column_data(administrated_column, num_rows=21)
-    accumulated_first_doses = vaccination_report.get_column_data(first_dose_column, num_rows=21)
-    accumulated_completed_vaccinations = vaccination_report.get_column_data(completed_column, num_rows=21)
-    accumulated_extra_dose = vaccination_report.get_column_data(extra_column, num_rows=21)
+    accumulated_vaccinations, accumulated_first_doses, accumulated_completed_vaccinations, accumulated_extra_dose = \
+        vaccination_report.get_columns_data([administrated_column, first_dose_column, completed_column, extra_column],
+                                            num_rows=21)
 
     accumulated_vaccinations[SPAIN] = sum(accumulated_vaccinations.values())
     accumulated_completed_vaccinations[SPAIN] = sum(accumulated_completed_vaccinations.values())
@@ -63,21 +85,23 @@ def get_column_index(df, column_title):
     return list(df.columns).index(final_column_name)
 
 
-def update_percentage(date, accum_measurement, percentage_measurement):
-    accum = influx.get_stat_accumulated_until_day(accum_measurement, date)
-
-    data = {}
-    allowed_regions = list(CCAA_POPULATION.keys())
-    allowed_regions.append(SPAIN)
+def update_percentages(date):
+    # The three dose types are read in a single request and their percentages are computed at once
+    accumulated = influx.get_stats_accumulated_until_day(list(PERCENTAGE_MEASUREMENTS), date)
+    accumulated = accumulated.loc[accumulated.index.isin([*CCAAS, SPAIN])].reindex(columns=list(PERCENTAGE_MEASUREMENTS))
 
-    for region in filter(lambda x: x in allowed_regions, accum.keys()):
-        percentage = 100 * accum[region] / (CCAA_POPULATION[region] if region in CCAA_POPULATION else sum(CCAA_POPULATION.values()))
-        data[region] = percentage
+    population = np.array([get_population(region) for region in accumulated.index], dtype=float)
+    percentages = 100 * accumulated.to_numpy(dtype=float, na_value=np.nan) / population[:, np.newaxis]
+    percentages = pd.DataFrame(percentages, index=accumulated.index, columns=accumulated.columns)
 
-    influx.insert_stats(percentage_measurement, date, data)
+    for accum_measurement, percentage_measurement in PERCENTAGE_MEASUREMENTS.items():
+        influx.insert_stats(percentage_measurement, date, percentages[accum_measurement].dropna().to_dict())
 
 
 def publish_report(today):
+    # The graph ends with the day, so reruns request the same render and it can be taken from the cache
+    graph_end = today.replace(hour=23, minute=59, second=59, microsecond=0)
+    graph = twitter.upload_media(get_graph_url(datetime(2021, 1, 1), graph_end, graph_path=VACCINE_IMAGE_PATH))
     today_completed_vaccinations = influx.get_stat_group_by_day(Measurement.COMPLETED_VACCINATIONS, today)
     today_first_doses = influx.get_stat_group_by_day(Measurement.FIRST_DOSE_VACCINATIONS, today)
     today_extra_doses = influx.get_stat_group_by_day(Measurement.EXTRA_DOSE_VACCINATIONS, today)
@@ -92,8 +116,6 @@ def publish_report(today):
                                          today_extra_doses)
     interactive_graph_sentence = "➡️ Gráfico Interactivo: https://home.aitormagan.es/d/TeEplNgRk/covid-vacunas-espana?orgId=1"
     spain_tweet = f"🇪🇸 España - Vacunación a {today_str}:\n\n{spain_tweet}\n\n{interactive_graph_sentence}"
-    graph_url = get_graph_url(datetime(2021, 1, 1), today, graph_path=VACCINE_IMAGE_PATH)
-    last_tweet = twitter.publish_tweet_with_media(spain_tweet, graph_url)
     ccaa_tweets = []
 
     for ccaa in filter(lambda x: x in CCAA_POPULATION.keys(), sorted(accumulated_first_doses.keys())):
@@ -102,7 +124,7 @@ def publish_report(today):
                                             today_extra_doses)
         ccaa_tweets.append(f"{ccaa} - Vacunación a {today_str}:\n\n{ccaa_tweet}")
 
-    twitter.publish_tweets(ccaa_tweets, last_tweet)
+    twitter.publish_thread([spain_tweet, *ccaa_tweets], graph)
 
 
 if __name__ == "__main__":
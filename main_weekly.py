@@ -11,6 +11,7 @@ twitter = Twitter()
 
 def main():
     date = datetime.now()
+    graph = twitter.upload_media(get_graph_url(additional_vars={"group_by": "1w,4d"}))
 
     today_data = delete_pcrs24h(influx.get_all_stats_group_by_week(date))
     last_week_data = delete_pcrs24h(influx.get_all_stats_group_by_week(date - timedelta(7)))
@@ -18,21 +19,12 @@ def main():
     date_header = get_date_header(date)
 
     spain_report = get_global_report(date_header, today_data, last_week_data, accumulated_today, vaccine_info=True)
-    graph_url = get_graph_url(additional_vars={"group_by": "1w,4d"})
-    last_id = twitter.publish_tweet_with_media(spain_report, graph_url)
-
     tweets = get_report_by_ccaa(date_header, today_data, last_week_data, accumulated_today, vaccine_info=True)
-    last_id = twitter.publish_tweets(tweets, last_id)
-    twitter.publish_tweet(get_final_tweet(), last_id)
+    twitter.publish_thread([spain_report, *tweets, get_final_tweet()], graph)
 
 
 def delete_pcrs24h(element):
-    element_copy = dict(element)
-    for ccaa in element_copy:
-        if Measurement.PCRS_LAST_24H in element_copy[ccaa]:
-            del element_copy[ccaa][Measurement.PCRS_LAST_24H]
-
-    return element_copy
+    return element.drop(columns=Measurement.PCRS_LAST_24H, errors="ignore")
 
 
 def get_date_header(date):
@@ -1,25 +1,37 @@
 from datetime import datetime
-from collections import defaultdict
+from concurrent.futures import TimeoutError
+from threading import Event
 import unittest
-from unittest.mock import patch, MagicMock, call
+import pandas as pd
+from unittest.mock import patch, MagicMock, call, ANY
 from helpers.db import Influx, Measurement
+from helpers.spain_geography import CCAAS
 
 
 class InfluxUnitTest(unittest.TestCase):
 
     @patch("helpers.db.InfluxDBClient")
-    @patch("helpers.db.os")
-    def test_given_no_client_defined_when_access_client_then_client_is_built(self, os_mock, influxdbclient_mock):
+    @patch.dict("helpers.db.os.environ", {"INFLUX_HOST": "influx"}, clear=True)
+    def test_given_no_client_defined_when_access_client_then_client_is_built(self, influxdbclient_mock):
         influx = Influx()
 
         client = influx.client
 
         self.assertEqual(influxdbclient_mock.return_value, client)
-        influxdbclient_mock.assert_called_once_with(os_mock.environ.get.return_value, 8086, None, None, "covid19")
-        os_mock.environ.get.assert_called_once_with("INFLUX_HOST", "localhost")
+        influxdbclient_mock.assert_called_once_with("influx", 8086, None, None, "covid19", gzip=False)
+
+    @patch("helpers.db.InfluxDBClient")
+    @patch.dict("helpers.db.os.environ", {"INFLUX_GZIP": "true"}, clear=True)
+    def test_given_gzip_enabled_when_access_client_then_client_is_built_with_gzip(self, influxdbclient_mock):
+        influx = Influx()
+
+        client = influx.client
+
+        self.assertEqual(influxdbclient_mock.return_value, client)
+        influxdbclient_mock.assert_called_once_with("localhost", 8086, None, None, "covid19", gzip=True)
 
     def test_given_ccaas_when_insert_stats_in_influx_then_points_written(self):
-        stats = Measurement.PCRS
+        stats = Measurement.ACCUMULATED_INCIDENCE
         data = {'Madrid': 2, 'Cataluña': 3}
         date = datetime(2020, 8, 1)
 
@@ -39,57 +51,331 @@ class InfluxUnitTest(unittest.TestCase):
             self._influx.client = MagicMock()
 
             self._influx.insert_stats(stats, date, data)
+            self._influx.client.write_points.assert_not_called()
+            self._influx.flush()
+
+            self._influx.client.write_points.assert_called_once_with(expected_calls, time_precision="s",
+                                                                     batch_size=5000)
+
+    def test_given_ccaas_and_accumulated_stat_when_insert_stats_in_influx_then_running_total_written(self):
+        stats = Measurement.PCRS
+        data = {'Madrid': 2, 'Cataluña': 3}
+        date = datetime(2020, 8, 1)
+
+        def get_points(measurement, values):
+            return list(map(lambda x: {
+                "measurement": measurement,
+                "time": "2020-08-01",
+                "tags": {
+                    "ccaa": x
+                },
+                "fields": {
+                    "value": values[x]
+                }
+            }, values.keys()))
+
+        with patch.object(Influx, 'client'):
+            self._influx = Influx()
+            self._influx.client = MagicMock()
+            self._influx._get_report = MagicMock(return_value={'Madrid': 10, 'Cataluña': 0})
+
+            self._influx.insert_stats(stats, date, data)
+            self._influx.flush()
+
+            self._influx._get_report.assert_called_once_with(
+                "SELECT last(value) FROM \"rollups\".\"pcrs_accumulated\" where time < '2020-08-01' group by ccaa;", "last")
+            self._influx.client.write_points.assert_has_calls([
+                call(get_points("pcrs", data), time_precision="s", batch_size=5000),
+                call(get_points("pcrs_accumulated", {'Madrid': 12, 'Cataluña': 3}), time_precision="s",
+                     batch_size=5000, retention_policy="rollups")])
+
+    def test_given_ccaas_without_running_total_when_insert_stats_then_running_total_started_from_daily_values(self):
+        with patch.object(Influx, 'client'):
+            influx = Influx()
+            influx.client = MagicMock()
+            influx._get_report = MagicMock(side_effect=[{'Madrid': 10}, {'Madrid': 1, 'Cataluña': 7}])
+
+            influx.insert_stats(Measurement.PCRS, datetime(2020, 8, 1), {'Madrid': 2, 'Cataluña': 3})
+            influx.flush()
+
+            influx._get_report.assert_has_calls([
+                call("SELECT last(value) FROM \"rollups\".\"pcrs_accumulated\" where time < '2020-08-01' "
+                     "group by ccaa;", "last"),
+                call("SELECT sum(value) FROM pcrs where time < '2020-08-01' group by ccaa;", "sum")])
+            points = influx.client.write_points.call_args[0][0]
+            self.assertEqual({'Madrid': 12, 'Cataluña': 10}, {point["tags"]["ccaa"]: point["fields"]["value"]
+                                                              for point in points
+                                                              if point["measurement"] == "pcrs_accumulated"})
+
+    def test_given_buffered_running_totals_when_insert_stats_then_totals_taken_from_buffer(self):
+        with patch.object(Influx, 'client'):
+            influx = Influx()
+            influx.client = MagicMock()
+            influx._get_report = MagicMock(return_value={'Madrid': 10})
+
+            influx.insert_stats(Measurement.PCRS, datetime(2020, 8, 1), {'Madrid': 2})
+            influx.insert_stats(Measurement.PCRS, datetime(2020, 8, 2), {'Madrid': 3})
+            influx.flush()
+
+            influx._get_report.assert_called_once_with(
+                "SELECT last(value) FROM \"rollups\".\"pcrs_accumulated\" where time < '2020-08-01' group by ccaa;", "last")
+            points = influx.client.write_points.call_args[0][0]
+            self.assertEqual([12, 15], [point["fields"]["value"] for point in points
+                                        if point["measurement"] == "pcrs_accumulated"])
+
+    def test_given_previous_running_totals_when_insert_stats_then_totals_not_read(self):
+        with patch.object(Influx, 'client'):
+            influx = Influx()
+            influx.client = MagicMock()
+            influx._get_report = MagicMock()
+
+            influx.insert_stats(Measurement.PCRS, datetime(2020, 8, 1), {'Madrid': 2}, {'Madrid': 10})
+            influx.flush()
+
+            influx._get_report.assert_not_called()
+            influx.client.write_points.assert_called_with(
+                [{"measurement": "pcrs_accumulated", "time": "2020-08-01", "tags": {"ccaa": "Madrid"},
+                  "fields": {"value": 12}}], time_precision="s", batch_size=5000, retention_policy="rollups")
+
+    def test_given_same_day_inserted_twice_when_insert_stats_then_buffered_total_of_that_day_not_used(self):
+        with patch.object(Influx, 'client'):
+            influx = Influx()
+            influx.client = MagicMock()
+            influx._get_report = MagicMock(return_value={'Madrid': 10})
+
+            influx.insert_stats(Measurement.PCRS, datetime(2020, 8, 1, 9), {'Madrid': 2})
+            influx.insert_stats(Measurement.PCRS, datetime(2020, 8, 1, 18), {'Madrid': 3})
+            influx.flush()
 
-            self._influx.client.write_points.assert_called_once_with(expected_calls)
+            points = influx.client.write_points.call_args[0][0]
+            self.assertEqual([12, 13], [point["fields"]["value"] for point in points
+                                        if point["measurement"] == "pcrs_accumulated"])
+
+    def test_given_write_error_when_flush_then_buffer_dropped(self):
+        with patch.object(Influx, 'client'):
+            influx = Influx()
+            influx.client = MagicMock()
+            influx.client.write_points.side_effect = [Exception(), None]
+            influx._run_queries = MagicMock(return_value=[{"Madrid": 1}])
+
+            influx.insert_stats(Measurement.ACCUMULATED_INCIDENCE, datetime(2020, 8, 1), {'Madrid': 2})
+            with self.assertRaises(Exception):
+                influx.flush()
+            influx._get_reports([(Measurement.ACCUMULATED_INCIDENCE, "query;", "sum")])
+            influx.flush()
+
+            influx.client.write_points.assert_called_once()
+
+    def test_given_several_stats_when_flush_then_one_batch_written(self):
+        with patch.object(Influx, 'client'):
+            influx = Influx()
+            influx.client = MagicMock()
+
+            influx.insert_stats(Measurement.ACCUMULATED_INCIDENCE, datetime(2020, 8, 1), {'Madrid': 2})
+            influx.insert_stats(Measurement.PERCENTAGE_ICU, datetime(2020, 8, 1), {'Madrid': 3})
+            influx.flush()
+            influx.flush()
+
+            influx.client.write_points.assert_called_once()
+            self.assertEqual(2, len(influx.client.write_points.call_args[0][0]))
+
+    @patch.dict("helpers.db.os.environ", {"INFLUX_BATCH_SIZE": "2", "INFLUX_TIME_PRECISION": "h"})
+    def test_given_full_batch_when_insert_stats_then_points_written(self):
+        with patch.object(Influx, 'client'):
+            influx = Influx()
+            influx.client = MagicMock()
+
+            influx.insert_stats(Measurement.ACCUMULATED_INCIDENCE, datetime(2020, 8, 1), {'Madrid': 2})
+            influx.client.write_points.assert_not_called()
+            influx.insert_stats(Measurement.PERCENTAGE_ICU, datetime(2020, 8, 1), {'Madrid': 3})
+
+            influx.client.write_points.assert_called_once_with(ANY, time_precision="h", batch_size=2)
+
+    @patch.dict("helpers.db.os.environ", {"INFLUX_ROLLUPS": "true"})
+    def test_given_rollups_enabled_when_flush_then_weeks_and_months_rolled_up_after_write(self):
+        with patch.object(Influx, 'client'):
+            influx = Influx()
+            influx.client = MagicMock()
+            influx.client.get_list_retention_policies.return_value = [{"name": "autogen", "default": True}]
+
+            influx.insert_stats(Measurement.ACCUMULATED_INCIDENCE, datetime(2020, 10, 31), {'Madrid': 2})
+            influx.insert_stats(Measurement.ACCUMULATED_INCIDENCE, datetime(2020, 11, 1), {'Madrid': 3})
+            influx.flush()
+
+            influx.client.write_points.assert_called_once()
+            influx.client.create_retention_policy.assert_called_once_with("rollups", "INF", 1)
+            influx.client.alter_retention_policy.assert_not_called()
+            influx.client.query.assert_called_once_with(
+                "SELECT last(value) AS value INTO \"rollups\".\"accumulated_incidence_monthly\" "
+                "FROM accumulated_incidence where time >= '2020-10-01' and time < '2020-11-01' "
+                "group by time(31d, 29d), ccaa;"
+                "SELECT last(value) AS value INTO \"rollups\".\"accumulated_incidence_monthly\" "
+                "FROM accumulated_incidence where time >= '2020-11-01' and time < '2020-12-01' "
+                "group by time(30d, 27d), ccaa;"
+                "SELECT last(value) AS value INTO \"rollups\".\"accumulated_incidence_weekly\" "
+                "FROM accumulated_incidence where time >= '2020-10-26' and time < '2020-11-02' "
+                "group by time(7d, 4d), ccaa;")
+
+    def test_given_period_when_get_period_bucket_then_single_bucket_starts_on_first_day(self):
+        epoch = datetime(1970, 1, 1).date()
+        periods = [(datetime(2021, month, 1).date(), datetime(2021 + month // 12, month % 12 + 1, 1).date())
+                   for month in range(1, 13)]
+        periods += [(datetime(2021, 3, 1).date(), datetime(2021, 3, 8).date()),
+                    (datetime(2021, 3, 29).date(), datetime(2021, 4, 5).date())]
+
+        for start, end in periods:
+            bucket = Influx._get_period_bucket(start, end)
+            days, offset = (int(value) for value in bucket[len("time("):-len("d)")].split("d, "))
+
+            self.assertEqual((end - start).days, days)
+            self.assertEqual(0, ((start - epoch).days - offset) % days)
+
+    def test_given_rollups_disabled_when_flush_then_nothing_rolled_up(self):
+        with patch.object(Influx, 'client'):
+            influx = Influx()
+            influx.client = MagicMock()
+
+            influx.insert_stats(Measurement.ACCUMULATED_INCIDENCE, datetime(2020, 10, 31), {'Madrid': 2})
+            influx.flush()
+
+            influx.client.write_points.assert_called_once()
+            influx.client.query.assert_not_called()
+
+    @patch.dict("helpers.db.os.environ", {"INFLUX_ROLLUP_RETENTION_POLICY": "long", "INFLUX_RAW_RETENTION": "520w"})
+    def test_given_raw_retention_when_update_rollups_then_policies_created_once(self):
+        with patch.object(Influx, 'client'):
+            influx = Influx()
+            influx.client = MagicMock()
+            influx.client.get_list_retention_policies.return_value = [{"name": "long", "default": False},
+                                                                      {"name": "daily", "default": True}]
+
+            influx.update_rollups({Measurement.PCRS: [datetime(2020, 12, 31)]})
+            influx.update_rollups({Measurement.DEATHS: [datetime(2020, 12, 31)]})
+
+            influx.client.get_list_retention_policies.assert_called_once_with()
+            influx.client.create_retention_policy.assert_not_called()
+            influx.client.alter_retention_policy.assert_called_once_with("daily", duration="520w")
+            influx.client.query.assert_has_calls([
+                call("SELECT sum(value) AS value INTO \"long\".\"pcrs_monthly\" FROM pcrs where "
+                     "time >= '2020-12-01' and time < '2021-01-01' group by time(31d, 28d), ccaa;"
+                     "SELECT sum(value) AS value INTO \"long\".\"pcrs_weekly\" FROM pcrs where "
+                     "time >= '2020-12-28' and time < '2021-01-04' group by time(7d, 4d), ccaa;"),
+                call(ANY)
+            ])
+
+    @patch.dict("helpers.db.os.environ", {"INFLUX_ROLLUPS": "true"})
+    def test_given_rollups_enabled_when_get_week_queries_then_weekly_rollups_read(self):
+        influx = Influx()
+
+        self.assertEqual((Measurement.PCRS, "SELECT sum(value) FROM \"rollups\".\"pcrs_weekly\" where "
+                          "time = '2020-10-05' group by ccaa;", "sum"),
+                         influx._get_stat_group_by_week_query(Measurement.PCRS, datetime(2020, 10, 11)))
+        self.assertEqual((Measurement.PERCENTAGE_ICU, "SELECT last(value) FROM \"rollups\".\"percentage_icu_weekly\" "
+                          "where time = '2020-10-05' group by ccaa;", "last"),
+                         influx._get_last_value_from_week_query(Measurement.PERCENTAGE_ICU, datetime(2020, 10, 5)))
+
+    def test_given_buffered_points_when_measurement_read_then_points_written_first(self):
+        with patch.object(Influx, 'client'):
+            influx = Influx()
+            influx.client = MagicMock()
+            influx._run_queries = MagicMock(return_value=[{"Madrid": 1}])
+
+            influx.insert_stats(Measurement.ACCUMULATED_INCIDENCE, datetime(2020, 8, 1), {'Madrid': 2})
+            influx._get_reports([(Measurement.PERCENTAGE_ICU, "query1;", "sum")])
+            influx.client.write_points.assert_not_called()
+            influx._get_reports([(Measurement.ACCUMULATED_INCIDENCE, "query2;", "sum")])
+
+            influx.client.write_points.assert_called_once()
+
+    def test_when_rebuild_accumulated_stats_then_one_query_per_accumulated_stat(self):
+        with patch.object(Influx, 'client'):
+            self._influx = Influx()
+            self._influx.client = MagicMock()
+
+            self._influx.rebuild_accumulated_stats()
+
+            self.assertEqual(len(Influx.ACCUMULATED_MEASUREMENTS), self._influx.client.query.call_count)
+            self._influx.client.query.assert_any_call(
+                "SELECT cumulative_sum(sum(value)) AS value INTO \"rollups\".\"pcrs_accumulated\" FROM pcrs where "
+                "time >= '2020-01-01' and time <= now() group by time(1d), ccaa fill(none);")
 
     def test_given_day_when_get_stat_group_by_week_then_get_report_called(self):
         influx = Influx()
-        influx._get_report = MagicMock()
+        influx._get_stat = MagicMock()
         date = datetime(2020, 8, 1)
         stat = Measurement.PCRS
 
         result = influx.get_stat_group_by_week(stat, date)
 
-        self.assertEqual(result, influx._get_report.return_value)
-        influx._get_report.assert_called_once_with(
-            f"SELECT sum(value) FROM pcrs where time >= '2020-07-27' and time <= '2020-08-02' group by ccaa;")
+        self.assertEqual(result, influx._get_stat.return_value)
+        influx._get_stat.assert_called_once_with((
+            stat, f"SELECT sum(value) FROM pcrs where time >= '2020-07-27' and time <= '2020-08-02' group by ccaa;",
+            "sum"))
 
     def test_given_day_when_get_stat_group_by_day_then_get_report_called(self):
         influx = Influx()
-        influx._get_report = MagicMock()
+        influx._get_stat = MagicMock()
         date = datetime(2020, 8, 1)
         stat = Measurement.PCRS
 
         result = influx.get_stat_group_by_day(stat, date)
 
-        self.assertEqual(result, influx._get_report.return_value)
-        influx._get_report.assert_called_once_with(
-            f"SELECT sum(value) FROM pcrs where time = '2020-08-01' group by ccaa;")
+        self.assertEqual(result, influx._get_stat.return_value)
+        influx._get_stat.assert_called_once_with((
+            stat, f"SELECT sum(value) FROM pcrs where time = '2020-08-01' group by ccaa;", "sum"), False)
 
-    def test_given_day_when_get_stat_accumulated_until_day_then_get_report_called(self):
+    def test_given_day_when_get_stat_accumulated_until_day_then_running_total_read(self):
         influx = Influx()
-        influx._get_report = MagicMock()
+        influx._create_retention_policies = MagicMock()
+        running_totals = {ccaa: 1 for ccaa in CCAAS}
+        influx._get_reports = MagicMock(return_value=[running_totals])
         date = datetime(2020, 8, 1)
         stat = Measurement.PCRS
 
         result = influx.get_stat_accumulated_until_day(stat, date)
 
-        self.assertEqual(result, influx._get_report.return_value)
-        influx._get_report.assert_called_once_with(
-            f"SELECT sum(value) FROM pcrs where time <= '2020-08-01' group by ccaa;")
+        self.assertEqual(running_totals, result)
+        influx._get_reports.assert_called_once_with([(
+            stat, "SELECT last(value) FROM \"rollups\".\"pcrs_accumulated\" where time <= '2020-08-01' group by ccaa;",
+            "last")])
+
+    def test_given_missing_running_totals_when_get_stat_accumulated_until_day_then_missing_ccaas_summed(self):
+        influx = Influx()
+        influx._create_retention_policies = MagicMock()
+        influx._get_reports = MagicMock(side_effect=[[{"Madrid": 10}], [{"Madrid": 1, "Ceuta": 5}]])
+        date = datetime(2020, 8, 1)
+        stat = Measurement.PCRS
+
+        result = influx.get_stat_accumulated_until_day(stat, date)
+
+        self.assertEqual({"Madrid": 10, "Ceuta": 5}, result)
+        influx._get_reports.assert_called_with([(
+            stat, f"SELECT sum(value) FROM pcrs where time <= '2020-08-01' group by ccaa;", "sum")])
+
+    def test_given_day_and_stat_without_running_total_when_get_stat_accumulated_until_day_then_values_summed(self):
+        influx = Influx()
+        influx._get_reports = MagicMock(return_value=[{"Madrid": 1}])
+        date = datetime(2020, 8, 1)
+        stat = Measurement.ADMITTED_PEOPLE
+
+        result = influx.get_stat_accumulated_until_day(stat, date)
+
+        self.assertEqual({"Madrid": 1}, result)
+        influx._get_reports.assert_called_once_with([(
+            stat, f"SELECT sum(value) FROM admitted_people where time <= '2020-08-01' group by ccaa;", "sum")])
 
     def test_given_date_when_get_last_value_from_week_then_dates_set_accordingly(self):
         influx = Influx()
-        influx._get_report = MagicMock()
+        influx._get_stat = MagicMock()
         date = datetime(2022, 1, 2)
         stat = Measurement.ACCUMULATED_INCIDENCE
 
         result = influx.get_last_value_from_week(stat, date)
 
-        self.assertEqual(result, influx._get_report.return_value)
-        influx._get_report.assert_called_once_with(
-            "SELECT * FROM accumulated_incidence where time >= '2021-12-27 00:00:00' and "
-            "time <= '2022-01-02 23:59:59' group by ccaa order by desc limit 1", "value")
+        self.assertEqual(result, influx._get_stat.return_value)
+        influx._get_stat.assert_called_once_with((
+            stat, "SELECT * FROM accumulated_incidence where time >= '2021-12-27 00:00:00' and "
+            "time <= '2022-01-02 23:59:59' group by ccaa order by desc limit 1;", "value"))
 
     def test_given_database_info_when_get_report_then_map_returned(self):
         with patch.object(Influx, 'client'):
@@ -104,72 +390,201 @@ class InfluxUnitTest(unittest.TestCase):
             self.assertEqual(result, {"Madrid": 7, "Cataluña": 9})
             self._influx.client.query.assert_called_once_with(query)
 
-    def test_when_get_all_stats_group_by_day_then_three_value_returned(self):
+    def test_given_database_info_for_several_queries_when_run_queries_then_one_map_per_query_returned(self):
+        with patch.object(Influx, 'client'):
+            self._influx = Influx()
+            self._influx.client = MagicMock()
+            pcrs_result = MagicMock()
+            pcrs_result.items.return_value = [(('pcrs', {'ccaa': 'Madrid'}), [{'sum': 7}])]
+            incidence_result = MagicMock()
+            incidence_result.items.return_value = [(('accumulated_incidence', {'ccaa': 'Madrid'}), [{'value': 2}])]
+            self._influx.client.query.return_value = [pcrs_result, incidence_result]
+
+            result = self._influx._run_queries([("query1;", "sum"), ("query2;", "value")])
+
+            self.assertEqual([{"Madrid": 7}, {"Madrid": 2}], result)
+            self._influx.client.query.assert_called_once_with("query1;query2;")
+
+    def test_given_database_info_for_one_query_when_run_queries_then_one_map_returned(self):
+        with patch.object(Influx, 'client'):
+            self._influx = Influx()
+            self._influx.client = MagicMock()
+            self._influx.client.query.return_value.items.return_value = [(('pcrs', {'ccaa': 'Madrid'}), [{'sum': 7}])]
+
+            result = self._influx._run_queries([("query1;", "sum")])
+
+            self.assertEqual([{"Madrid": 7}], result)
+            self._influx.client.query.assert_called_once_with("query1;")
+
+    @patch.dict("helpers.db.os.environ", {"INFLUX_QUERY_WORKERS": "4"})
+    def test_given_workers_when_run_queries_then_queries_run_concurrently_in_order(self):
+        influx = Influx()
+        influx._get_report = MagicMock(side_effect=lambda query, key: {"Madrid": query + key})
+
+        result = influx._run_queries([("query1;", "sum"), ("query2;", "value"), ("query3;", "last")])
+
+        self.assertEqual([{"Madrid": "query1;sum"}, {"Madrid": "query2;value"}, {"Madrid": "query3;last"}], result)
+        influx._get_report.assert_has_calls([call("query1;", "sum"), call("query2;", "value"),
+                                             call("query3;", "last")], any_order=True)
+
+    @patch.dict("helpers.db.os.environ", {"INFLUX_QUERY_WORKERS": "2", "INFLUX_QUERY_TIMEOUT": "0.01"})
+    def test_given_slow_query_when_run_queries_concurrently_then_timeout_risen(self):
+        influx = Influx()
+        event = Event()
+        influx._get_report = MagicMock(side_effect=lambda query, key: event.wait(1))
+
+        with self.assertRaises(TimeoutError):
+            influx._run_queries([("query1;", "sum"), ("query2;", "sum")])
+
+        event.set()
+
+    def test_given_no_cached_results_when_get_reports_then_queries_run_and_results_returned(self):
+        influx = Influx()
+        influx._run_queries = MagicMock(return_value=[{"Madrid": 1}, {"Madrid": 2}])
+
+        result = influx._get_reports([(Measurement.PCRS, "query1;", "sum"), (Measurement.DEATHS, "query2;", "sum")])
+
+        self.assertEqual([{"Madrid": 1}, {"Madrid": 2}], result)
+        influx._run_queries.assert_called_once_with([("query1;", "sum"), ("query2;", "sum")])
+
+    def test_given_cached_results_when_get_reports_then_only_missing_queries_run(self):
+        influx = Influx()
+        influx._run_queries = MagicMock(side_effect=[[{"Madrid": 1}], [{"Madrid": 2}]])
+        influx._get_reports([(Measurement.PCRS, "query1;", "sum")])
+
+        result = influx._get_reports([(Measurement.PCRS, "query1;", "sum"), (Measurement.DEATHS, "query2;", "sum")])
+
+        self.assertEqual([{"Madrid": 1}, {"Madrid": 2}], result)
+        influx._run_queries.assert_has_calls([call([("query1;", "sum")]), call([("query2;", "sum")])])
+
+    def test_given_all_results_cached_when_get_reports_then_no_query_run(self):
+        influx = Influx()
+        influx._run_queries = MagicMock(return_value=[{"Madrid": 1}])
+        influx._get_reports([(Measurement.PCRS, "query1;", "sum")])
+
+        result = influx._get_reports([(Measurement.PCRS, "query1;", "sum")])
+
+        self.assertEqual([{"Madrid": 1}], result)
+        influx._run_queries.assert_called_once_with([("query1;", "sum")])
+
+    def test_given_cached_results_when_insert_stats_then_measurement_results_evicted(self):
+        with patch.object(Influx, 'client'):
+            influx = Influx()
+            influx.client = MagicMock()
+            influx._run_queries = MagicMock(side_effect=[[{"Madrid": 1}, {"Madrid": 2}], [{"Madrid": 3}]])
+            queries = [(Measurement.ACCUMULATED_INCIDENCE, "query1;", "sum"), (Measurement.DEATHS, "query2;", "sum")]
+            influx._get_reports(queries)
+
+            influx.insert_stats(Measurement.ACCUMULATED_INCIDENCE, datetime(2020, 8, 1), {"Madrid": 3})
+            result = influx._get_reports(queries)
+
+            self.assertEqual([{"Madrid": 3}, {"Madrid": 2}], result)
+            influx._run_queries.assert_has_calls([call([("query1;", "sum"), ("query2;", "sum")]),
+                                                  call([("query1;", "sum")])])
+
+    def test_given_cached_results_and_refresh_when_get_reports_then_queries_run_again(self):
+        influx = Influx()
+        influx._run_queries = MagicMock(side_effect=[[{"Madrid": 1}, {"Madrid": 2}], [{"Madrid": 3}]])
+        influx._get_reports([(Measurement.PCRS, "query1;", "sum"), (Measurement.PCRS, "query2;", "sum")])
+
+        result = influx._get_reports([(Measurement.PCRS, "query1;", "sum")], refresh=True)
+
+        self.assertEqual([{"Madrid": 3}], result)
+        influx._run_queries.assert_called_with([("query1;", "sum")])
+        self.assertEqual({"Madrid": 2}, influx._get_stat((Measurement.PCRS, "query2;", "sum")))
+
+    def test_given_cached_results_when_clear_cache_then_queries_run_again(self):
+        influx = Influx()
+        influx._run_queries = MagicMock(return_value=[{"Madrid": 1}])
+        influx._get_reports([(Measurement.PCRS, "query1;", "sum")])
+
+        influx.clear_cache()
+        influx._get_reports([(Measurement.PCRS, "query1;", "sum")])
+
+        self.assertEqual(2, influx._run_queries.call_count)
+
+    def test_when_get_all_stats_group_by_day_then_one_request_made_and_values_packed(self):
         influx = Influx()
         influx._pack_elements = MagicMock()
-        influx.get_stat_group_by_day = MagicMock()
-        date = MagicMock()
+        reports = [MagicMock() for _ in range(9)]
+        influx._get_reports = MagicMock(return_value=reports)
+        date = datetime(2020, 8, 1)
 
         result = influx.get_all_stats_group_by_day(date)
 
         self.assertEqual(influx._pack_elements.return_value, result)
-
-        influx.get_stat_group_by_day.assert_has_calls([call(Measurement.PCRS, date),
-                                                       call(Measurement.DEATHS, date),
-                                                       call(Measurement.ADMITTED_PEOPLE, date),
-                                                       call(Measurement.ICU_PEOPLE, date),
-                                                       call(Measurement.ACCUMULATED_INCIDENCE, date),
-                                                       call(Measurement.PERCENTAGE_ADMITTED, date),
-                                                       call(Measurement.PERCENTAGE_ICU, date),
-                                                       call(Measurement.VACCINATIONS, date)])
-
-    def test_when_get_all_stats_group_by_week_then_three_value_returned(self):
+        measurements = [Measurement.PCRS, Measurement.DEATHS, Measurement.ADMITTED_PEOPLE, Measurement.ICU_PEOPLE,
+                        Measurement.ACCUMULATED_INCIDENCE, Measurement.PERCENTAGE_ADMITTED,
+                        Measurement.PERCENTAGE_ICU, Measurement.VACCINATIONS, Measurement.COMPLETED_VACCINATIONS]
+        influx._get_reports.assert_called_once_with(
+            [(x, f"SELECT sum(value) FROM {x.value} where time = '2020-08-01' group by ccaa;", "sum")
+             for x in measurements])
+        influx._pack_elements.assert_called_once_with(**{x.value: y for x, y in zip(measurements, reports)})
+
+    def test_when_get_all_stats_group_by_week_then_one_request_made_and_values_packed(self):
         influx = Influx()
         influx._pack_elements = MagicMock()
-        influx.get_stat_group_by_week = MagicMock()
-        influx.get_last_value_from_week = MagicMock()
+        reports = [MagicMock() for _ in range(9)]
+        influx._get_reports = MagicMock(return_value=reports)
         date = datetime(2020, 10, 11)
 
         result = influx.get_all_stats_group_by_week(date)
 
         self.assertEqual(influx._pack_elements.return_value, result)
-
-        influx.get_stat_group_by_week.assert_has_calls([call(Measurement.PCRS, date),
-                                                        call(Measurement.DEATHS, date),
-                                                        call(Measurement.ADMITTED_PEOPLE, date),
-                                                        call(Measurement.ICU_PEOPLE, date),
-                                                        call(Measurement.VACCINATIONS, date)])
-        influx.get_last_value_from_week.assert_has_calls([call(Measurement.ACCUMULATED_INCIDENCE, date),
-                                                          call(Measurement.PERCENTAGE_ADMITTED, date),
-                                                          call(Measurement.PERCENTAGE_ICU, date)])
-
-    def test_when_get_all_stats_accumulated_until_day_then_two_value_returned(self):
+        measurements = [Measurement.PCRS, Measurement.DEATHS, Measurement.ADMITTED_PEOPLE, Measurement.ICU_PEOPLE,
+                        Measurement.ACCUMULATED_INCIDENCE, Measurement.PERCENTAGE_ICU,
+                        Measurement.PERCENTAGE_ADMITTED, Measurement.VACCINATIONS, Measurement.COMPLETED_VACCINATIONS]
+        queries = influx._get_reports.call_args[0][0]
+        self.assertEqual((Measurement.PCRS, "SELECT sum(value) FROM pcrs where time >= '2020-10-05' and "
+                          "time <= '2020-10-11' group by ccaa;", "sum"), queries[0])
+        self.assertEqual((Measurement.ACCUMULATED_INCIDENCE,
+                          "SELECT * FROM accumulated_incidence where time >= '2020-10-05 00:00:00' and "
+                          "time <= '2020-10-11 23:59:59' group by ccaa order by desc limit 1;", "value"), queries[4])
+        influx._pack_elements.assert_called_once_with(**{x.value: y for x, y in zip(measurements, reports)})
+
+    def test_when_get_all_stats_accumulated_until_day_then_running_totals_read_and_packed(self):
         influx = Influx()
+        influx._create_retention_policies = MagicMock()
         influx._pack_elements = MagicMock()
-        pcrs = MagicMock()
-        deaths = MagicMock()
-        vaccinations = MagicMock()
-        completed_vaccinations = MagicMock()
-        influx.get_stat_accumulated_until_day = MagicMock(side_effect=[pcrs, deaths, vaccinations,
-                                                                       completed_vaccinations])
-        date = MagicMock()
+        pcrs, deaths, vaccinations, completed_vaccinations = [{ccaa: x for ccaa in CCAAS} for x in range(4)]
+        influx._get_reports = MagicMock(return_value=[pcrs, deaths, vaccinations, completed_vaccinations])
+        date = datetime(2020, 8, 1)
 
         result = influx.get_all_stats_accumulated_until_day(date)
 
         self.assertEqual(influx._pack_elements.return_value, result)
-
-        influx.get_stat_accumulated_until_day.assert_has_calls([call(Measurement.PCRS, date),
-                                                                call(Measurement.DEATHS, date),
-                                                                call(Measurement.VACCINATIONS, date),
-                                                                call(Measurement.COMPLETED_VACCINATIONS, date)])
+        influx._get_reports.assert_called_once_with(
+            [(x, f"SELECT last(value) FROM \"rollups\".\"{x.value}_accumulated\" where time <= '2020-08-01' "
+                 "group by ccaa;", "last")
+             for x in [Measurement.PCRS, Measurement.DEATHS, Measurement.VACCINATIONS,
+                       Measurement.COMPLETED_VACCINATIONS]])
         influx._pack_elements.assert_called_once_with(pcrs=pcrs, deaths=deaths, vaccinations=vaccinations,
                                                       completed_vaccinations=completed_vaccinations)
 
-    def test_given_no_args_when_pack_elements_then_empty_dict_returned(self):
+    def test_when_get_stats_accumulated_until_day_then_one_request_made_and_values_packed(self):
+        influx = Influx()
+        influx._create_retention_policies = MagicMock()
+        influx._pack_elements = MagicMock()
+        first_doses, extra_doses = [{ccaa: x for ccaa in CCAAS} for x in range(2)]
+        influx._get_reports = MagicMock(return_value=[first_doses, extra_doses])
+        date = datetime(2021, 8, 1)
 
-        self.assertEqual(defaultdict(), Influx._pack_elements(**{}))
+        result = influx.get_stats_accumulated_until_day([Measurement.FIRST_DOSE_VACCINATIONS,
+                                                         Measurement.EXTRA_DOSE_VACCINATIONS], date)
 
-    def test_given_one_arg_when_pack_elements_then_dict_reversed(self):
+        self.assertEqual(influx._pack_elements.return_value, result)
+        influx._get_reports.assert_called_once_with(
+            [(x, f"SELECT last(value) FROM \"rollups\".\"{x.value}_accumulated\" where time <= '2021-08-01' "
+                 "group by ccaa;", "last")
+             for x in [Measurement.FIRST_DOSE_VACCINATIONS, Measurement.EXTRA_DOSE_VACCINATIONS]])
+        influx._pack_elements.assert_called_once_with(first_dose_vaccinations=first_doses,
+                                                      extra_dose_vaccinations=extra_doses)
+
+    def test_given_no_args_when_pack_elements_then_empty_frame_returned(self):
+
+        self.assertTrue(Influx._pack_elements(**{}).empty)
+
+    def test_given_one_arg_when_pack_elements_then_one_column_per_measurement(self):
 
         ccaa1 = 'Andalucia'
         ccaa2 = 'Castilla-La Mancha'
@@ -177,21 +592,16 @@ class InfluxUnitTest(unittest.TestCase):
         ccaa2_value = 2
 
         arguments = {
-            Measurement.PCRS.value: {ccaa1: ccaa1_value, ccaa2: ccaa2_value}
+            Measurement.PCRS.value: {ccaa2: ccaa2_value, ccaa1: ccaa1_value}
         }
 
-        expected_result = {
-            ccaa1: {
-                Measurement.PCRS: ccaa1_value
-            },
-            ccaa2: {
-                Measurement.PCRS: ccaa2_value
-            }
-        }
+        expected_result = pd.DataFrame({
+            Measurement.PCRS: [ccaa1_value, ccaa2_value]
+        }, index=[ccaa1, ccaa2]).convert_dtypes()
 
-        self.assertEqual(expected_result, Influx._pack_elements(**arguments))
+        pd.testing.assert_frame_equal(expected_result, Influx._pack_elements(**arguments))
 
-    def test_given_two_arg_when_pack_elements_then_dict_packed(self):
+    def test_given_two_arg_when_pack_elements_then_frame_packed(self):
 
         ccaa1 = 'Andalucia'
         ccaa2 = 'Castilla-La Mancha'
@@ -205,15 +615,35 @@ class InfluxUnitTest(unittest.TestCase):
             Measurement.DEATHS.value: {ccaa1: ccaa1_value_deaths, ccaa2: ccaa2_value_deaths}
         }
 
-        expected_result = {
-            ccaa1: {
-                Measurement.PCRS: ccaa1_value,
-                Measurement.DEATHS: ccaa1_value_deaths
-            },
-            ccaa2: {
-                Measurement.PCRS: ccaa2_value,
-                Measurement.DEATHS: ccaa2_value_deaths
-            }
-        }
+        expected_result = pd.DataFrame({
+            Measurement.PCRS: [ccaa1_value, ccaa2_value],
+            Measurement.DEATHS: [ccaa1_value_deaths, ccaa2_value_deaths]
+        }, index=[ccaa1, ccaa2]).convert_dtypes()
+
+        pd.testing.assert_frame_equal(expected_result, Influx._pack_elements(**arguments))
+
+    def test_given_whole_percentages_when_pack_elements_then_floats_kept(self):
+        result = Influx._pack_elements(**{
+            Measurement.PERCENTAGE_ICU.value: {'Madrid': 10.0},
+            Measurement.ACCUMULATED_INCIDENCE.value: {'Madrid': 100.0}
+        })
+
+        self.assertEqual("Float64", str(result[Measurement.PERCENTAGE_ICU].dtype))
+        self.assertEqual("Float64", str(result[Measurement.ACCUMULATED_INCIDENCE].dtype))
+        self.assertIsInstance(result.at['Madrid', Measurement.PERCENTAGE_ICU].item(), float)
+
+    def test_given_missing_values_when_pack_elements_then_na_returned_and_types_kept(self):
+
+        ccaa1 = 'Andalucia'
+        ccaa2 = 'Castilla-La Mancha'
+
+        result = Influx._pack_elements(**{
+            Measurement.PCRS.value: {ccaa1: 1, ccaa2: 2},
+            Measurement.ACCUMULATED_INCIDENCE.value: {ccaa1: 3.5}
+        })
 
-        self.assertEqual(expected_result, Influx._pack_elements(**arguments))
+        self.assertEqual([ccaa1, ccaa2], list(result.index))
+        self.assertEqual([Measurement.PCRS, Measurement.ACCUMULATED_INCIDENCE], list(result.columns))
+        self.assertEqual(2, result.at[ccaa2, Measurement.PCRS])
+        self.assertTrue(pd.api.types.is_integer_dtype(result[Measurement.PCRS]))
+        self.assertTrue(pd.isna(result.at[ccaa2, Measurement.ACCUMULATED_INCIDENCE]))
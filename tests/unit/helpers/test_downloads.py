@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import unittest
+from tempfile import TemporaryDirectory
+from unittest.mock import patch, MagicMock
+from requests.exceptions import HTTPError
+from helpers.downloads import DownloadCache, RenderCache
+
+
+class DownloadCacheUnitTest(unittest.TestCase):
+
+    URL = "https://www.mscbs.gob.es/documentos/Actualizacion_100_COVID-19.pdf"
+
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        self._cache = DownloadCache(self._temp_dir.name)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    @staticmethod
+    def _build_response(status_code, content=b"", headers=None):
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.status_code = status_code
+        response.headers = headers or {}
+        response.iter_content.return_value = [content]
+        if status_code >= 400:
+            response.raise_for_status.side_effect = HTTPError()
+
+        return response
+
+    @patch("helpers.downloads.os")
+    def test_given_no_cache_dir_when_get_cache_dir_then_environment_used(self, os_mock):
+        cache = DownloadCache()
+
+        self.assertEqual(os_mock.environ.get.return_value, cache.cache_dir)
+        os_mock.makedirs.assert_called_once_with(os_mock.environ.get.return_value, exist_ok=True)
+
+    @patch("helpers.downloads.http_client")
+    def test_given_file_not_cached_when_get_then_file_downloaded_and_metadata_stored(self, http_client_mock):
+        http_client_mock.get.return_value = self._build_response(200, b"pdf", {"ETag": "etag1",
+                                                                               "Last-Modified": "modified1"})
+
+        path = self._cache.get(self.URL)
+
+        self.assertTrue(path.endswith(".pdf"))
+        with open(path, "rb") as f:
+            self.assertEqual(b"pdf", f.read())
+        with open(path + ".json") as f:
+            self.assertEqual({"url": self.URL, "etag": "etag1", "last_modified": "modified1"}, json.load(f))
+        http_client_mock.get.assert_called_once_with(self.URL, headers={}, stream=True)
+
+    @patch("helpers.downloads.http_client")
+    def test_given_file_cached_and_not_modified_when_get_then_cached_file_returned(self, http_client_mock):
+        not_modified_response = self._build_response(304)
+        http_client_mock.get.side_effect = [self._build_response(200, b"pdf", {"ETag": "etag1",
+                                                                               "Last-Modified": "modified1"}),
+                                            not_modified_response]
+        first_path = self._cache.get(self.URL)
+
+        path = self._cache.get(self.URL)
+
+        self.assertEqual(first_path, path)
+        with open(path, "rb") as f:
+            self.assertEqual(b"pdf", f.read())
+        http_client_mock.get.assert_called_with(self.URL, headers={"If-None-Match": "etag1",
+                                                                   "If-Modified-Since": "modified1"}, stream=True)
+        not_modified_response.__exit__.assert_called_once()
+
+    @patch("helpers.downloads.http_client")
+    def test_given_file_cached_and_modified_when_get_then_file_replaced(self, http_client_mock):
+        http_client_mock.get.side_effect = [self._build_response(200, b"pdf1", {"ETag": "etag1"}),
+                                            self._build_response(200, b"pdf2", {"ETag": "etag2"})]
+        self._cache.get(self.URL)
+
+        path = self._cache.get(self.URL)
+
+        with open(path, "rb") as f:
+            self.assertEqual(b"pdf2", f.read())
+        http_client_mock.get.assert_called_with(self.URL, headers={"If-None-Match": "etag1"}, stream=True)
+
+    @patch("helpers.downloads.http_client")
+    def test_given_file_not_available_when_get_then_exception_risen_and_nothing_stored(self, http_client_mock):
+        http_client_mock.get.return_value = self._build_response(404)
+
+        with self.assertRaises(HTTPError):
+            self._cache.get(self.URL)
+
+        self.assertEqual([], os.listdir(self._temp_dir.name))
+        http_client_mock.get.return_value.__exit__.assert_called_once()
+
+    @patch.dict("helpers.downloads.os.environ", {"DOWNLOAD_CACHE_MAX_SIZE": "8"})
+    @patch("helpers.downloads.http_client")
+    def test_given_cache_full_when_get_then_least_recently_used_files_removed(self, http_client_mock):
+        http_client_mock.get.side_effect = [self._build_response(200, b"pdf1"), self._build_response(200, b"pdf2"),
+                                            self._build_response(304), self._build_response(200, b"pdf3")]
+        first_path = self._cache.get(self.URL + "1")
+        second_path = self._cache.get(self.URL + "2")
+        os.utime(first_path, (1, time.time()))
+        os.utime(second_path, (2, time.time()))
+        self._cache.get(self.URL + "1")
+
+        third_path = self._cache.get(self.URL + "3")
+
+        self.assertTrue(os.path.exists(first_path))
+        self.assertFalse(os.path.exists(second_path))
+        self.assertFalse(os.path.exists(second_path + ".json"))
+        self.assertTrue(os.path.exists(third_path))
+
+
+class RenderCacheUnitTest(unittest.TestCase):
+
+    URL = "http://localhost:3000/render/d-solo/HukfaHZgk/covid19?orgId=1&panelId=2"
+
+    def setUp(self):
+        self._temp_dir = TemporaryDirectory()
+        self._cache = RenderCache(self._temp_dir.name)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def test_given_render_not_cached_when_get_then_none_returned(self):
+        self.assertIsNone(self._cache.get(self.URL))
+
+    def test_given_render_cached_when_get_then_content_returned(self):
+        self._cache.put(self.URL, b"png")
+
+        self.assertEqual(b"png", self._cache.get(self.URL))
+        self.assertIsNone(self._cache.get(self.URL + "&var-ccaa=Madrid"))
+
+    @patch.dict("helpers.downloads.os.environ", {"RENDER_CACHE_TTL": "60"})
+    def test_given_render_expired_when_get_then_none_returned(self):
+        self._cache.put(self.URL, b"png")
+        file_path = os.path.join(self._temp_dir.name, os.listdir(self._temp_dir.name)[0])
+        os.utime(file_path, (time.time(), time.time() - 61))
+
+        self.assertIsNone(self._cache.get(self.URL))
+
+    @patch.dict("helpers.downloads.os.environ", {"RENDER_CACHE_MAX_SIZE": "8"})
+    def test_given_cache_full_when_put_then_least_recently_used_renders_removed(self):
+        self._cache.put(self.URL + "1", b"png1")
+        self._cache.put(self.URL + "2", b"png2")
+        for i, name in enumerate(sorted(os.listdir(self._temp_dir.name))):
+            os.utime(os.path.join(self._temp_dir.name, name), (i, time.time()))
+        self._cache.get(self.URL + "1")
+
+        self._cache.put(self.URL + "3", b"png3")
+
+        self.assertEqual(b"png1", self._cache.get(self.URL + "1"))
+        self.assertIsNone(self._cache.get(self.URL + "2"))
+        self.assertEqual(b"png3", self._cache.get(self.URL + "3"))
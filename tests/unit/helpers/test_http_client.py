@@ -0,0 +1,41 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from helpers.http_client import HttpClient
+
+
+class HttpClientUnitTest(unittest.TestCase):
+
+    @patch.dict("helpers.http_client.os.environ", {"HTTP_RETRIES": "5", "HTTP_POOL_SIZE": "4"}, clear=True)
+    def test_given_no_session_when_get_session_then_session_built_with_pool_and_retries(self):
+        client = HttpClient()
+
+        session = client.session
+
+        self.assertIs(session, client.session)
+        adapter = session.get_adapter("https://www.mscbs.gob.es")
+        self.assertIs(adapter, session.get_adapter("http://localhost:3000"))
+        self.assertEqual(5, adapter.max_retries.total)
+        self.assertEqual(4, adapter._pool_maxsize)
+        self.assertIn(503, adapter.max_retries.status_forcelist)
+
+    @patch.dict("helpers.http_client.os.environ", {"HTTP_TIMEOUT": "10"}, clear=True)
+    def test_given_url_when_get_then_session_called_with_timeout(self):
+        client = HttpClient()
+        client._session = MagicMock()
+        url = "http://example.com/file.png"
+
+        response = client.get(url, stream=True)
+
+        self.assertEqual(client._session.get.return_value, response)
+        client._session.get.assert_called_once_with(url, timeout=10, stream=True)
+
+    @patch.dict("helpers.http_client.os.environ", {}, clear=True)
+    def test_given_url_when_head_then_session_called_with_default_timeout(self):
+        client = HttpClient()
+        client._session = MagicMock()
+        url = "http://example.com/file.pdf"
+
+        response = client.head(url, allow_redirects=True)
+
+        self.assertEqual(client._session.head.return_value, response)
+        client._session.head.assert_called_once_with(url, timeout=60, allow_redirects=True)
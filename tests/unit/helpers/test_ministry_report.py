@@ -1,9 +1,10 @@
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, patch, call
 from datetime import datetime, date
 from pandas import DataFrame
 from helpers.ministry_report import SpainCovid19MinistryReport, VaccinesMinistryReport
 from helpers.spain_geography import CCAA_POPULATION
+from helpers.report_calendar import ReportCalendar
 
 
 class SpainCovid19MinistryReportUnitTest(unittest.TestCase):
@@ -23,14 +24,26 @@ class SpainCovid19MinistryReportUnitTest(unittest.TestCase):
     def test_given_13_7_when_get_id_then_161_returned(self):
         self.assertEqual(SpainCovid19MinistryReport.get_cases_pdf_id_for_date(datetime(2020, 7, 13)), 161)
 
-    @patch("helpers.ministry_report.DAYS_WITHOUT_REPORT", [date(2020, 12, 8)])
+    @patch("helpers.ministry_report.report_calendar", ReportCalendar([date(2020, 12, 8)]))
     def test_given_9_12_and_8_12_without_report_when_get_id_then_267_returned(self):
         self.assertEqual(SpainCovid19MinistryReport.get_cases_pdf_id_for_date(datetime(2020, 12, 9)), 267)
 
-    @patch("helpers.ministry_report.DAYS_WITHOUT_REPORT", [date(2020, 12, 7), date(2020, 12, 8)])
+    @patch("helpers.ministry_report.report_calendar", ReportCalendar([date(2020, 12, 8), date(2020, 12, 7)]))
     def test_given_9_12_and_7_12_and_8_12_without_report_when_get_id_then_266_returned(self):
         self.assertEqual(SpainCovid19MinistryReport.get_cases_pdf_id_for_date(datetime(2020, 12, 9)), 266)
 
+    @patch("helpers.ministry_report.report_calendar", ReportCalendar([date(2020, 12, 8), date(2020, 12, 7)]))
+    def test_given_dates_when_get_ids_then_same_ids_as_one_by_one_returned(self):
+        dates = [datetime(2020, 5, 10), datetime(2020, 7, 3), datetime(2020, 7, 13), datetime(2020, 12, 9)]
+
+        self.assertEqual([101, 155, 161, 266], list(SpainCovid19MinistryReport.get_cases_pdf_ids_for_dates(dates)))
+
+    def test_given_dates_when_get_urls_then_one_url_per_date_returned(self):
+        urls = SpainCovid19MinistryReport.get_cases_pdf_urls_for_dates([datetime(2020, 5, 14), datetime(2020, 5, 15)])
+
+        self.assertEqual([SpainCovid19MinistryReport.PDF_URL_FORMAT.format(105),
+                          SpainCovid19MinistryReport.PDF_URL_FORMAT.format(106)], urls)
+
     def test_given_cases_pdf_when_get_url_then_cases_pdf_returned(self):
         date = datetime(2020, 5, 5)
         report = SpainCovid19MinistryReport(date, 1)
@@ -49,8 +62,9 @@ class SpainCovid19MinistryReportUnitTest(unittest.TestCase):
         self.assertEqual("https://www.mscbs.gob.es/profesionales/saludPublica/ccayes/alertasActual/nCov/documentos/"
                          f"Informe_Comunicacion_{date.strftime('%Y%m%d')}.ods", report._get_url())
 
-    @patch("helpers.ministry_report.tabula")
-    def test_given_no_data_frame_acceded_when_access_then_tabula_used(self, tabula_mock):
+    @patch("helpers.ministry_report.downloads")
+    @patch("helpers.ministry_report.tabula_server")
+    def test_given_no_data_frame_acceded_when_access_then_tabula_used(self, tabula_mock, downloads_mock):
         date = datetime(2020, 5, 5)
         page = "1"
         area = MagicMock()
@@ -63,12 +77,71 @@ class SpainCovid19MinistryReportUnitTest(unittest.TestCase):
 
         returned_data_frame = report.data_frame
 
-        tabula_mock.read_pdf.assert_called_once_with(report._get_url.return_value, pages=str(page), area=area,
+        tabula_mock.read_pdf.assert_called_once_with(downloads_mock.get.return_value, pages=str(page), area=area,
                                                      pandas_options={'dtype': str})
+        downloads_mock.get.assert_called_once_with(report._get_url.return_value)
         report._get_url.assert_called_once_with()
 
         self.assertEqual(valid_data["Col1*"], list(returned_data_frame['Col1']))
 
+    @patch("helpers.ministry_report.downloads")
+    @patch("helpers.ministry_report.tabula_server")
+    def test_given_report_when_get_page_then_file_downloaded_once_and_tables_extracted_once(self, tabula_mock,
+                                                                                          downloads_mock):
+        report = SpainCovid19MinistryReport(datetime(2020, 5, 5), 1)
+        report._get_url = MagicMock()
+        area = (1, 2, 3, 4)
+        tables_page1 = [DataFrame(data={"Col1": list(CCAA_POPULATION.keys())})]
+        tables_page4 = [DataFrame(data={"Col2": list(CCAA_POPULATION.keys())})]
+        tables_page4_area = [DataFrame(data={"Col3": list(CCAA_POPULATION.keys())})]
+        tabula_mock.read_pdf.side_effect = [tables_page1, tables_page4, tables_page4_area]
+
+        hospitals_report = report.get_page(4)
+        hospitals_area_report = hospitals_report.get_page(4, area)
+        data_frames = [report.data_frame, hospitals_report.data_frame, hospitals_area_report.data_frame,
+                       report.get_page(1).data_frame, report.get_page(4).data_frame]
+
+        self.assertEqual(["Col1", "Col2", "Col3", "Col1", "Col2"], [list(x.columns)[0] for x in data_frames])
+        downloads_mock.get.assert_called_once_with(report._get_url.return_value)
+        file = downloads_mock.get.return_value
+        tabula_mock.read_pdf.assert_has_calls([call(file, pages="1", area=None, pandas_options={'dtype': str}),
+                                               call(file, pages="4", area=None, pandas_options={'dtype': str}),
+                                               call(file, pages="4", area=area, pandas_options={'dtype': str})])
+        self.assertEqual(3, tabula_mock.read_pdf.call_count)
+
+    @patch("helpers.ministry_report.http_client")
+    def test_given_report_published_when_is_available_then_true_returned(self, http_client_mock):
+        report = SpainCovid19MinistryReport(datetime(2020, 5, 5), 1)
+        report._get_url = MagicMock()
+        http_client_mock.head.return_value.status_code = 200
+        http_client_mock.head.return_value.ok = True
+
+        self.assertTrue(report.is_available())
+        http_client_mock.head.assert_called_once_with(report._get_url.return_value, allow_redirects=True)
+        http_client_mock.get.assert_not_called()
+
+    @patch("helpers.ministry_report.http_client")
+    def test_given_report_not_published_when_is_available_then_false_returned(self, http_client_mock):
+        report = SpainCovid19MinistryReport(datetime(2020, 5, 5), 1)
+        report._get_url = MagicMock()
+        http_client_mock.head.return_value.status_code = 404
+        http_client_mock.head.return_value.ok = False
+
+        self.assertFalse(report.is_available())
+        http_client_mock.get.assert_not_called()
+
+    @patch("helpers.ministry_report.http_client")
+    def test_given_head_not_allowed_when_is_available_then_first_byte_requested(self, http_client_mock):
+        report = VaccinesMinistryReport(datetime(2020, 5, 5), 1)
+        report._get_url = MagicMock()
+        http_client_mock.head.return_value.status_code = 405
+        http_client_mock.get.return_value.ok = True
+
+        self.assertTrue(report.is_available())
+        http_client_mock.get.assert_called_once_with(report._get_url.return_value, headers={"Range": "bytes=0-0"},
+                                                     stream=True)
+        http_client_mock.get.return_value.close.assert_called_once_with()
+
     def test_given_dataframe_when_get_column_data_then_map_returned(self):
 
         with patch.object(SpainCovid19MinistryReport, 'data_frame'):
@@ -85,11 +158,35 @@ class SpainCovid19MinistryReportUnitTest(unittest.TestCase):
             self.assertEqual(list(CCAA_POPULATION.keys()), list(result.keys()))
             self.assertEqual(list(range(21000, 40000, 1000)), list(result.values()))
 
-    @patch("helpers.ministry_report.requests")
-    @patch("helpers.ministry_report.NamedTemporaryFile")
+    def test_given_dataframe_when_get_columns_data_then_one_map_per_column_returned(self):
+
+        with patch.object(SpainCovid19MinistryReport, 'data_frame'):
+            report = SpainCovid19MinistryReport(None, None)
+            headers = ["heade1", "header2", "header3"]
+            ccaas = ["Andalucía*", "Castilla y Leon", "Nav-arra (1)"]
+            data1 = ["1.234 5,5", "-", "12%"]
+            data2 = ["3,5", "4,25", "2.000.1"]
+            report.data_frame = DataFrame(data={"Unnamed: 0": headers + ccaas, "Column1": headers + data1,
+                                                "Column2": headers + data2})
+
+            result = report.get_columns_data([1, 2], cast=float, num_rows=3)
+
+            self.assertEqual([{"Andalucía": 1234, "Castilla y León": 0, "Navarra 1": 12},
+                              {"Andalucía": 3.5, "Castilla y León": 4.25, "Navarra 1": 2000}], result)
+
+    def test_given_dataframe_without_part_when_get_column_data_then_exception_risen(self):
+
+        with patch.object(SpainCovid19MinistryReport, 'data_frame'):
+            report = SpainCovid19MinistryReport(None, None)
+            report.data_frame = DataFrame(data={"Unnamed: 0": ["Andalucía", "Aragón"], "Column1": ["1 2", "3"]})
+
+            with self.assertRaises(IndexError):
+                report.get_column_data(1, part=1, num_rows=2)
+
+    @patch("helpers.ministry_report.downloads")
     @patch("helpers.ministry_report.read_ods")
-    def test_given_vaccination_report_when_data_frame_then_request_made(self, read_ods_mock, named_temporary_file_mock,
-                                                                        request_mock):
+    def test_given_vaccination_report_when_data_frame_then_file_downloaded_and_read(self, read_ods_mock,
+                                                                                    downloads_mock):
         date = datetime(2020, 5, 5)
         page = 4
         report = VaccinesMinistryReport(date, page)
@@ -100,8 +197,6 @@ class SpainCovid19MinistryReportUnitTest(unittest.TestCase):
 
         assert result == read_ods_mock.return_value
 
-        request_mock.get.assert_called_once_with(url)
+        downloads_mock.get.assert_called_once_with(url)
         report._get_url.assert_called_once_with()
-        named_temporary_file_mock.return_value.__enter__.return_value.write.assert_called_once_with(request_mock.get.return_value.content)
-        named_temporary_file_mock.return_value.__enter__.return_value.flush.assert_called_once_with()
-        read_ods_mock.assert_called_once_with(named_temporary_file_mock.return_value.__enter__.return_value.name, page)
+        read_ods_mock.assert_called_once_with(downloads_mock.get.return_value, page)
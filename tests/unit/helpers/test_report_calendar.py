@@ -0,0 +1,38 @@
+import unittest
+from datetime import datetime, date
+import pandas as pd
+from helpers.report_calendar import ReportCalendar
+
+
+class ReportCalendarUnitTest(unittest.TestCase):
+
+    def setUp(self):
+        self._calendar = ReportCalendar([date(2020, 12, 25), date(2020, 12, 8), date(2020, 12, 8)])
+
+    def test_given_weekday_when_is_report_day_then_true_returned(self):
+        self.assertTrue(self._calendar.is_report_day(datetime(2020, 12, 9)))
+
+    def test_given_weekend_before_july_2020_when_is_report_day_then_true_returned(self):
+        self.assertTrue(self._calendar.is_report_day(datetime(2020, 5, 16)))
+
+    def test_given_weekend_after_july_2020_when_is_report_day_then_false_returned(self):
+        self.assertFalse(self._calendar.is_report_day(datetime(2020, 7, 4)))
+
+    def test_given_day_without_report_when_is_report_day_then_false_returned(self):
+        self.assertFalse(self._calendar.is_report_day(datetime(2020, 12, 8)))
+
+    def test_given_monday_when_get_previous_report_day_then_friday_returned(self):
+        self.assertEqual(datetime(2020, 12, 4), self._calendar.get_previous_report_day(datetime(2020, 12, 7)))
+
+    def test_given_day_after_day_without_report_when_get_previous_report_day_then_day_skipped(self):
+        self.assertEqual(datetime(2020, 12, 4), self._calendar.get_previous_report_day(datetime(2020, 12, 9), 2))
+
+    def test_given_day_when_count_days_without_report_before_then_only_previous_days_counted(self):
+        self.assertEqual(0, self._calendar.count_days_without_report_before(datetime(2020, 12, 8)))
+        self.assertEqual(1, self._calendar.count_days_without_report_before(datetime(2020, 12, 9)))
+        self.assertEqual(2, self._calendar.count_days_without_report_before(datetime(2021, 1, 1)))
+
+    def test_given_dates_when_count_days_without_report_before_dates_then_only_previous_days_counted(self):
+        dates = pd.DatetimeIndex([datetime(2020, 12, 8), datetime(2020, 12, 9), datetime(2021, 1, 1)])
+
+        self.assertEqual([0, 1, 2], list(self._calendar.count_days_without_report_before_dates(dates)))
@@ -1,9 +1,10 @@
 from datetime import datetime
 import unittest
+import pandas as pd
 from unittest.mock import patch, call, MagicMock
 from helpers.reports import get_tendency_emoji, get_report_sentence, get_report_by_ccaa, get_graph_url, \
     get_global_report, get_global_data, get_territorial_unit_report, get_report_sentence_with_unit, \
-    calculate_global_incidence, get_vaccination_sentence, get_vaccination_report, \
+    calculate_global_incidence, get_ccaa_data, get_vaccination_sentence, get_vaccination_report, \
     get_completed_vaccination_sentence
 from helpers.db import Measurement
 from helpers.spain_geography import CCAA_POPULATION
@@ -19,49 +20,43 @@ class ReportsUnitTest(unittest.TestCase):
         ccaa1 = "Melilla"
         ccaa2 = "Andalucía"
         data_header = "data_header"
-        today_data = {
-            ccaa1: MagicMock(),
-            ccaa2: MagicMock()
-        }
-        yesterday_data = {
-            ccaa1: MagicMock(),
-            ccaa2: MagicMock()
-        }
-        accumulated_data = {
-            ccaa1: MagicMock(),
-            ccaa2: MagicMock()
-        }
+        today_data = pd.DataFrame({Measurement.PCRS: [1, 2, 3]}, index=[ccaa2, ccaa1, "Unknown"])
+        yesterday_data = pd.DataFrame({Measurement.PCRS: [4]}, index=[ccaa2])
+        accumulated_data = pd.DataFrame({Measurement.PCRS: [5, 6]}, index=[ccaa2, ccaa1])
 
         result = get_report_by_ccaa(data_header, today_data, yesterday_data, accumulated_data)
 
         self.assertEqual([get_territorial_unit_report_mock.return_value,
                           get_territorial_unit_report_mock.return_value], result)
 
-        # Note: info is published in alphabetical order
+        # Note: info is published in the order of the data, which is already sorted alphabetically.
+        # Territorial units without data are given an empty dict.
         get_territorial_unit_report_mock.assert_has_calls([
-            call(ccaa2, data_header, today_data[ccaa2], yesterday_data[ccaa2], accumulated_data[ccaa2], vaccination_info=False),
-            call(ccaa1, data_header, today_data[ccaa1], yesterday_data[ccaa1], accumulated_data[ccaa1], vaccination_info=False)
+            call(ccaa2, data_header, {Measurement.PCRS: 1}, {Measurement.PCRS: 4}, {Measurement.PCRS: 5},
+                 vaccination_info=False),
+            call(ccaa1, data_header, {Measurement.PCRS: 2}, {}, {Measurement.PCRS: 6}, vaccination_info=False)
         ])
 
+    def test_given_na_values_when_get_ccaa_data_then_none_and_python_numbers_returned(self):
+        ccaa = "Melilla"
+        data = pd.DataFrame({
+            Measurement.PCRS: [1],
+            Measurement.ACCUMULATED_INCIDENCE: [None]
+        }, index=[ccaa]).convert_dtypes()
+
+        result = get_ccaa_data(data, ccaa)
+
+        self.assertEqual({Measurement.PCRS: 1, Measurement.ACCUMULATED_INCIDENCE: None}, result)
+        self.assertIs(int, type(result[Measurement.PCRS]))
+
     @patch("helpers.reports.get_territorial_unit_report")
     @patch("helpers.reports.get_global_data")
     def test_given_data_when_get_global_report_then_report_returned(self, get_global_data_mock,
                                                                     get_territorial_unit_report_mock):
-        ccaa1 = "Melilla"
-        ccaa2 = "Andalucia"
         data_header = "data_header"
-        today_data = {
-            ccaa1: MagicMock(),
-            ccaa2: MagicMock()
-        }
-        yesterday_data = {
-            ccaa1: MagicMock(),
-            ccaa2: MagicMock()
-        }
-        accumulated_today = {
-            ccaa1: MagicMock(),
-            ccaa2: MagicMock()
-        }
+        today_data = MagicMock()
+        yesterday_data = MagicMock()
+        accumulated_today = MagicMock()
 
         global_today_data = MagicMock()
         global_yesterday_data = MagicMock()
@@ -80,19 +75,17 @@ class ReportsUnitTest(unittest.TestCase):
                                                call(accumulated_today)])
 
     def test_given_no_data_when_global_data_then_empty_dict_returned(self):
-        self.assertEqual({}, get_global_data({}))
+        self.assertEqual({}, get_global_data(pd.DataFrame()))
 
     @patch("helpers.reports.calculate_global_incidence")
     def test_given_data_for_one_ccaa_when_global_data_then_ccaa_data_returned(self, calculate_global_incidence_mock):
         ccaa = "Melilla"
         pcrs = 100
         deaths = 4
-        data = {
-            ccaa: {
-                Measurement.PCRS: pcrs,
-                Measurement.DEATHS: deaths
-            }
-        }
+        data = pd.DataFrame({
+            Measurement.PCRS: [pcrs],
+            Measurement.DEATHS: [deaths]
+        }, index=[ccaa])
 
         self.assertEqual({
             Measurement.PCRS: pcrs,
@@ -109,16 +102,10 @@ class ReportsUnitTest(unittest.TestCase):
         ccaa2 = "Andalucía"
         pcrs2 = 400
         deaths2 = 7
-        data = {
-            ccaa1: {
-                Measurement.PCRS: pcrs1,
-                Measurement.DEATHS: deaths1
-            },
-            ccaa2: {
-                Measurement.PCRS: pcrs2,
-                Measurement.DEATHS: deaths2
-            }
-        }
+        data = pd.DataFrame({
+            Measurement.PCRS: [pcrs1, pcrs2, 1000],
+            Measurement.DEATHS: [deaths1, deaths2, 1000]
+        }, index=[ccaa1, ccaa2, "Unknown"])
 
         self.assertEqual({
             Measurement.PCRS: pcrs1 + pcrs2,
@@ -127,6 +114,17 @@ class ReportsUnitTest(unittest.TestCase):
 
         calculate_global_incidence_mock.assert_not_called()
 
+    def test_given_missing_values_when_global_data_then_missing_values_ignored(self):
+        data = pd.DataFrame({
+            Measurement.PCRS: [100, None],
+            Measurement.VACCINATIONS: [None, None]
+        }, index=["Melilla", "Andalucía"]).convert_dtypes()
+
+        self.assertEqual({
+            Measurement.PCRS: 100,
+            Measurement.VACCINATIONS: 0
+        }, get_global_data(data))
+
     @patch("helpers.reports.calculate_global_incidence")
     def test_given_accumulated_incidence_when_global_data_then_calculate_global_incidence_returned(self,
                                                                                                    calculate_global_incidence_mock):
@@ -136,28 +134,13 @@ class ReportsUnitTest(unittest.TestCase):
         ccaa2 = "Andalucía"
         pcrs2 = 400
         deaths2 = 7
-        ia1 = 1.1
-        ia2 = 2.2
-        percentage_icu1 = 3.3
-        percentage_icu2 = 4.4
-        percentage_admitted1 = 5.5
-        percentage_admitted2 = 6.6
-        data = {
-            ccaa1: {
-                Measurement.PCRS: pcrs1,
-                Measurement.DEATHS: deaths1,
-                Measurement.ACCUMULATED_INCIDENCE: ia1,
-                Measurement.PERCENTAGE_ICU: percentage_icu1,
-                Measurement.PERCENTAGE_ADMITTED: percentage_admitted1
-            },
-            ccaa2: {
-                Measurement.PCRS: pcrs2,
-                Measurement.DEATHS: deaths2,
-                Measurement.ACCUMULATED_INCIDENCE: ia2,
-                Measurement.PERCENTAGE_ICU: percentage_icu2,
-                Measurement.PERCENTAGE_ADMITTED: percentage_admitted2
-            }
-        }
+        data = pd.DataFrame({
+            Measurement.PCRS: [pcrs1, pcrs2],
+            Measurement.DEATHS: [deaths1, deaths2],
+            Measurement.ACCUMULATED_INCIDENCE: [1.1, 2.2],
+            Measurement.PERCENTAGE_ICU: [3.3, 4.4],
+            Measurement.PERCENTAGE_ADMITTED: [5.5, 6.6]
+        }, index=[ccaa1, ccaa2])
 
         self.assertEqual({
             Measurement.PCRS: pcrs1 + pcrs2,
@@ -172,16 +155,14 @@ class ReportsUnitTest(unittest.TestCase):
                                                           call(data, Measurement.PERCENTAGE_ICU)])
 
     def test_given_no_data_when_calculate_global_incidence_then_zero_returned(self):
-        self.assertEqual(0, calculate_global_incidence({}, Measurement.ACCUMULATED_INCIDENCE))
+        self.assertEqual(0, calculate_global_incidence(pd.DataFrame(), Measurement.ACCUMULATED_INCIDENCE))
 
     def test_given_only_one_ccaa_when_calculate_global_incidence_then_same_value_returned(self):
         ia = 7
 
-        result = calculate_global_incidence({
-            "Castilla y León": {
-                Measurement.ACCUMULATED_INCIDENCE: ia
-            }
-        }, Measurement.ACCUMULATED_INCIDENCE)
+        result = calculate_global_incidence(pd.DataFrame({
+            Measurement.ACCUMULATED_INCIDENCE: [ia]
+        }, index=["Castilla y León"]), Measurement.ACCUMULATED_INCIDENCE)
 
         # Round because the operation is returning 6.999999
         self.assertEqual(ia, round(result, 0))
@@ -192,14 +173,9 @@ class ReportsUnitTest(unittest.TestCase):
         ccaa1 = "Castilla y León"
         ccaa2 = "Castilla La Mancha"
 
-        result = calculate_global_incidence({
-            ccaa1: {
-                Measurement.ACCUMULATED_INCIDENCE: ia1
-            },
-            ccaa2: {
-                Measurement.ACCUMULATED_INCIDENCE: ia2
-            }
-        }, Measurement.ACCUMULATED_INCIDENCE)
+        result = calculate_global_incidence(pd.DataFrame({
+            Measurement.ACCUMULATED_INCIDENCE: [ia1, ia2]
+        }, index=[ccaa1, ccaa2]), Measurement.ACCUMULATED_INCIDENCE)
 
 
         population_ccaa1 = CCAA_POPULATION[ccaa1]
@@ -425,21 +401,23 @@ class ReportsUnitTest(unittest.TestCase):
                          f"&var-{var1_name}={var1_value}&var-{var2_name}={var2_value}",
                          get_graph_url(date1, date2, {var1_name: var1_value, var2_name: var2_value}))
 
-    @patch("helpers.reports.CCAA_POPULATION", {"Madrid": 8000000, "Cataluña": 10000000})
     def test_given_existing_ccaa_when_get_vaccination_sentence_then_ccaa_population_used(self):
         self.assertEqual("- Dosis: 2.000 🔺500", get_vaccination_sentence("Dosis", 2000, 500))
 
-    @patch("helpers.reports.CCAA_POPULATION", {"Madrid": 8000000, "Cataluña": 10000000})
     def test_given_non_existing_ccaa_when_get_vaccination_sentence_then_whole_population_used(self):
         self.assertEqual("- Dosis: 2.000 🔺700", get_vaccination_sentence("Dosis", 2000, 700))
 
-    @patch("helpers.reports.CCAA_POPULATION", {"Madrid": 8000000, "Cataluña": 10000000})
-    def test_given_existing_ccaa_when_get_completed_vaccination_sentence_then_ccaa_population_used(self):
+    @patch("helpers.reports.get_population", return_value=8000000)
+    def test_given_existing_ccaa_when_get_completed_vaccination_sentence_then_ccaa_population_used(self,
+                                                                                                   get_population_mock):
         self.assertEqual("- Dosis: 2.000 (0,03%) 🔺500", get_completed_vaccination_sentence("Madrid", "Dosis", 2000, 500))
+        get_population_mock.assert_called_once_with("Madrid")
 
-    @patch("helpers.reports.CCAA_POPULATION", {"Madrid": 8000000, "Cataluña": 10000000})
-    def test_given_non_existing_ccaa_when_get_completed_vaccination_sentence_then_whole_population_used(self):
+    @patch("helpers.reports.get_population", return_value=18000000)
+    def test_given_non_existing_ccaa_when_get_completed_vaccination_sentence_then_whole_population_used(self,
+                                                                                                       get_population_mock):
         self.assertEqual("- Dosis: 2.000 (0,01%) 🔺700", get_completed_vaccination_sentence("España", "Dosis", 2000, 700))
+        get_population_mock.assert_called_once_with("España")
 
     @patch("helpers.reports.get_completed_vaccination_sentence")
     def test_when_get_spain_vaccination_report_then_data_aggregated(self, get_completed_vaccination_sentence_mock):
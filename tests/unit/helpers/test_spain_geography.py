@@ -1,5 +1,6 @@
 import unittest
-from helpers.spain_geography import get_impact_string
+from helpers.spain_geography import get_impact_string, get_population, get_ccaa_index, normalize_ccaa_name, \
+    CCAAS, CCAA_INDEX, CCAA_POPULATION, CCAA_ICU_BEDS, POPULATION, ICU_BEDS, SPAIN_POPULATION
 
 
 class SpainGeographyUnitTest(unittest.TestCase):
@@ -15,3 +16,29 @@ class SpainGeographyUnitTest(unittest.TestCase):
 
     def test_given_no_ccaa_and_positive_when_get_impact_string_then_spain_impact_returned(self):
         self.assertEqual("0,02/100.000 hab.", get_impact_string(10))
+
+    def test_when_get_vectors_then_values_follow_ccaas_order(self):
+        self.assertEqual(len(CCAAS), len(POPULATION))
+        self.assertEqual(CCAA_POPULATION["Madrid"], POPULATION[CCAA_INDEX["Madrid"]])
+        self.assertEqual(CCAA_ICU_BEDS["Ceuta"], ICU_BEDS[CCAA_INDEX["Ceuta"]])
+        self.assertEqual(sum(CCAA_POPULATION.values()), SPAIN_POPULATION)
+
+    def test_when_modify_vector_then_error_raised(self):
+        with self.assertRaises(ValueError):
+            POPULATION[0] = 0
+
+    def test_given_ccaa_when_get_population_then_ccaa_population_returned(self):
+        self.assertEqual(CCAA_POPULATION["Madrid"], get_population("Madrid"))
+
+    def test_given_no_ccaa_when_get_population_then_spain_population_returned(self):
+        self.assertEqual(SPAIN_POPULATION, get_population())
+        self.assertEqual(SPAIN_POPULATION, get_population("España"))
+
+    def test_given_report_name_when_normalize_ccaa_name_then_ccaa_name_returned(self):
+        self.assertEqual("Castilla y León", normalize_ccaa_name("Castilla y Leon*"))
+        self.assertEqual("Navarra", normalize_ccaa_name("Nav arra"))
+        self.assertEqual("Castilla La Mancha", normalize_ccaa_name("Castilla La\rMancha"))
+
+    def test_given_report_name_when_get_ccaa_index_then_index_returned(self):
+        self.assertEqual(CCAA_INDEX["Castilla y León"], get_ccaa_index("Castilla y Leon"))
+        self.assertIsNone(get_ccaa_index("Unknown"))
@@ -0,0 +1,153 @@
+import tempfile
+import unittest
+from threading import Thread
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+from unittest.mock import patch, MagicMock
+from helpers import tabula_server
+from helpers.tabula_server import read_pdf, get_address, get_authkey, serve
+
+
+class TabulaServerUnitTest(unittest.TestCase):
+
+    @patch.dict("helpers.tabula_server.os.environ", {"TABULA_SERVER": "localhost:6001"})
+    def test_given_server_defined_when_get_address_then_host_and_port_returned(self):
+        self.assertEqual(("localhost", 6001), get_address())
+
+    @patch.dict("helpers.tabula_server.os.environ", {}, clear=True)
+    def test_given_no_server_defined_when_get_address_then_none_returned(self):
+        self.assertIsNone(get_address())
+
+    @patch.dict("helpers.tabula_server.os.environ", {}, clear=True)
+    def test_given_no_key_defined_when_get_authkey_then_none_returned(self):
+        self.assertIsNone(get_authkey())
+
+    @patch.dict("helpers.tabula_server.os.environ", {}, clear=True)
+    @patch("helpers.tabula_server.Listener")
+    def test_given_no_key_defined_when_serve_then_server_not_started(self, listener_mock):
+        with self.assertRaises(ValueError):
+            serve(6001)
+
+        listener_mock.assert_not_called()
+
+    @patch.dict("helpers.tabula_server.os.environ", {"TABULA_SERVER_KEY": "secret"})
+    @patch("helpers.tabula_server.Listener")
+    def test_given_key_defined_when_serve_then_server_listens_on_localhost(self, listener_mock):
+        listener_mock.return_value.__enter__.return_value.accept.side_effect = KeyboardInterrupt()
+
+        with self.assertRaises(KeyboardInterrupt):
+            serve(6001)
+
+        listener_mock.assert_called_once_with(("localhost", 6001), authkey=b"secret")
+
+    @patch.dict("helpers.tabula_server.os.environ", {"TABULA_SERVER": "localhost:6001"}, clear=True)
+    @patch("helpers.tabula_server.Client")
+    @patch("helpers.tabula_server.tabula")
+    def test_given_server_without_key_when_read_pdf_then_tables_extracted_locally(self, tabula_mock, client_mock):
+        result = read_pdf("file.pdf", pages="1")
+
+        self.assertEqual(tabula_mock.read_pdf.return_value, result)
+        client_mock.assert_not_called()
+
+    @patch("helpers.tabula_server.get_address", return_value=None)
+    @patch("helpers.tabula_server.tabula")
+    def test_given_no_server_when_read_pdf_then_tables_extracted_locally(self, tabula_mock, _):
+        result = read_pdf("file.pdf", pages="1")
+
+        self.assertEqual(tabula_mock.read_pdf.return_value, result)
+        tabula_mock.read_pdf.assert_called_once_with("file.pdf", pages="1")
+
+    @patch.dict("helpers.tabula_server.os.environ", {"TABULA_SERVER_KEY": "secret"})
+    @patch("helpers.tabula_server.get_address", return_value=("localhost", 6001))
+    @patch("helpers.tabula_server.Client")
+    @patch("helpers.tabula_server.tabula")
+    def test_given_server_not_running_when_read_pdf_then_tables_extracted_locally(self, tabula_mock, client_mock, _):
+        client_mock.side_effect = ConnectionRefusedError()
+
+        result = read_pdf("file.pdf", pages="1")
+
+        self.assertEqual(tabula_mock.read_pdf.return_value, result)
+        tabula_mock.read_pdf.assert_called_once_with("file.pdf", pages="1")
+
+    @patch.dict("helpers.tabula_server.os.environ", {"TABULA_SERVER_KEY": "secret"})
+    @patch("helpers.tabula_server.tabula")
+    def test_given_server_running_when_read_pdf_then_tables_extracted_by_server(self, tabula_mock):
+        tabula_mock.read_pdf.side_effect = lambda pdf_file, **kwargs: [pdf_file.read(), kwargs]
+
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file, \
+                Listener(("localhost", 0), authkey=get_authkey()) as listener:
+            def serve_one():
+                with listener.accept() as connection:
+                    tabula_server._handle_request(connection)
+
+            server = Thread(target=serve_one)
+            server.start()
+
+            with patch("helpers.tabula_server.get_address", return_value=listener.address):
+                pdf_file.write(b"%PDF-1.4")
+                pdf_file.flush()
+                result = read_pdf(pdf_file.name, pages="4", area=(1, 2, 3, 4))
+
+            server.join()
+
+        # The server receives the contents of the file, not its path
+        self.assertEqual([b"%PDF-1.4", {"pages": "4", "area": (1, 2, 3, 4)}], result)
+
+    @patch("helpers.tabula_server.tabula")
+    def test_given_extraction_error_when_handle_request_then_error_sent(self, tabula_mock):
+        tabula_mock.read_pdf.side_effect = ValueError("file.pdf is empty")
+        connection = MagicMock()
+        connection.recv.return_value = (b"%PDF-1.4", {})
+
+        tabula_server._handle_request(connection)
+
+        data_frames, error = connection.send.call_args[0][0]
+        self.assertIsNone(data_frames)
+        self.assertEqual("ValueError: file.pdf is empty", str(error))
+
+    @patch.dict("helpers.tabula_server.os.environ", {"TABULA_SERVER_KEY": "secret"})
+    @patch("helpers.tabula_server.get_address", return_value=("localhost", 6001))
+    @patch("helpers.tabula_server.Client")
+    def test_given_server_error_when_read_pdf_then_error_risen(self, client_mock, _):
+        client_mock.return_value.__enter__.return_value.recv.return_value = (None, RuntimeError("error"))
+
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+            with self.assertRaises(RuntimeError):
+                read_pdf(pdf_file.name)
+
+    @patch.dict("helpers.tabula_server.os.environ", {"TABULA_SERVER_KEY": "secret"})
+    @patch("helpers.tabula_server.tabula")
+    def test_given_server_with_other_key_when_read_pdf_then_tables_extracted_locally(self, tabula_mock):
+        with Listener(("localhost", 0), authkey=b"other") as listener:
+            def accept_one():
+                try:
+                    listener.accept().close()
+                except AuthenticationError:
+                    pass
+
+            server = Thread(target=accept_one)
+            server.start()
+
+            with patch("helpers.tabula_server.get_address", return_value=listener.address):
+                result = read_pdf("file.pdf", pages="1")
+
+            server.join()
+
+        self.assertEqual(tabula_mock.read_pdf.return_value, result)
+        tabula_mock.read_pdf.assert_called_once_with("file.pdf", pages="1")
+
+    @patch.dict("helpers.tabula_server.os.environ", {"TABULA_SERVER_KEY": "secret", "TABULA_SERVER_TIMEOUT": "5"})
+    @patch("helpers.tabula_server.get_address", return_value=("localhost", 6001))
+    @patch("helpers.tabula_server.Client")
+    @patch("helpers.tabula_server.tabula")
+    def test_given_server_not_answering_when_read_pdf_then_tables_extracted_locally(self, tabula_mock, client_mock, _):
+        connection = client_mock.return_value.__enter__.return_value
+        connection.poll.return_value = False
+
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+            result = read_pdf(pdf_file.name, pages="1")
+
+        connection.poll.assert_called_once_with(5)
+        connection.recv.assert_not_called()
+        self.assertEqual(tabula_mock.read_pdf.return_value, result)
+        tabula_mock.read_pdf.assert_called_once_with(pdf_file.name, pages="1")
@@ -1,6 +1,8 @@
 import unittest
 from unittest.mock import patch, call, MagicMock
-from helpers.twitter import Twitter, MediaNotAccessibleError
+from concurrent.futures import Future
+from io import BytesIO
+from helpers.twitter import Twitter, MediaNotAccessibleError, TweetTooLongError
 
 
 class TwitterUnitTest(unittest.TestCase):
@@ -51,6 +53,70 @@ class TwitterUnitTest(unittest.TestCase):
             self.assertEqual(twitter.client.update_status.return_value.id, tweet_id)
             twitter.client.update_status.assert_called_once_with(tweet, in_response_to)
 
+    def test_given_tweet_and_media_when_publish_tweet_then_media_attached(self):
+        with patch.object(Twitter, 'client'):
+            twitter = Twitter()
+            twitter.client = MagicMock()
+
+            tweet_id = twitter.publish_tweet("tweet", None, [123])
+
+            self.assertEqual(twitter.client.update_status.return_value.id, tweet_id)
+            twitter.client.update_status.assert_called_once_with("tweet", None, media_ids=[123])
+
+    def test_given_tweets_and_media_when_publish_thread_then_media_attached_to_first_tweet(self):
+        twitter = Twitter()
+        twitter.publish_tweet = MagicMock(side_effect=[1, 2, 3])
+        media = Future()
+        media.set_result(123)
+
+        last_tweet = twitter.publish_thread(["tweet1", "tweet2", "tweet3"], media, 789)
+
+        self.assertEqual(3, last_tweet)
+        twitter.publish_tweet.assert_has_calls([call("tweet1", 789, [123]), call("tweet2", 1), call("tweet3", 2)])
+
+    def test_given_media_not_uploaded_when_publish_thread_then_tweets_published_without_media(self):
+        twitter = Twitter()
+        twitter.publish_tweet = MagicMock(side_effect=[1, 2])
+        media = Future()
+        media.set_result(None)
+
+        twitter.publish_thread(["tweet1", "tweet2"], media)
+
+        twitter.publish_tweet.assert_has_calls([call("tweet1", None, None), call("tweet2", 1)])
+
+    def test_given_tweet_too_long_when_publish_thread_then_exception_risen_and_nothing_published(self):
+        twitter = Twitter()
+        twitter.publish_tweet = MagicMock()
+
+        with self.assertRaises(TweetTooLongError):
+            twitter.publish_thread(["tweet1", "a" * 281])
+
+        twitter.publish_tweet.assert_not_called()
+
+    def test_given_url_when_upload_media_then_file_downloaded_and_uploaded_in_background(self):
+        with patch.object(Twitter, 'client'):
+            twitter = Twitter()
+            twitter.client = MagicMock()
+            media_file = BytesIO(b"png")
+            twitter._download_media = MagicMock(return_value=media_file)
+            url = "http://example.com/file.png"
+
+            media_id = twitter.upload_media(url).result()
+
+            self.assertEqual(twitter.client.media_upload.return_value.media_id, media_id)
+            twitter._download_media.assert_called_once_with(url)
+            twitter.client.media_upload.assert_called_once_with("graph.png", file=media_file)
+            self.assertTrue(media_file.closed)
+
+    def test_given_file_not_downloaded_when_upload_media_then_none_returned(self):
+        with patch.object(Twitter, 'client'):
+            twitter = Twitter()
+            twitter.client = MagicMock()
+            twitter._download_media = MagicMock(side_effect=MediaNotAccessibleError())
+
+            self.assertIsNone(twitter.upload_media("http://example.com/file.png").result())
+            twitter.client.media_upload.assert_not_called()
+
     def test_when_send_dm_error_then_send_dm_called(self):
         with patch.object(Twitter, 'client'):
             twitter = Twitter()
@@ -62,73 +128,97 @@ class TwitterUnitTest(unittest.TestCase):
             twitter.client.get_user.assert_called_once_with("aitormagan")
             twitter.client.send_direct_message(twitter.client.get_user.return_value.id, dm)
 
-    @patch("helpers.twitter.NamedTemporaryFile")
-    def test_given_url_and_text_when_publish_with_media_then_file_downloaded_and_tweet_published(self, temp_file_mock):
+    @patch("helpers.twitter.time")
+    def test_given_dm_sent_recently_when_send_dm_then_dm_not_sent(self, time_mock):
         with patch.object(Twitter, 'client'):
             twitter = Twitter()
             twitter.client = MagicMock()
-            twitter._download_file = MagicMock()
-            url = "http://example.com/file.jpg"
-            text = "this is an example"
-            in_response_to = MagicMock()
+            time_mock.monotonic.side_effect = [1000, 1299, 1300]
 
-            tweet_id = twitter.publish_tweet_with_media(text, url, in_response_to)
+            twitter.send_dm("error 1")
+            twitter.send_dm("error 2")
+            twitter.send_dm("error 3")
 
-            self.assertEqual(twitter.client.update_with_media.return_value.id, tweet_id)
-            temp_file_mock.assert_called_once_with(suffix=".png")
+            twitter.client.send_direct_message.assert_has_calls([
+                call(twitter.client.get_user.return_value.id, "error 1"),
+                call(twitter.client.get_user.return_value.id, "error 3")])
+            self.assertEqual(2, twitter.client.send_direct_message.call_count)
 
-            with temp_file_mock.return_value as temp_file:
-                twitter._download_file.assert_called_once_with(url, temp_file)
-                twitter.client.update_with_media.assert_called_once_with(temp_file.name, text,
-                                                                         in_reply_to_status_id=in_response_to)
+    @patch("helpers.twitter.renders")
+    def test_given_url_when_download_media_then_file_downloaded_in_memory(self, renders_mock):
+        renders_mock.get.return_value = None
+        twitter = Twitter()
+        twitter._download_file = MagicMock(side_effect=lambda url, file: file.write(b"png"))
+        url = "http://example.com/file.jpg"
 
-    @patch("helpers.twitter.NamedTemporaryFile")
-    def test_given_exception_downloading_file_when_publish_with_media_then_tweet_without_media_published(self,
-                                                                                                         temp_file_mock):
-        with patch.object(Twitter, 'client'):
-            twitter = Twitter()
-            twitter.client = MagicMock()
-            twitter._download_file = MagicMock(side_effect=MediaNotAccessibleError())
-            twitter.publish_tweet = MagicMock()
-            url = "http://example.com/file.jpg"
-            text = "this is an example"
-            in_response_to = MagicMock()
+        media_file = twitter._download_media(url)
 
-            tweet_id = twitter.publish_tweet_with_media(text, url, in_response_to)
+        self.assertEqual(b"png", media_file.read())
+        twitter._download_file.assert_called_once_with(url, media_file)
+        renders_mock.get.assert_called_once_with(url)
+        renders_mock.put.assert_called_once_with(url, b"png")
+
+    @patch("helpers.twitter.renders")
+    def test_given_cached_render_when_download_media_then_file_not_downloaded(self, renders_mock):
+        renders_mock.get.return_value = b"png"
+        twitter = Twitter()
+        twitter._download_file = MagicMock()
 
-            self.assertEqual(twitter.publish_tweet.return_value, tweet_id)
-            temp_file_mock.assert_called_once_with(suffix=".png")
+        media_file = twitter._download_media("http://example.com/file.jpg")
+
+        self.assertEqual(b"png", media_file.read())
+        twitter._download_file.assert_not_called()
+
+    @patch("helpers.twitter.renders")
+    def test_given_cache_not_writable_when_download_media_then_file_returned(self, renders_mock):
+        renders_mock.get.side_effect = OSError()
+        renders_mock.put.side_effect = OSError()
+        twitter = Twitter()
+        twitter._download_file = MagicMock(side_effect=lambda url, file: file.write(b"png"))
 
-            with temp_file_mock.return_value as temp_file:
-                twitter._download_file.assert_called_once_with(url, temp_file)
-                twitter.client.update_with_media.assert_not_called()
-                twitter.publish_tweet.assert_called_once_with(text, in_response_to)
+        media_file = twitter._download_media("http://example.com/file.jpg")
 
-    @patch("helpers.twitter.requests")
-    def test_given_file_cannot_be_downloaded_when_download_file_then_exception_risen(self, requests_mock):
-        requests_mock.get.return_value.status_code = 500
+        self.assertEqual(b"png", media_file.read())
+
+    @patch("helpers.twitter.renders")
+    def test_given_file_not_downloaded_when_download_media_then_exception_risen(self, renders_mock):
+        renders_mock.get.return_value = None
+        twitter = Twitter()
+        twitter._download_file = MagicMock(side_effect=MediaNotAccessibleError())
+
+        with self.assertRaises(MediaNotAccessibleError):
+            twitter._download_media("http://example.com/file.jpg")
+
+        renders_mock.put.assert_not_called()
+
+    @patch("helpers.twitter.http_client")
+    def test_given_file_cannot_be_downloaded_when_download_file_then_exception_risen(self, http_client_mock):
+        response = http_client_mock.get.return_value.__enter__.return_value
+        response.status_code = 500
         url = MagicMock()
 
         with self.assertRaises(MediaNotAccessibleError) as context:
             Twitter._download_file(url, MagicMock())
 
         self.assertEqual("File could not be downloaded", str(context.exception))
-        requests_mock.get.assert_called_once_with(url)
+        http_client_mock.get.assert_called_once_with(url, stream=True)
+        http_client_mock.get.return_value.__exit__.assert_called_once()
 
-    @patch("helpers.twitter.requests")
-    def test_given_file_can_be_downloaded_when_download_file_then_file_is_written(self, requests_mock):
+    @patch("helpers.twitter.http_client")
+    def test_given_file_can_be_downloaded_when_download_file_then_file_is_written(self, http_client_mock):
         chunk1 = MagicMock()
         chunk2 = MagicMock()
-        requests_mock.get.return_value.status_code = 200
-        requests_mock.get.return_value.__iter__ = lambda x: iter([chunk1, chunk2])
+        response = http_client_mock.get.return_value.__enter__.return_value
+        response.status_code = 200
+        response.iter_content.return_value = [chunk1, chunk2]
         url = MagicMock()
         file = MagicMock()
 
         Twitter._download_file(url, file)
 
-        requests_mock.get.assert_called_once_with(url)
+        http_client_mock.get.assert_called_once_with(url, stream=True)
+        response.iter_content.assert_called_once_with(chunk_size=256 * 1024)
         file.write.assert_has_calls([call(chunk1), call(chunk2)])
-        file.flush.assert_called_once_with()
 
     def test_when_publish_sentences_in_tweets_then_split_and_publish(self):
         twitter = Twitter()
@@ -199,3 +289,26 @@ class TwitterUnitTest(unittest.TestCase):
         sentence = "this is a test 🔺"
 
         self.assertEqual(len(sentence) + 1, twitter._get_tweet_length(sentence))
+
+    def test_given_url_in_text_when_get_tweet_length_then_url_counted_as_23_returned(self):
+        sentence = "➡️ Gráfico: https://home.aitormagan.es/d/TeEplNgRk/covid-vacunas-espana?orgId=1"
+
+        self.assertEqual(len("➡️ Gráfico: ") + 23, Twitter._get_tweet_length(sentence))
+
+    def test_given_emoji_sequences_in_text_when_get_tweet_length_then_each_sequence_counted_as_2(self):
+        self.assertEqual(2, Twitter._get_tweet_length("🇪🇸"))
+        self.assertEqual(2, Twitter._get_tweet_length("👍🏽"))
+        self.assertEqual(2, Twitter._get_tweet_length("👩‍❤️‍👨"))
+        self.assertEqual(2, Twitter._get_tweet_length("1️⃣"))
+
+    def test_given_cjk_text_when_get_tweet_length_then_characters_counted_as_2(self):
+        self.assertEqual(4, Twitter._get_tweet_length("日本"))
+
+    def test_given_many_sentences_when_split_tweets_then_every_tweet_fits_and_sentences_kept_in_order(self):
+        sentences = [f"🔺 Sentence number {i}" for i in range(1000)]
+        twitter = Twitter()
+
+        result = twitter._split_tweets(sentences)
+
+        self.assertTrue(all(twitter._get_tweet_length(tweet) <= 280 for tweet in result))
+        self.assertEqual(sentences, "\n".join(result).split("\n"))
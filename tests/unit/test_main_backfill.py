@@ -0,0 +1,105 @@
+import unittest
+from datetime import datetime, date
+from unittest.mock import patch, MagicMock, call
+from main_backfill import main, backfill, get_report_days, get_report_data_or_none, rebuild_rollups, Measurement
+from helpers.report_calendar import ReportCalendar
+
+
+class MainBackfillUnitTest(unittest.TestCase):
+
+    @patch("main_backfill.backfill")
+    @patch("main_backfill.get_report_days")
+    def test_given_dates_when_main_then_backfill_called(self, get_report_days_mock, backfill_mock):
+        main(["2021-01-04", "2021-01-08", "--workers", "3"])
+
+        get_report_days_mock.assert_called_once_with(datetime(2021, 1, 4), datetime(2021, 1, 8))
+        backfill_mock.assert_called_once_with(get_report_days_mock.return_value, 3)
+
+    @patch("main_backfill.rebuild_rollups")
+    @patch("main_backfill.backfill")
+    def test_given_rollups_only_when_main_then_only_rollups_rebuilt(self, backfill_mock, rebuild_rollups_mock):
+        main(["2021-01-04", "2021-01-08", "--rollups-only"])
+
+        rebuild_rollups_mock.assert_called_once_with(datetime(2021, 1, 4), datetime(2021, 1, 8))
+        backfill_mock.assert_not_called()
+
+    @patch("main_backfill.influx")
+    def test_given_dates_when_rebuild_rollups_then_every_day_rolled_up_by_measurement(self, influx_mock):
+        influx_mock.ROLLUP_AGGREGATIONS = {Measurement.PCRS: "sum", Measurement.ACCUMULATED_INCIDENCE: "last"}
+        days = [datetime(2021, 1, 8), datetime(2021, 1, 9), datetime(2021, 1, 10)]
+
+        rebuild_rollups(days[0], days[-1])
+
+        influx_mock.update_rollups.assert_has_calls([call({Measurement.PCRS: days}),
+                                                     call({Measurement.ACCUMULATED_INCIDENCE: days})])
+
+    def test_given_week_when_get_report_days_then_weekend_excluded(self):
+        self.assertEqual([datetime(2021, 1, 8), datetime(2021, 1, 11)],
+                         get_report_days(datetime(2021, 1, 8), datetime(2021, 1, 11)))
+
+    @patch("main_backfill.report_calendar", ReportCalendar([date(2021, 1, 6)]))
+    def test_given_day_without_report_when_get_report_days_then_day_excluded(self):
+        self.assertEqual([datetime(2021, 1, 5), datetime(2021, 1, 7)],
+                         get_report_days(datetime(2021, 1, 5), datetime(2021, 1, 7)))
+
+    @patch("main_backfill.get_report_data")
+    def test_given_report_when_get_report_data_or_none_then_data_returned(self, get_report_data_mock):
+        day = datetime(2021, 1, 4)
+
+        self.assertEqual(get_report_data_mock.return_value, get_report_data_or_none(day))
+        get_report_data_mock.assert_called_once_with(day)
+
+    @patch("main_backfill.get_report_data")
+    def test_given_report_cannot_be_parsed_when_get_report_data_or_none_then_none_returned(self,
+                                                                                          get_report_data_mock):
+        get_report_data_mock.side_effect = Exception()
+
+        self.assertIsNone(get_report_data_or_none(datetime(2021, 1, 4)))
+
+    @patch("main_backfill.ProcessPoolExecutor")
+    @patch("main_backfill.influx")
+    def test_given_no_days_when_backfill_then_nothing_done(self, influx_mock, executor_mock):
+        backfill([], 2)
+
+        influx_mock.get_stat_accumulated_until_day.assert_not_called()
+        executor_mock.assert_not_called()
+
+    @patch("main_backfill.get_report_data_or_none")
+    @patch("main_backfill.ProcessPoolExecutor")
+    @patch("main_backfill.influx")
+    def test_given_days_when_backfill_then_deltas_inserted_in_order(self, influx_mock, executor_mock,
+                                                                    get_report_data_or_none_mock):
+        day1 = datetime(2021, 1, 4)
+        day2 = datetime(2021, 1, 5)
+        day3 = datetime(2021, 1, 6)
+        executor_mock.return_value.__enter__.return_value.map = map
+        influx_mock.get_stat_accumulated_until_day.side_effect = [{"Madrid": 10, "Cataluña": 5}, {"Madrid": 1}]
+
+        def get_data(pcrs, deaths):
+            return {Measurement.PCRS: pcrs, Measurement.DEATHS: deaths,
+                    Measurement.ACCUMULATED_INCIDENCE: MagicMock(), Measurement.PERCENTAGE_ADMITTED: MagicMock(),
+                    Measurement.PERCENTAGE_ICU: MagicMock()}
+
+        data1 = get_data({"Madrid": 15}, {"Madrid": 2})
+        data3 = get_data({"Madrid": 20, "Cataluña": 9}, {"Madrid": 3})
+        get_report_data_or_none_mock.side_effect = [data1, None, data3]
+
+        backfill([day1, day2, day3], 2)
+
+        executor_mock.assert_called_once_with(max_workers=2)
+        influx_mock.get_stat_accumulated_until_day.assert_has_calls([call(Measurement.PCRS, datetime(2021, 1, 3)),
+                                                                     call(Measurement.DEATHS, datetime(2021, 1, 3))])
+        influx_mock.insert_stats.assert_has_calls([
+            call(Measurement.PCRS, day1, {"Madrid": 5}),
+            call(Measurement.DEATHS, day1, {"Madrid": 1}),
+            call(Measurement.ACCUMULATED_INCIDENCE, day1, data1[Measurement.ACCUMULATED_INCIDENCE]),
+            call(Measurement.PERCENTAGE_ADMITTED, day1, data1[Measurement.PERCENTAGE_ADMITTED]),
+            call(Measurement.PERCENTAGE_ICU, day1, data1[Measurement.PERCENTAGE_ICU]),
+            call(Measurement.PCRS, day3, {"Madrid": 5, "Cataluña": 4}),
+            call(Measurement.DEATHS, day3, {"Madrid": 1}),
+            call(Measurement.ACCUMULATED_INCIDENCE, day3, data3[Measurement.ACCUMULATED_INCIDENCE]),
+            call(Measurement.PERCENTAGE_ADMITTED, day3, data3[Measurement.PERCENTAGE_ADMITTED]),
+            call(Measurement.PERCENTAGE_ICU, day3, data3[Measurement.PERCENTAGE_ICU])
+        ])
+        self.assertEqual(10, influx_mock.insert_stats.call_count)
+        influx_mock.flush.assert_called_once_with()
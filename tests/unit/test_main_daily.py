@@ -1,12 +1,15 @@
 import unittest
-from datetime import datetime, timedelta, date
+from datetime import datetime, date
 from unittest.mock import patch, MagicMock, call, ANY
 from main_daily import subtract_days_ignoring_weekends, main, Measurement, HTTPError, get_today_numbers, \
-    publish_report, update_database, update_stat, get_date_header, get_final_tweet
+    publish_report, update_database, update_stat, get_date_header, get_final_tweet, is_report_published, \
+    warm_up
+from helpers.report_calendar import ReportCalendar
 
 
 class MainDailyUnitTest(unittest.TestCase):
 
+    @patch("main_daily.SpainCovid19MinistryReport")
     @patch("main_daily.subtract_days_ignoring_weekends")
     @patch("main_daily.update_database")
     @patch("main_daily.publish_report")
@@ -15,7 +18,7 @@ class MainDailyUnitTest(unittest.TestCase):
     def test_given_data_when_main_then_update_and_publish_not_called(self, influx_mock, datetime_mock,
                                                                      publish_report_mock,
                                                                      update_database_mock,
-                                                                     subtract_days_ignoring_weekends_mock):
+                                                                     subtract_days_ignoring_weekends_mock, report_mock):
 
         influx_mock.get_stat_group_by_day.return_value = {"Madrid": 1}
 
@@ -25,8 +28,10 @@ class MainDailyUnitTest(unittest.TestCase):
         publish_report_mock.assert_not_called()
         datetime_mock.now.assert_called_once_with()
         subtract_days_ignoring_weekends_mock.assert_called_once_with(datetime_mock.now.return_value, 1)
-        influx_mock.get_stat_group_by_day.assert_called_once_with(Measurement.PCRS, datetime_mock.now.return_value)
+        influx_mock.get_stat_group_by_day.assert_called_once_with(Measurement.PCRS, datetime_mock.now.return_value,
+                                                                  refresh=True)
 
+    @patch("main_daily.SpainCovid19MinistryReport")
     @patch("main_daily.subtract_days_ignoring_weekends")
     @patch("main_daily.update_database")
     @patch("main_daily.publish_report")
@@ -35,19 +40,41 @@ class MainDailyUnitTest(unittest.TestCase):
     def test_given_no_data_when_main_then_update_and_publish_called(self, influx_mock, datetime_mock,
                                                                     publish_report_mock,
                                                                     update_database_mock,
-                                                                    subtract_days_ignoring_weekends_mock):
+                                                                    subtract_days_ignoring_weekends_mock, report_mock):
 
         influx_mock.get_stat_group_by_day.return_value = {}
 
         main()
 
+        report_mock.assert_called_once_with(datetime_mock.now.return_value, 1)
         update_database_mock.assert_called_once_with(datetime_mock.now.return_value)
         publish_report_mock.assert_called_once_with(datetime_mock.now.return_value,
                                                     subtract_days_ignoring_weekends_mock.return_value)
         datetime_mock.now.assert_called_once_with()
         subtract_days_ignoring_weekends_mock.assert_called_once_with(datetime_mock.now.return_value, 1)
-        influx_mock.get_stat_group_by_day.assert_called_once_with(Measurement.PCRS, datetime_mock.now.return_value)
+        influx_mock.get_stat_group_by_day.assert_called_once_with(Measurement.PCRS, datetime_mock.now.return_value,
+                                                                  refresh=True)
+
+    @patch("main_daily.SpainCovid19MinistryReport")
+    @patch("main_daily.subtract_days_ignoring_weekends")
+    @patch("main_daily.update_database")
+    @patch("main_daily.publish_report")
+    @patch("main_daily.datetime")
+    @patch("main_daily.influx")
+    def test_given_no_data_and_report_not_available_when_main_then_update_and_publish_not_called(
+            self, influx_mock, datetime_mock, publish_report_mock, update_database_mock,
+            subtract_days_ignoring_weekends_mock, report_mock):
 
+        influx_mock.get_stat_group_by_day.return_value = {}
+        report_mock.return_value.is_available.return_value = False
+
+        main()
+
+        report_mock.assert_called_once_with(datetime_mock.now.return_value, 1)
+        update_database_mock.assert_not_called()
+        publish_report_mock.assert_not_called()
+
+    @patch("main_daily.SpainCovid19MinistryReport")
     @patch("main_daily.subtract_days_ignoring_weekends")
     @patch("main_daily.update_database")
     @patch("main_daily.publish_report")
@@ -55,7 +82,8 @@ class MainDailyUnitTest(unittest.TestCase):
     @patch("main_daily.influx")
     def test_given_no_data_and_http_error_when_main_then_no_exception_raised(self, influx_mock, datetime_mock,
                                                                              publish_report_mock, update_database_mock,
-                                                                             subtract_days_ignoring_weekends_mock):
+                                                                             subtract_days_ignoring_weekends_mock,
+                                                                             report_mock):
 
         update_database_mock.side_effect = HTTPError("http://google.com", 404, MagicMock(), MagicMock(), MagicMock())
         influx_mock.get_stat_group_by_day.return_value = {}
@@ -66,8 +94,10 @@ class MainDailyUnitTest(unittest.TestCase):
         publish_report_mock.assert_not_called()
         datetime_mock.now.assert_called_once_with()
         subtract_days_ignoring_weekends_mock.assert_called_once_with(datetime_mock.now.return_value, 1)
-        influx_mock.get_stat_group_by_day.assert_called_once_with(Measurement.PCRS, datetime_mock.now.return_value)
+        influx_mock.get_stat_group_by_day.assert_called_once_with(Measurement.PCRS, datetime_mock.now.return_value,
+                                                                  refresh=True)
 
+    @patch("main_daily.SpainCovid19MinistryReport")
     @patch("main_daily.twitter")
     @patch("main_daily.subtract_days_ignoring_weekends")
     @patch("main_daily.update_database")
@@ -77,7 +107,7 @@ class MainDailyUnitTest(unittest.TestCase):
     def test_given_no_data_and_another_error_when_main_then_twitter_dm_sent(self, influx_mock, datetime_mock,
                                                                             publish_report_mock, update_database_mock,
                                                                             subtract_days_ignoring_weekends_mock,
-                                                                            twitter_mock):
+                                                                            twitter_mock, report_mock):
 
         exception_text = "exception text"
         update_database_mock.side_effect = Exception(exception_text * 100)
@@ -89,12 +119,49 @@ class MainDailyUnitTest(unittest.TestCase):
         publish_report_mock.assert_not_called()
         datetime_mock.now.assert_called_once_with()
         subtract_days_ignoring_weekends_mock.assert_called_once_with(datetime_mock.now.return_value, 1)
-        influx_mock.get_stat_group_by_day.assert_called_once_with(Measurement.PCRS, datetime_mock.now.return_value)
+        influx_mock.get_stat_group_by_day.assert_called_once_with(Measurement.PCRS, datetime_mock.now.return_value,
+                                                                  refresh=True)
         twitter_mock.send_dm.assert_called_once_with(ANY)
         dm_text = twitter_mock.send_dm.call_args[0][0]
         self.assertEqual(280, len(dm_text))
         self.assertTrue(dm_text.startswith(f"There was an unhandled exception. Trace:\n\n{exception_text}"))
 
+    @patch("main_daily.influx")
+    def test_given_data_when_is_report_published_then_true_returned(self, influx_mock):
+        influx_mock.get_stat_group_by_day.return_value = {"Madrid": 1}
+        today = MagicMock()
+
+        self.assertTrue(is_report_published(today))
+        influx_mock.get_stat_group_by_day.assert_called_once_with(Measurement.PCRS, today, refresh=True)
+
+    @patch("main_daily.influx")
+    def test_given_no_data_when_is_report_published_then_false_returned(self, influx_mock):
+        influx_mock.get_stat_group_by_day.return_value = {}
+
+        self.assertFalse(is_report_published(MagicMock()))
+
+    @patch("main_daily.influx")
+    @patch("main_daily.SpainCovid19MinistryReport")
+    def test_given_report_day_when_warm_up_then_connection_opened_and_previous_values_cached(self, report_mock,
+                                                                                             influx_mock):
+        today = datetime(2020, 12, 9)
+
+        warm_up(today)
+
+        report_mock.assert_called_once_with(today, 1)
+        report_mock.return_value.is_available.assert_called_once_with()
+        influx_mock.get_stat_accumulated_until_day.assert_has_calls([call(Measurement.PCRS, today),
+                                                                     call(Measurement.DEATHS, today)])
+        influx_mock.get_all_stats_group_by_day.assert_called_once_with(datetime(2020, 12, 7))
+
+    @patch("main_daily.influx")
+    @patch("main_daily.SpainCovid19MinistryReport")
+    def test_given_day_without_report_when_warm_up_then_nothing_done(self, report_mock, influx_mock):
+        warm_up(datetime(2020, 12, 12))
+
+        report_mock.assert_not_called()
+        influx_mock.get_stat_accumulated_until_day.assert_not_called()
+
     def test_given_no_weekends_when_subtract_days_ignoring_weekends_then_no_gaps(self):
         date = datetime(2020, 7, 29)
         self.assertEqual(datetime(2020, 7, 27), subtract_days_ignoring_weekends(date, 2))
@@ -107,12 +174,12 @@ class MainDailyUnitTest(unittest.TestCase):
         date = datetime(2020, 7, 29)
         self.assertEqual(datetime(2020, 7, 23), subtract_days_ignoring_weekends(date, 4))
 
-    @patch("main_daily.DAYS_WITHOUT_REPORT", [date(2020, 12, 8)])
+    @patch("main_daily.report_calendar", ReportCalendar([date(2020, 12, 8)]))
     def test_given_9_december_and_one_day_without_report_when_subtract_days_ignoring_weekends_then_monday(self):
         date = datetime(2020, 12, 9)
         self.assertEqual(datetime(2020, 12, 7), subtract_days_ignoring_weekends(date, 1))
 
-    @patch("main_daily.DAYS_WITHOUT_REPORT", [date(2020, 12, 8), date(2020, 12, 9)])
+    @patch("main_daily.report_calendar", ReportCalendar([date(2020, 12, 8), date(2020, 12, 9)]))
     def test_given_10_december_and_two_days_without_report_when_subtract_days_ignoring_weekends_then_monday(self):
         date = datetime(2020, 12, 10)
         self.assertEqual(datetime(2020, 12, 7), subtract_days_ignoring_weekends(date, 1))
@@ -137,7 +204,9 @@ class MainDailyUnitTest(unittest.TestCase):
         percentage_admitted = MagicMock()
         percentage_icu = MagicMock()
         hospitals_pdf.get_column_data.side_effect = [Exception(), percentage_admitted, percentage_icu]
-        ministry_report_mock.side_effect = [pcrs_pdf, pcrs_pdf, hospitals_pdf, hospitals_pdf]
+        ministry_report_mock.return_value = pcrs_pdf
+        pcrs_pdf.get_page.side_effect = [pcrs_pdf, hospitals_pdf]
+        hospitals_pdf.get_page.return_value = hospitals_pdf
 
         yesterday_pcrs_accumulated = MagicMock()
         yesterday_deaths_accumulated = MagicMock()
@@ -152,10 +221,9 @@ class MainDailyUnitTest(unittest.TestCase):
 
         update_database(today)
 
-        ministry_report_mock.assert_has_calls([call(today, 1),
-                                               call(today, 1, (239, 56, 239 + 283, 56 + 756)),
-                                               call(today, 4),
-                                               call(today, 4, (179, 77, 179+280, 77+707))])
+        ministry_report_mock.assert_called_once_with(today, 1)
+        pcrs_pdf.get_page.assert_has_calls([call(1, (239, 56, 239 + 283, 56 + 756)), call(4)])
+        hospitals_pdf.get_page.assert_called_once_with(4, (179, 77, 179+280, 77+707))
         pcrs_pdf.get_column_data.assert_has_calls([call(1), call(1), call(5), call(3, 1, float)])
         hospitals_pdf.get_column_data.assert_has_calls([call(3, cast=float), call(6, cast=float)])
 
@@ -166,6 +234,7 @@ class MainDailyUnitTest(unittest.TestCase):
                                                         accumulated_incidence),
                                                    call(Measurement.PERCENTAGE_ADMITTED, today, percentage_admitted),
                                                    call(Measurement.PERCENTAGE_ICU, today, percentage_icu)])
+        influx_mock.flush.assert_called_once_with()
 
     @patch("main_daily.SpainCovid19MinistryReport")
     @patch("main_daily.influx")
@@ -184,7 +253,8 @@ class MainDailyUnitTest(unittest.TestCase):
         percentage_admitted = MagicMock()
         percentage_icu = MagicMock()
         hospitals_pdf.get_column_data.side_effect = [percentage_admitted, percentage_icu]
-        ministry_report_mock.side_effect = [pcrs_pdf, hospitals_pdf]
+        ministry_report_mock.return_value = pcrs_pdf
+        pcrs_pdf.get_page.return_value = hospitals_pdf
 
         yesterday_pcrs_accumulated = MagicMock()
         yesterday_deaths_accumulated = MagicMock()
@@ -199,7 +269,9 @@ class MainDailyUnitTest(unittest.TestCase):
 
         update_database(today)
 
-        ministry_report_mock.assert_has_calls([call(today, 1), call(today, 4)])
+        ministry_report_mock.assert_called_once_with(today, 1)
+        pcrs_pdf.get_page.assert_called_once_with(4)
+        hospitals_pdf.get_page.assert_not_called()
         pcrs_pdf.get_column_data.assert_has_calls([call(1), call(5), call(3, 1, float)])
         hospitals_pdf.get_column_data.assert_has_calls([call(3, cast=float), call(6, cast=float)])
 
@@ -210,6 +282,7 @@ class MainDailyUnitTest(unittest.TestCase):
                                                         accumulated_incidence),
                                                    call(Measurement.PERCENTAGE_ADMITTED, today, percentage_admitted),
                                                    call(Measurement.PERCENTAGE_ICU, today, percentage_icu)])
+        influx_mock.flush.assert_called_once_with()
 
     @patch("main_daily.influx")
     @patch("main_daily.get_today_numbers")
@@ -225,7 +298,8 @@ class MainDailyUnitTest(unittest.TestCase):
         get_today_numbers_mock.assert_called_once_with(accumulated_today,
                                                        influx_mock.get_stat_accumulated_until_day.return_value)
         influx_mock.get_stat_accumulated_until_day.assert_called_once_with(stat, date)
-        influx_mock.insert_stats.assert_called_once_with(stat, date, get_today_numbers_mock.return_value)
+        influx_mock.insert_stats.assert_called_once_with(stat, date, get_today_numbers_mock.return_value,
+                                                         influx_mock.get_stat_accumulated_until_day.return_value)
 
     def test_given_today_and_yesterday_data_when_get_today_numbers_then_subtraction_returned(self):
         today = {"Madrid": 100, "Cataluña": 90}
@@ -260,6 +334,7 @@ class MainDailyUnitTest(unittest.TestCase):
         influx_mock.get_all_stats_group_by_day.side_effect = [today_data, yesterday_data]
 
         influx_mock.get_all_stats_accumulated_until_day.return_value = accumulated_today
+        get_report_by_ccaa_mock.return_value = ["tweet1", "tweet2"]
 
         publish_report(today, yesterday)
 
@@ -272,13 +347,11 @@ class MainDailyUnitTest(unittest.TestCase):
         get_global_report_mock.assert_called_once_with(get_date_header_mock.return_value, today_data, yesterday_data,
                                                        accumulated_today)
 
-        twitter_mock.publish_tweet_with_media.assert_called_once_with(get_global_report_mock.return_value,
-                                                                      get_graph_url_mock.return_value)
-        twitter_mock.publish_tweets.assert_called_once_with(get_report_by_ccaa_mock.return_value,
-                                                            twitter_mock.publish_tweet_with_media.return_value)
-        twitter_mock.publish_tweet.assert_called_once_with(get_final_tweet_mock.return_value,
-                                                           twitter_mock.publish_tweets.return_value)
-        get_graph_url_mock.assert_called_once_with(today - timedelta(31), today)
+        twitter_mock.publish_thread.assert_called_once_with([get_global_report_mock.return_value, "tweet1", "tweet2",
+                                                             get_final_tweet_mock.return_value],
+                                                            twitter_mock.upload_media.return_value)
+        twitter_mock.upload_media.assert_called_once_with(get_graph_url_mock.return_value)
+        get_graph_url_mock.assert_called_once_with(datetime(2020, 7, 6, 23, 59, 59), datetime(2020, 8, 6, 23, 59, 59))
 
     def test_given_monday_when_get_date_header_then_weekend_text_included(self):
         date = datetime(2020, 7, 27)
@@ -0,0 +1,192 @@
+import unittest
+from datetime import datetime
+from unittest.mock import patch, MagicMock, call
+import main_daily
+import main_vaccination
+from main_scheduler import main, poll, warm_up, get_sleep_time, is_in_window, get_next_window_start, get_jobs, \
+    JOBS
+
+
+class MainSchedulerUnitTest(unittest.TestCase):
+
+    @staticmethod
+    def _build_job(published):
+        job = MagicMock()
+        job.is_report_published.side_effect = published
+        return job
+
+    def test_given_published_report_when_poll_then_job_not_run(self):
+        job = self._build_job([True])
+        today = MagicMock()
+
+        pending_jobs = poll([job], today)
+
+        self.assertEqual([], pending_jobs)
+        job.is_report_published.assert_called_once_with(today)
+        job.main.assert_not_called()
+
+    def test_given_report_published_by_job_when_poll_then_job_not_pending(self):
+        job = self._build_job([False, True])
+        today = MagicMock()
+
+        pending_jobs = poll([job], today)
+
+        self.assertEqual([], pending_jobs)
+        job.main.assert_called_once_with()
+        job.is_report_published.assert_has_calls([call(today), call(today)])
+
+    def test_given_job_error_when_poll_then_job_pending_and_next_jobs_polled(self):
+        job1 = self._build_job([])
+        job1.__name__ = "main_daily"
+        job1.is_report_published.side_effect = ConnectionError("Influx is down")
+        job2 = self._build_job([False, True])
+
+        pending_jobs = poll([job1, job2], MagicMock())
+
+        self.assertEqual([job1], pending_jobs)
+        job1.main.assert_not_called()
+        job2.main.assert_called_once_with()
+
+    def test_given_report_not_available_when_poll_then_job_pending(self):
+        job1 = self._build_job([False, False])
+        job2 = self._build_job([True])
+
+        pending_jobs = poll([job1, job2], MagicMock())
+
+        self.assertEqual([job1], pending_jobs)
+        job1.main.assert_called_once_with()
+        job2.main.assert_not_called()
+
+    def test_given_jobs_when_warm_up_then_cache_cleared_and_jobs_warmed_up(self):
+        job1 = MagicMock()
+        job1.__name__ = "main_daily"
+        job1.warm_up.side_effect = Exception("Influx is down")
+        job2 = MagicMock()
+        today = datetime(2022, 3, 15, 16, 0)
+
+        warm_up([job1, job2], today)
+
+        for job in [job1, job2]:
+            job.influx.clear_cache.assert_called_once_with()
+            job.warm_up.assert_called_once_with(today)
+
+    def test_given_jobs_sharing_client_when_warm_up_then_cache_cleared_before_any_job_warmed_up(self):
+        influx = MagicMock()
+        job1 = MagicMock(influx=influx)
+        job2 = MagicMock(influx=influx)
+        manager = MagicMock()
+        manager.attach_mock(influx.clear_cache, "clear_cache")
+        manager.attach_mock(job1.warm_up, "warm_up1")
+        manager.attach_mock(job2.warm_up, "warm_up2")
+        today = datetime(2022, 3, 15, 16, 0)
+
+        warm_up([job1, job2], today)
+
+        self.assertEqual([call.clear_cache(), call.clear_cache(), call.warm_up1(today), call.warm_up2(today)],
+                         manager.mock_calls)
+
+    def test_given_report_day_when_get_jobs_then_all_jobs_returned(self):
+        self.assertEqual([main_daily, main_vaccination], get_jobs(datetime(2022, 3, 15, 16, 0)))
+
+    def test_given_day_without_report_when_get_jobs_then_daily_job_skipped(self):
+        self.assertEqual([main_vaccination], get_jobs(datetime(2021, 12, 8, 16, 0)))
+
+    def test_given_pending_jobs_when_get_sleep_time_then_delay_returned_and_doubled(self):
+        self.assertEqual((10, 20), get_sleep_time(datetime(2022, 3, 15, 16, 0), [MagicMock()], 10))
+
+    def test_given_pending_jobs_and_max_delay_when_get_sleep_time_then_delay_not_increased(self):
+        self.assertEqual((40, 60), get_sleep_time(datetime(2022, 3, 15, 16, 0), [MagicMock()], 40))
+        self.assertEqual((60, 60), get_sleep_time(datetime(2022, 3, 15, 16, 0), [MagicMock()], 60))
+
+    def test_given_no_pending_jobs_when_get_sleep_time_then_sleep_until_next_warm_up(self):
+        now = datetime(2022, 3, 15, 17, 0)
+
+        self.assertEqual((23 * 60 * 60 - 15 * 60, 10), get_sleep_time(now, [], 40))
+
+    def test_given_weekday_in_hours_when_is_in_window_then_true_returned(self):
+        self.assertTrue(is_in_window(datetime(2022, 3, 15, 16, 0)))
+        self.assertTrue(is_in_window(datetime(2022, 3, 15, 21, 59)))
+
+    def test_given_weekday_out_of_hours_when_is_in_window_then_false_returned(self):
+        self.assertFalse(is_in_window(datetime(2022, 3, 15, 15, 59)))
+        self.assertFalse(is_in_window(datetime(2022, 3, 15, 22, 0)))
+
+    def test_given_weekend_when_is_in_window_then_false_returned(self):
+        self.assertFalse(is_in_window(datetime(2022, 3, 19, 17, 0)))
+
+    def test_given_weekday_before_window_when_get_next_window_start_then_same_day_returned(self):
+        self.assertEqual(datetime(2022, 3, 15, 16, 0), get_next_window_start(datetime(2022, 3, 15, 10, 30)))
+
+    def test_given_weekday_after_window_start_when_get_next_window_start_then_next_day_returned(self):
+        self.assertEqual(datetime(2022, 3, 16, 16, 0), get_next_window_start(datetime(2022, 3, 15, 16, 30)))
+
+    def test_given_friday_after_window_start_when_get_next_window_start_then_monday_returned(self):
+        self.assertEqual(datetime(2022, 3, 21, 16, 0), get_next_window_start(datetime(2022, 3, 18, 18, 0)))
+
+    @patch("main_scheduler.time")
+    @patch("main_scheduler.warm_up")
+    @patch("main_scheduler.poll")
+    @patch("main_scheduler.datetime")
+    def test_given_window_when_main_then_jobs_warmed_up_once_and_polled_with_backoff(self, datetime_mock, poll_mock,
+                                                                                     warm_up_mock, time_mock):
+        now = datetime(2022, 3, 15, 16, 0)
+        datetime_mock.now.return_value = now
+        poll_mock.return_value = [MagicMock()]
+        time_mock.sleep.side_effect = [None, None, StopIteration()]
+
+        with self.assertRaises(StopIteration):
+            main()
+
+        time_mock.sleep.assert_has_calls([call(10), call(20), call(40)])
+        self.assertEqual(3, poll_mock.call_count)
+        warm_up_mock.assert_called_once_with(JOBS, now)
+
+    @patch("main_scheduler.time")
+    @patch("main_scheduler.warm_up")
+    @patch("main_scheduler.poll")
+    @patch("main_scheduler.datetime")
+    def test_given_out_of_window_when_main_then_sleep_until_warm_up(self, datetime_mock, poll_mock, warm_up_mock,
+                                                                    time_mock):
+        datetime_mock.now.return_value = datetime(2022, 3, 15, 15, 0)
+        time_mock.sleep.side_effect = StopIteration()
+
+        with self.assertRaises(StopIteration):
+            main()
+
+        poll_mock.assert_not_called()
+        warm_up_mock.assert_not_called()
+        time_mock.sleep.assert_called_once_with(45 * 60)
+
+    @patch("main_scheduler.time")
+    @patch("main_scheduler.warm_up")
+    @patch("main_scheduler.poll")
+    @patch("main_scheduler.datetime")
+    def test_given_warm_up_time_when_main_then_jobs_warmed_up_and_sleep_until_window(self, datetime_mock, poll_mock,
+                                                                                     warm_up_mock, time_mock):
+        datetime_mock.now.side_effect = [datetime(2022, 3, 15, 15, 50), datetime(2022, 3, 15, 15, 55)]
+        time_mock.sleep.side_effect = [None, StopIteration()]
+
+        with self.assertRaises(StopIteration):
+            main()
+
+        poll_mock.assert_not_called()
+        warm_up_mock.assert_called_once_with(JOBS, datetime(2022, 3, 15, 16, 0))
+        time_mock.sleep.assert_has_calls([call(10 * 60), call(5 * 60)])
+
+    @patch("main_scheduler.time")
+    @patch("main_scheduler.warm_up")
+    @patch("main_scheduler.poll")
+    @patch("main_scheduler.datetime")
+    def test_given_jobs_published_when_main_then_next_window_warmed_up_before_it_starts(self, datetime_mock,
+                                                                                        poll_mock, warm_up_mock,
+                                                                                        time_mock):
+        datetime_mock.now.side_effect = [datetime(2022, 3, 15, 16, 0), datetime(2022, 3, 16, 15, 45)]
+        poll_mock.return_value = []
+        time_mock.sleep.side_effect = [None, StopIteration()]
+
+        with self.assertRaises(StopIteration):
+            main()
+
+        warm_up_mock.assert_has_calls([call(JOBS, datetime(2022, 3, 15, 16, 0)),
+                                       call(JOBS, datetime(2022, 3, 16, 16, 0))])
+        time_mock.sleep.assert_has_calls([call(23 * 60 * 60 + 45 * 60), call(15 * 60)])
@@ -0,0 +1,20 @@
+import unittest
+from unittest.mock import patch
+from main_tabula_server import main
+
+
+class MainTabulaServerUnitTest(unittest.TestCase):
+
+    @patch("main_tabula_server.get_address", return_value=("tabula", 6001))
+    @patch("main_tabula_server.serve")
+    def test_given_address_when_main_then_server_started_in_its_port(self, serve_mock, _):
+        main()
+
+        serve_mock.assert_called_once_with(6001)
+
+    @patch("main_tabula_server.get_address", return_value=None)
+    @patch("main_tabula_server.serve")
+    def test_given_no_address_when_main_then_server_started_in_default_port(self, serve_mock, _):
+        main()
+
+        serve_mock.assert_called_once_with(6000)
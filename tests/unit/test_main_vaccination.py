@@ -1,15 +1,19 @@
 import unittest
 from datetime import datetime
+import pandas as pd
+import main_daily
+import main_vaccination
 from constants import VACCINE_IMAGE_PATH
 from unittest.mock import patch, MagicMock, call, ANY
 from main_vaccination import main, Measurement, HTTPError, update_vaccinations, publish_report, get_column_index, \
-    update_percentage
+    update_percentages, is_report_published, warm_up
 from helpers.spain_geography import CCAA_POPULATION
 
 
 class MainVaccinationUnitTest(unittest.TestCase):
 
-    @patch("main_vaccination.update_percentage")
+    @patch("main_vaccination.VaccinesMinistryReport")
+    @patch("main_vaccination.update_percentages")
     @patch("main_vaccination.update_vaccinations")
     @patch("main_vaccination.publish_report")
     @patch("main_vaccination.datetime")
@@ -17,7 +21,7 @@ class MainVaccinationUnitTest(unittest.TestCase):
     def test_given_data_when_main_then_update_and_publish_not_called(self, influx_mock, datetime_mock,
                                                                      publish_report_mock,
                                                                      update_vaccinations_mock,
-                                                                     update_percentage_mock):
+                                                                     update_percentages_mock, report_mock):
 
         influx_mock.get_stat_group_by_day.return_value = {"Madrid": 1}
 
@@ -25,12 +29,13 @@ class MainVaccinationUnitTest(unittest.TestCase):
 
         update_vaccinations_mock.assert_not_called()
         publish_report_mock.assert_not_called()
-        update_percentage_mock.assert_not_called()
+        update_percentages_mock.assert_not_called()
         datetime_mock.now.assert_called_once_with()
         influx_mock.get_stat_group_by_day.assert_called_once_with(Measurement.VACCINATIONS,
-                                                                  datetime_mock.now.return_value)
+                                                                  datetime_mock.now.return_value, refresh=True)
 
-    @patch("main_vaccination.update_percentage")
+    @patch("main_vaccination.VaccinesMinistryReport")
+    @patch("main_vaccination.update_percentages")
     @patch("main_vaccination.update_vaccinations")
     @patch("main_vaccination.publish_report")
     @patch("main_vaccination.datetime")
@@ -38,26 +43,44 @@ class MainVaccinationUnitTest(unittest.TestCase):
     def test_given_no_data_when_main_then_update_and_publish_called(self, influx_mock, datetime_mock,
                                                                     publish_report_mock,
                                                                     update_vaccinations_mock,
-                                                                    update_percentage_mock):
+                                                                    update_percentages_mock, report_mock):
 
         influx_mock.get_stat_group_by_day.return_value = {}
         today = datetime_mock.now.return_value
 
         main()
 
+        report_mock.assert_called_once_with(today, 1)
         update_vaccinations_mock.assert_called_once_with(today)
         publish_report_mock.assert_called_once_with(today)
         datetime_mock.now.assert_called_once_with()
         influx_mock.get_stat_group_by_day.assert_called_once_with(Measurement.VACCINATIONS,
-                                                                  today)
-        update_percentage_mock.assert_has_calls([call(today, Measurement.COMPLETED_VACCINATIONS,
-                                                      Measurement.PERCENTAGE_COMPLETED_VACCINATION),
-                                                 call(today, Measurement.FIRST_DOSE_VACCINATIONS,
-                                                      Measurement.PERCENTAGE_FIRST_DOSE),
-                                                 call(today, Measurement.EXTRA_DOSE_VACCINATIONS,
-                                                      Measurement.PERCENTAGE_EXTRA_DOSE)])
-
-    @patch("main_vaccination.update_percentage")
+                                                                  today, refresh=True)
+        update_percentages_mock.assert_called_once_with(today)
+        influx_mock.flush.assert_called_once_with()
+
+    @patch("main_vaccination.VaccinesMinistryReport")
+    @patch("main_vaccination.update_percentages")
+    @patch("main_vaccination.update_vaccinations")
+    @patch("main_vaccination.publish_report")
+    @patch("main_vaccination.datetime")
+    @patch("main_vaccination.influx")
+    def test_given_no_data_and_report_not_available_when_main_then_update_and_publish_not_called(
+            self, influx_mock, datetime_mock, publish_report_mock, update_vaccinations_mock, update_percentages_mock,
+            report_mock):
+
+        influx_mock.get_stat_group_by_day.return_value = {}
+        report_mock.return_value.is_available.return_value = False
+
+        main()
+
+        report_mock.assert_called_once_with(datetime_mock.now.return_value, 1)
+        update_vaccinations_mock.assert_not_called()
+        update_percentages_mock.assert_not_called()
+        publish_report_mock.assert_not_called()
+
+    @patch("main_vaccination.VaccinesMinistryReport")
+    @patch("main_vaccination.update_percentages")
     @patch("main_vaccination.update_vaccinations")
     @patch("main_vaccination.publish_report")
     @patch("main_vaccination.datetime")
@@ -65,7 +88,7 @@ class MainVaccinationUnitTest(unittest.TestCase):
     def test_given_no_data_and_http_error_when_main_then_no_exception_raised(self, influx_mock, datetime_mock,
                                                                              publish_report_mock,
                                                                              update_vaccinations_mock,
-                                                                             update_percentage_mock):
+                                                                             update_percentages_mock, report_mock):
 
         update_vaccinations_mock.side_effect = HTTPError("http://google.com", 404, MagicMock(), MagicMock(), MagicMock())
         influx_mock.get_stat_group_by_day.return_value = {}
@@ -74,12 +97,13 @@ class MainVaccinationUnitTest(unittest.TestCase):
 
         update_vaccinations_mock.assert_called_once_with(datetime_mock.now.return_value)
         publish_report_mock.assert_not_called()
-        update_percentage_mock.assert_not_called()
+        update_percentages_mock.assert_not_called()
         datetime_mock.now.assert_called_once_with()
         influx_mock.get_stat_group_by_day.assert_called_once_with(Measurement.VACCINATIONS,
-                                                                  datetime_mock.now.return_value)
+                                                                  datetime_mock.now.return_value, refresh=True)
 
-    @patch("main_vaccination.update_percentage")
+    @patch("main_vaccination.VaccinesMinistryReport")
+    @patch("main_vaccination.update_percentages")
     @patch("main_vaccination.twitter")
     @patch("main_vaccination.update_vaccinations")
     @patch("main_vaccination.publish_report")
@@ -88,7 +112,8 @@ class MainVaccinationUnitTest(unittest.TestCase):
     def test_given_no_data_and_another_error_when_main_then_twitter_dm_sent(self, influx_mock, datetime_mock,
                                                                             publish_report_mock,
                                                                             update_vaccinations_mock,
-                                                                            twitter_mock, update_percentage_mock):
+                                                                            twitter_mock, update_percentages_mock,
+                                                                            report_mock):
 
         exception_text = "exception text"
         update_vaccinations_mock.side_effect = Exception(exception_text * 100)
@@ -98,15 +123,42 @@ class MainVaccinationUnitTest(unittest.TestCase):
 
         update_vaccinations_mock.assert_called_once_with(datetime_mock.now.return_value)
         publish_report_mock.assert_not_called()
-        update_percentage_mock.assert_not_called()
+        update_percentages_mock.assert_not_called()
         datetime_mock.now.assert_called_once_with()
         influx_mock.get_stat_group_by_day.assert_called_once_with(Measurement.VACCINATIONS,
-                                                                  datetime_mock.now.return_value)
+                                                                  datetime_mock.now.return_value, refresh=True)
         twitter_mock.send_dm.assert_called_once_with(ANY)
         dm_text = twitter_mock.send_dm.call_args[0][0]
         self.assertEqual(280, len(dm_text))
         self.assertTrue(dm_text.startswith(f"There was an unhandled exception. Trace:\n\n{exception_text}"))
 
+    @patch("main_vaccination.influx")
+    def test_given_data_when_is_report_published_then_true_returned(self, influx_mock):
+        influx_mock.get_stat_group_by_day.return_value = {"Madrid": 1}
+        today = MagicMock()
+
+        self.assertTrue(is_report_published(today))
+        influx_mock.get_stat_group_by_day.assert_called_once_with(Measurement.VACCINATIONS, today, refresh=True)
+
+    @patch("main_vaccination.influx")
+    def test_given_no_data_when_is_report_published_then_false_returned(self, influx_mock):
+        influx_mock.get_stat_group_by_day.return_value = {}
+
+        self.assertFalse(is_report_published(MagicMock()))
+
+    @patch("main_vaccination.influx")
+    @patch("main_vaccination.VaccinesMinistryReport")
+    def test_when_warm_up_then_connection_opened_and_previous_values_cached(self, report_mock, influx_mock):
+        today = MagicMock()
+
+        warm_up(today)
+
+        report_mock.assert_called_once_with(today, 1)
+        report_mock.return_value.is_available.assert_called_once_with()
+        influx_mock.get_stat_accumulated_until_day.assert_has_calls([
+            call(Measurement.VACCINATIONS, today), call(Measurement.COMPLETED_VACCINATIONS, today),
+            call(Measurement.FIRST_DOSE_VACCINATIONS, today), call(Measurement.EXTRA_DOSE_VACCINATIONS, today)])
+
     @patch("main_vaccination.get_column_index")
     @patch("main_vaccination.VaccinesMinistryReport")
     @patch("main_vaccination.update_stat")
@@ -119,8 +171,8 @@ class MainVaccinationUnitTest(unittest.TestCase):
         first_dose = MagicMock()
         completed_vaccinations = MagicMock()
         extra_dose = MagicMock()
-        vaccines_ministry_report_mock.return_value.get_column_data.side_effect = [vaccinations, first_dose,
-                                                                                  completed_vaccinations, extra_dose]
+        vaccines_ministry_report_mock.return_value.get_columns_data.return_value = [vaccinations, first_dose,
+                                                                                    completed_vaccinations, extra_dose]
 
         doses_column = MagicMock()
         first_dose_column = MagicMock()
@@ -132,10 +184,8 @@ class MainVaccinationUnitTest(unittest.TestCase):
         update_vaccinations(today)
 
         vaccines_ministry_report_mock.assert_called_once_with(today, 1)
-        vaccines_ministry_report_mock.return_value.get_column_data.assert_has_calls([call(doses_column, num_rows=21),
-                                                                                     call(first_dose_column, num_rows=21),
-                                                                                     call(completed_column, num_rows=21),
-                                                                                     call(extra_column, num_rows=21)])
+        vaccines_ministry_report_mock.return_value.get_columns_data.assert_called_once_with(
+            [doses_column, first_dose_column, completed_column, extra_column], num_rows=21)
         update_stat_mock.assert_has_calls([call(Measurement.VACCINATIONS,
                                                 vaccinations,
                                                 today),
@@ -150,6 +200,53 @@ class MainVaccinationUnitTest(unittest.TestCase):
                                                 today)
                                            ])
 
+    def test_when_import_then_influx_shared_with_main_daily(self):
+        self.assertIs(main_daily.influx, main_vaccination.influx)
+
+    @patch("main_vaccination.get_column_index")
+    @patch("main_vaccination.VaccinesMinistryReport")
+    def test_when_update_vaccinations_and_flush_then_stats_written(self, vaccines_ministry_report_mock,
+                                                                   get_column_index_mock):
+        today = datetime(2021, 9, 1)
+        vaccines_ministry_report_mock.return_value.get_columns_data.return_value = [{"Madrid": 4}, {"Madrid": 3},
+                                                                                    {"Madrid": 2}, {"Madrid": 1}]
+        client = MagicMock()
+        client.query.return_value = MagicMock()
+
+        with patch.object(main_vaccination.influx, "_client", client):
+            update_vaccinations(today)
+            main_vaccination.influx.flush()
+            main_vaccination.influx.clear_cache()
+
+        # Daily points and running totals are written to their own retention policies
+        self.assertEqual(2, client.write_points.call_count)
+        points = client.write_points.call_args[0][0]
+        self.assertEqual("rollups", client.write_points.call_args[1]["retention_policy"])
+        self.assertIn({"measurement": "first_dose_vaccinations_accumulated", "time": "2021-09-01",
+                       "tags": {"ccaa": "Madrid"}, "fields": {"value": 3}}, points)
+        self.assertEqual([], main_vaccination.influx._points)
+
+    @patch("main_vaccination.get_column_index")
+    @patch("main_vaccination.VaccinesMinistryReport")
+    def test_given_warmed_up_totals_when_update_vaccinations_then_totals_read_again(self, vaccines_ministry_report_mock,
+                                                                                    get_column_index_mock):
+        today = datetime(2021, 9, 1)
+        vaccines_ministry_report_mock.return_value.get_columns_data.return_value = [{"Madrid": 4}, {"Madrid": 3},
+                                                                                    {"Madrid": 2}, {"Madrid": 1}]
+        client = MagicMock()
+        client.query.return_value = MagicMock()
+
+        with patch.object(main_vaccination.influx, "_client", client):
+            warm_up(today)
+            update_vaccinations(today)
+            client.query.reset_mock()
+            main_vaccination.influx.get_stat_accumulated_until_day(Measurement.FIRST_DOSE_VACCINATIONS, today)
+            main_vaccination.influx.clear_cache()
+
+        self.assertEqual(2, client.write_points.call_count)
+        self.assertEqual(call("SELECT last(value) FROM \"rollups\".\"first_dose_vaccinations_accumulated\" where "
+                              "time <= '2021-09-01' group by ccaa;"), client.query.call_args_list[0])
+
     def test_given_column_in_columns_when_get_column_index_then_position_returned(self):
         df = MagicMock()
         df.columns = ['Dosis Administradas', 'Pautas Completadas', '1 dosis']
@@ -187,11 +284,6 @@ class MainVaccinationUnitTest(unittest.TestCase):
         ccaa1_sentence = "ccaa1_sentence"
         ccaa2_sentence = "ccaa2_sentence"
         get_vaccination_report_mock.side_effect = [spain_sentence, ccaa1_sentence, ccaa2_sentence]
-        last_tweet = MagicMock()
-        first_tweet = MagicMock()
-        twitter_mock.publish_sentences_in_tweets.return_value = last_tweet
-        twitter_mock.publish_tweet_with_media.return_value = first_tweet
-
         publish_report(today)
 
         influx_mock.get_stat_group_by_day.assert_has_calls([call(Measurement.COMPLETED_VACCINATIONS, today),
@@ -200,10 +292,9 @@ class MainVaccinationUnitTest(unittest.TestCase):
         influx_mock.get_stat_accumulated_until_day.assert_has_calls([call(Measurement.COMPLETED_VACCINATIONS, today),
                                                                      call(Measurement.FIRST_DOSE_VACCINATIONS, today),
                                                                      call(Measurement.EXTRA_DOSE_VACCINATIONS, today)])
-        twitter_mock.publish_tweets.assert_called_once_with([f"Aragón - Vacunación a {date_str}:\n\n{ccaa1_sentence}",
-                                                             f"Madrid - Vacunación a {date_str}:\n\n{ccaa2_sentence}"],
-                                                            twitter_mock.publish_tweet_with_media.return_value)
-        get_graph_url_mock.assert_called_once_with(datetime(2021, 1, 1), today, graph_path=VACCINE_IMAGE_PATH)
+        get_graph_url_mock.assert_called_once_with(datetime(2021, 1, 1), today.replace.return_value,
+                                                   graph_path=VACCINE_IMAGE_PATH)
+        today.replace.assert_called_once_with(hour=23, minute=59, second=59, microsecond=0)
         get_vaccination_report_mock.assert_has_calls([call("España", accumulated_completed_vaccinations,
                                                            completed_vaccinations, accumulated_first_doses,
                                                            first_doses, accumulated_extra_doses, extra_doses),
@@ -213,51 +304,62 @@ class MainVaccinationUnitTest(unittest.TestCase):
                                                       call("Madrid", accumulated_completed_vaccinations,
                                                            completed_vaccinations, accumulated_first_doses,
                                                            first_doses, accumulated_extra_doses, extra_doses)])
-        twitter_mock.publish_tweet_with_media.assert_called_once_with(f"🇪🇸 España - Vacunación a {date_str}:"
-                                                                      f"\n\n{spain_sentence}\n\n➡️ Gráfico "
-                                                                      f"Interactivo: https://home.aitormagan.es/d/TeEplNgRk/covid-vacunas-espana?orgId=1",
-                                                                      get_graph_url_mock.return_value)
+        twitter_mock.publish_thread.assert_called_once_with([f"🇪🇸 España - Vacunación a {date_str}:"
+                                                             f"\n\n{spain_sentence}\n\n➡️ Gráfico "
+                                                             f"Interactivo: https://home.aitormagan.es/d/TeEplNgRk/covid-vacunas-espana?orgId=1",
+                                                             f"Aragón - Vacunación a {date_str}:\n\n{ccaa1_sentence}",
+                                                             f"Madrid - Vacunación a {date_str}:\n\n{ccaa2_sentence}"],
+                                                            twitter_mock.upload_media.return_value)
+        twitter_mock.upload_media.assert_called_once_with(get_graph_url_mock.return_value)
         today.strftime.assert_called_once_with("%d/%m/%Y")
 
     @patch("main_vaccination.influx")
-    def test_given_no_info_when_update_percentage_then_influx_called_with_empty_dict(self, influx_mock):
-        influx_mock.get_stat_accumulated_until_day.return_value = {}
+    def test_given_no_info_when_update_percentages_then_influx_called_with_empty_dicts(self, influx_mock):
+        influx_mock.get_stats_accumulated_until_day.return_value = pd.DataFrame()
         date = MagicMock()
-        base_table = MagicMock()
-        final_table = MagicMock()
 
-        update_percentage(date, base_table, final_table)
+        update_percentages(date)
 
-        influx_mock.get_stat_accumulated_until_day.assert_called_once_with(base_table, date)
-        influx_mock.insert_stats.assert_called_once_with(final_table, date, {})
+        influx_mock.get_stats_accumulated_until_day.assert_called_once_with(
+            [Measurement.COMPLETED_VACCINATIONS, Measurement.FIRST_DOSE_VACCINATIONS,
+             Measurement.EXTRA_DOSE_VACCINATIONS], date)
+        influx_mock.insert_stats.assert_has_calls([call(Measurement.PERCENTAGE_COMPLETED_VACCINATION, date, {}),
+                                                   call(Measurement.PERCENTAGE_FIRST_DOSE, date, {}),
+                                                   call(Measurement.PERCENTAGE_EXTRA_DOSE, date, {})])
 
     @patch("main_vaccination.influx")
-    def test_given_info_when_update_percentage_then_influx_called_with_returned_regions(self, influx_mock):
+    def test_given_info_when_update_percentages_then_influx_called_with_returned_regions(self, influx_mock):
         region = "Castilla La Mancha"
         region_population = CCAA_POPULATION[region]
         half_population = int(region_population / 2)
-        expected_percentage = 100 * half_population / region_population
-        influx_mock.get_stat_accumulated_until_day.return_value = {region: half_population}
+        quarter_population = int(region_population / 4)
+        influx_mock.get_stats_accumulated_until_day.return_value = pd.DataFrame({
+            Measurement.COMPLETED_VACCINATIONS: [half_population, 10],
+            Measurement.FIRST_DOSE_VACCINATIONS: [quarter_population, 10],
+            Measurement.EXTRA_DOSE_VACCINATIONS: [None, 10]
+        }, index=[region, "Unknown"]).convert_dtypes()
         date = MagicMock()
-        base_table = MagicMock()
-        final_table = MagicMock()
 
-        update_percentage(date, base_table, final_table)
+        update_percentages(date)
 
-        influx_mock.get_stat_accumulated_until_day.assert_called_once_with(base_table, date)
-        influx_mock.insert_stats.assert_called_once_with(final_table, date, {region: expected_percentage})
+        influx_mock.insert_stats.assert_has_calls([
+            call(Measurement.PERCENTAGE_COMPLETED_VACCINATION, date, {region: 100 * half_population / region_population}),
+            call(Measurement.PERCENTAGE_FIRST_DOSE, date, {region: 100 * quarter_population / region_population}),
+            call(Measurement.PERCENTAGE_EXTRA_DOSE, date, {})
+        ])
 
     @patch("main_vaccination.influx")
-    def test_given_spain_info_when_update_percentage_then_influx_called_with_sum_spain_population(self, influx_mock):
+    def test_given_spain_info_when_update_percentages_then_influx_called_with_sum_spain_population(self, influx_mock):
         spain_population = sum(CCAA_POPULATION.values())
         half_population = int(spain_population / 2)
-        expected_percentage = 100 * half_population / spain_population
-        influx_mock.get_stat_accumulated_until_day.return_value = {"España": half_population}
+        influx_mock.get_stats_accumulated_until_day.return_value = pd.DataFrame({
+            Measurement.COMPLETED_VACCINATIONS: [half_population],
+            Measurement.FIRST_DOSE_VACCINATIONS: [half_population],
+            Measurement.EXTRA_DOSE_VACCINATIONS: [half_population]
+        }, index=["España"])
         date = MagicMock()
-        base_table = MagicMock()
-        final_table = MagicMock()
 
-        update_percentage(date, base_table, final_table)
+        update_percentages(date)
 
-        influx_mock.get_stat_accumulated_until_day.assert_called_once_with(base_table, date)
-        influx_mock.insert_stats.assert_called_once_with(final_table, date, {"España": expected_percentage})
+        influx_mock.insert_stats.assert_called_with(Measurement.PERCENTAGE_EXTRA_DOSE, date,
+                                                    {"España": 100 * half_population / spain_population})
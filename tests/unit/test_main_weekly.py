@@ -1,6 +1,7 @@
 import unittest
 from unittest.mock import patch, MagicMock, call
 from datetime import datetime, timedelta
+import pandas as pd
 from main_weekly import get_date_header, get_final_tweet, main, delete_pcrs24h, Measurement
 
 
@@ -30,6 +31,7 @@ class MainWeeklyUnitTest(unittest.TestCase):
 
         influx_mock.get_all_stats_group_by_week.side_effect = [today_data, previous_week_data]
         influx_mock.get_all_stats_accumulated_until_day.return_value = accumulated_today
+        get_report_by_ccaa_mock.return_value = ["tweet1", "tweet2"]
 
         main()
 
@@ -42,64 +44,32 @@ class MainWeeklyUnitTest(unittest.TestCase):
         get_global_report_mock.assert_called_once_with(get_date_header_mock.return_value, today_data,
                                                        previous_week_data, accumulated_today, vaccine_info=True)
 
-        twitter_mock.publish_tweet_with_media.assert_called_once_with(get_global_report_mock.return_value,
-                                                                      get_graph_url_mock.return_value)
-        twitter_mock.publish_tweets.assert_called_once_with(get_report_by_ccaa_mock.return_value,
-                                                            twitter_mock.publish_tweet_with_media.return_value)
-        twitter_mock.publish_tweet.assert_called_once_with(get_final_tweet_mock.return_value,
-                                                           twitter_mock.publish_tweets.return_value)
+        twitter_mock.publish_thread.assert_called_once_with([get_global_report_mock.return_value, "tweet1", "tweet2",
+                                                             get_final_tweet_mock.return_value],
+                                                            twitter_mock.upload_media.return_value)
+        twitter_mock.upload_media.assert_called_once_with(get_graph_url_mock.return_value)
         get_graph_url_mock.assert_called_once_with(additional_vars={"group_by": "1w,4d"})
 
     def test_given_element_with_pcrs24h_when_delete_pcrs24h_then_removed_from_all_elements(self):
 
-        pcrs = 1
-        deaths = 2
-        icu = 3
-        admitted = 4
-
-        element = {
-            "Madrid": {
-                Measurement.PCRS: pcrs,
-                Measurement.PCRS_LAST_24H: 2,
-                Measurement.DEATHS: deaths,
-                Measurement.ICU_PEOPLE: icu,
-                Measurement.ADMITTED_PEOPLE: admitted
-            },
-            "CLM": {
-                Measurement.PCRS: pcrs,
-                Measurement.PCRS_LAST_24H: 2
-            }
-        }
-
-        self.assertEqual(delete_pcrs24h(element), {
-            "Madrid": {
-                Measurement.PCRS: pcrs,
-                Measurement.DEATHS: deaths,
-                Measurement.ICU_PEOPLE: icu,
-                Measurement.ADMITTED_PEOPLE: admitted
-            },
-            "CLM": {
-                Measurement.PCRS: pcrs
-            }
-        })
+        element = pd.DataFrame({
+            Measurement.PCRS: [1, 5],
+            Measurement.PCRS_LAST_24H: [2, 2],
+            Measurement.DEATHS: [3, None]
+        }, index=["Madrid", "CLM"]).convert_dtypes()
+
+        expected_element = element[[Measurement.PCRS, Measurement.DEATHS]]
+
+        pd.testing.assert_frame_equal(expected_element, delete_pcrs24h(element))
 
     def test_given_element_without_pcrs24h_when_delete_pcrs24h_then_same_element_returned(self):
 
-        element = {
-            "Madrid": {
-                Measurement.PCRS: 1,
-                Measurement.DEATHS: 2,
-                Measurement.ICU_PEOPLE: 3,
-                Measurement.ADMITTED_PEOPLE: 4
-            },
-            "CLM": {
-                Measurement.PCRS: 5,
-            }
-        }
-
-        expected_element = dict(element)
-
-        self.assertEqual(delete_pcrs24h(element), expected_element)
+        element = pd.DataFrame({
+            Measurement.PCRS: [1, 5],
+            Measurement.DEATHS: [2, None]
+        }, index=["Madrid", "CLM"]).convert_dtypes()
+
+        pd.testing.assert_frame_equal(element, delete_pcrs24h(element))
 
     def test_when_get_header_then_monday_and_sunday_included(self):
         date = datetime(2020, 7, 27)